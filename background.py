@@ -0,0 +1,55 @@
+"""
+Exécution de tâches en arrière-plan pour l'interface Tkinter.
+Tk n'étant pas thread-safe, les tâches tournent dans un pool de threads et
+leurs résultats sont renvoyés au thread Tk par interrogation via `after()`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import tkinter as tk
+
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bg")
+
+POLL_MS = 20
+
+
+def submit(func, *args, **kwargs):
+    """Lance func(*args, **kwargs) dans le pool. Retourne un Future."""
+    return _executor.submit(func, *args, **kwargs)
+
+
+def when_done(widget, future, on_done=None, on_error=None):
+    """
+    Appelle on_done(résultat) ou on_error(exception) dans le thread Tk
+    lorsque future est terminé. Ignoré si le widget a été détruit entre-temps.
+    """
+
+    def _poll():
+        if not future.done():
+            try:
+                widget.after(POLL_MS, _poll)
+            except tk.TclError:
+                pass
+            return
+        try:
+            if not widget.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error is not None:
+                on_error(error)
+        elif on_done is not None:
+            on_done(future.result())
+
+    try:
+        widget.after(POLL_MS, _poll)
+    except tk.TclError:
+        pass
+    return future
+
+
+def run_in_background(widget, func, *args, on_done=None, on_error=None, **kwargs):
+    """Raccourci : submit() puis when_done(). Retourne le Future."""
+    return when_done(widget, submit(func, *args, **kwargs), on_done=on_done, on_error=on_error)
@@ -0,0 +1,106 @@
+"""
+Mesure du démarrage de l'application.
+
+Usage:
+  python bench_startup.py                  # temps jusqu'à l'écran de connexion, comparé au budget
+  python bench_startup.py --runs 5 --budget 1200
+  python bench_startup.py --imports        # coût d'import par module (python -X importtime)
+  python bench_startup.py --imports --top 40
+
+Le budget par défaut est APP_CONFIG["startup_budget_ms"] (variable STARTUP_BUDGET_MS).
+Code de sortie 1 si la médiane dépasse le budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from config import APP_CONFIG
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_startup(timeout: float = 60.0) -> float:
+    """Lance main.py dans un nouvel interpréteur et retourne le temps (ms) jusqu'à l'écran de connexion."""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "main.py"), "--startup-bench"],
+        cwd=HERE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        for line in proc.stdout:
+            if line.startswith("STARTUP_MS "):
+                return float(line.split()[1])
+        raise RuntimeError("main.py s'est arrêté sans afficher l'écran de connexion.")
+    finally:
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def profile_imports(module: str = "main") -> list[tuple[str, int, int]]:
+    """
+    Importe `module` avec `python -X importtime`.
+    Retourne une liste (nom, self_us, cumulative_us) triée par coût cumulé décroissant.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # ligne d'en-tête
+        rows.append((parts[2].rstrip(), int(parts[0]), int(parts[1])))
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "Import échoué.", file=sys.stderr)
+    rows.sort(key=lambda r: r[2], reverse=True)
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3, help="Nombre de démarrages mesurés.")
+    parser.add_argument("--budget", type=float, default=APP_CONFIG["startup_budget_ms"], help="Budget en ms.")
+    parser.add_argument("--imports", action="store_true", help="Affiche le coût d'import par module et quitte.")
+    parser.add_argument("--top", type=int, default=25, help="Nombre de modules affichés avec --imports.")
+    args = parser.parse_args()
+
+    if args.imports:
+        rows = profile_imports()
+        total = max((r[2] for r in rows), default=0)
+        print(f"{'cumulé (ms)':>12} {'propre (ms)':>12}  module")
+        for name, self_us, cumulative_us in rows[: args.top]:
+            print(f"{cumulative_us / 1000:12.1f} {self_us / 1000:12.1f}  {name}")
+        print(f"Total import main : {total / 1000:.1f} ms")
+        return 0
+
+    timings = []
+    for i in range(args.runs):
+        ms = measure_startup()
+        timings.append(ms)
+        print(f"Démarrage {i + 1}/{args.runs} : {ms:.0f} ms")
+    median = statistics.median(timings)
+    print(f"Médiane : {median:.0f} ms (budget {args.budget:.0f} ms)")
+    if median > args.budget:
+        print("ÉCHEC : budget de démarrage dépassé.")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
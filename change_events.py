@@ -0,0 +1,39 @@
+"""
+Bus de notification des modifications de données.
+Les fonctions d'écriture des modèles publient la table touchée (et les ids
+concernés lorsqu'ils sont connus) ; l'interface et les caches s'abonnent pour
+invalider uniquement ce qui dépend de cette table.
+"""
+
+import threading
+
+
+_subscribers = []
+_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """Abonne callback(table, ids) aux modifications. Retourne callback."""
+    with _lock:
+        _subscribers.append(callback)
+    return callback
+
+
+def unsubscribe(callback):
+    """Désabonne un callback (sans erreur s'il ne l'était pas)."""
+    with _lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def publish(table: str, ids=None):
+    """
+    Signale une écriture sur `table`. ids : liste des ids modifiés, ou None si
+    inconnus (toute la table est alors considérée comme modifiée).
+    Peut être appelé depuis n'importe quel thread : les abonnés Tk doivent se
+    contenter de marquer un état et ne pas toucher aux widgets.
+    """
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        callback(table, list(ids) if ids is not None else None)
@@ -0,0 +1,209 @@
+"""
+Suivi des modifications pour le rafraîchissement incrémental des vues.
+
+Chaque table suivie a une colonne updated_at (TIMESTAMP(6), renseignée par
+MySQL à l'insertion et à chaque modification). Les suppressions sont notées
+dans deleted_rows par les fonctions de suppression des modèles, y compris les
+lignes supprimées en cascade : les clés étrangères ON DELETE CASCADE / SET
+NULL ne touchent pas updated_at, les modèles enregistrent donc les lignes
+filles avant de supprimer le parent.
+
+Un jeton est un instant du serveur. changes_since() renvoie les lignes créées,
+modifiées ou supprimées depuis un jeton, et le jeton suivant. updated_at et
+deleted_at datent l'instruction, pas la validation : une transaction encore
+ouverte pendant la lecture (import CSV, passage d'année, attente d'un verrou)
+validera plus tard des lignes datées d'avant. Le jeton suivant est donc le
+début de la plus ancienne transaction d'écriture ouverte sur le serveur
+(information_schema.INNODB_TRX), ou l'instant présent, reculé de
+TOKEN_MARGIN_S. Une ligne peut revenir deux fois, un delta s'applique donc
+par id (mise à jour ou suppression), de façon idempotente.
+
+INNODB_TRX demande le privilège PROCESS. Sans lui, le jeton n'est que
+l'instant présent moins TOKEN_MARGIN_S (un avertissement est journalisé) :
+une transaction validée plus de TOKEN_MARGIN_S secondes après ses écritures
+échappe alors aux deltas, jusqu'au prochain rechargement complet de la vue.
+
+Pour les autres postes, table_versions porte un compteur par table,
+incrémenté une fois par transaction d'écriture (bump_versions, appelé par
+les modèles juste avant la validation) : une seule requête
+(get_table_versions) suffit à savoir quelles tables ont changé. Un import
+de 5 000 notes ne met ainsi à jour qu'une fois la ligne du compteur, dont
+le verrou n'est tenu que jusqu'à la validation. Les versions produites par
+les écritures de ce poste sont notées : changed_tables les ignore, ces
+écritures ayant déjà été publiées par id.
+"""
+
+import logging
+import threading
+
+from db import execute_in, execute_query, in_transaction, on_commit
+
+
+TRACKED_TABLES = ("students", "teachers", "courses", "classes", "enrollments", "grades")
+UPDATED_AT_COLUMN = "TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"
+TOKEN_MARGIN_S = 5
+VERSIONED_TABLES = TRACKED_TABLES + ("class_courses",)
+
+log = logging.getLogger(__name__)
+
+_own_versions = {}  # table -> versions produites par les écritures validées de ce poste
+_own_lock = threading.Lock()
+
+# Lignes filles supprimées en cascade avec un parent : (table, condition sur les ids parents)
+_CASCADES = {
+    "students": (
+        ("enrollments", "student_id IN ({ids})"),
+        ("grades", "enrollment_id IN (SELECT id FROM enrollments WHERE student_id IN ({ids}))"),
+    ),
+    "classes": (
+        ("enrollments", "class_id IN ({ids})"),
+        ("grades", "enrollment_id IN (SELECT id FROM enrollments WHERE class_id IN ({ids}))"),
+    ),
+    "courses": (("grades", "course_id IN ({ids})"),),
+    "enrollments": (("grades", "enrollment_id IN ({ids})"),),
+}
+# Lignes filles supprimées en cascade, sans suivi dans deleted_rows
+_UNTRACKED_CASCADES = {"classes": ("class_courses",), "courses": ("class_courses",)}
+
+# Tables modifiées en cascade avec un parent : bump_versions ne compte que la
+# table écrite, changed_tables en déduit celles-ci.
+_CASCADE_TABLES = {
+    table: {child for child, _condition in _CASCADES.get(table, ())} | set(_UNTRACKED_CASCADES.get(table, ()))
+    for table in _CASCADES.keys() | _UNTRACKED_CASCADES.keys()
+}
+
+
+# Jeton : début de la plus ancienne transaction d'écriture ouverte (sinon maintenant), moins la marge
+_TOKEN_QUERY = f"""
+    SELECT LEAST(NOW(6), COALESCE(MIN(trx_started), NOW(6))) - INTERVAL {TOKEN_MARGIN_S} SECOND AS token
+    FROM information_schema.INNODB_TRX
+    WHERE trx_is_read_only = 0 AND trx_mysql_thread_id <> CONNECTION_ID()
+"""
+_MARGIN_TOKEN_QUERY = f"SELECT NOW(6) - INTERVAL {TOKEN_MARGIN_S} SECOND AS token"
+_ACCESS_DENIED_ERRNOS = (1044, 1142, 1227)  # base, table, privilège (PROCESS)
+_open_trx_visible = True
+
+
+def current_token(cursor=None):
+    """
+    Jeton de départ d'une lecture (voir plus haut). cursor : curseur dict sur
+    le serveur à utiliser (réplique) ; sinon, execute_query.
+    """
+    global _open_trx_visible
+    if _open_trx_visible:
+        try:
+            return _read_token(cursor, _TOKEN_QUERY)
+        except Exception as e:
+            if getattr(e, "errno", None) not in _ACCESS_DENIED_ERRNOS:
+                raise
+            _open_trx_visible = False
+            log.warning(
+                "Transactions ouvertes illisibles (%s) : jetons reculés de %s s seulement, "
+                "une transaction validée plus tard peut échapper aux deltas.", e, TOKEN_MARGIN_S,
+            )
+    return _read_token(cursor, _MARGIN_TOKEN_QUERY)
+
+
+def _read_token(cursor, query):
+    if cursor is None:
+        return execute_query(query, fetchone=True)["token"]
+    cursor.execute(query)
+    return cursor.fetchone()["token"]
+
+
+def record_deletes(cursor, table, ids):
+    """
+    À appeler dans la transaction, juste avant DELETE FROM table WHERE id IN (ids) :
+    note les lignes supprimées et leurs lignes filles supprimées en cascade.
+    """
+    for child, condition in _CASCADES.get(table, ()):
+        execute_in(
+            cursor,
+            f"INSERT INTO deleted_rows (table_name, row_id) SELECT %s, id FROM {child} WHERE {condition}",
+            ids,
+            params=(child,),
+        )
+    execute_in(
+        cursor,
+        f"INSERT INTO deleted_rows (table_name, row_id) SELECT %s, id FROM {table} WHERE id IN ({{ids}})",
+        ids,
+        params=(table,),
+    )
+
+
+def changes_since(table, row_select, token, aliases=None):
+    """
+    Delta d'une table depuis token. row_select : SELECT des lignes au format de
+    la vue, sans WHERE ni ORDER BY ; aliases : alias des tables de row_select
+    dont une modification change la ligne (par défaut la table elle-même).
+    token None : toutes les lignes (chargement initial).
+    Retourne {"token": jeton suivant, "upserts": [lignes], "deletes": [ids]}.
+    """
+    next_token = current_token()
+    if token is None:
+        upserts = execute_query(row_select, fetchall=True) or []
+        deletes = []
+    else:
+        aliases = aliases or (table,)
+        condition = " OR ".join(f"{a}.updated_at >= %s" for a in aliases)
+        upserts = execute_query(
+            row_select + f" WHERE {condition}", params=(token,) * len(aliases), fetchall=True
+        ) or []
+        rows = execute_query(
+            "SELECT DISTINCT row_id FROM deleted_rows WHERE table_name = %s AND deleted_at >= %s",
+            params=(table, token),
+            fetchall=True,
+        ) or []
+        seen = {r["id"] for r in upserts}
+        deletes = [r["row_id"] for r in rows if r["row_id"] not in seen]
+    return {"token": next_token, "upserts": upserts, "deletes": deletes}
+
+
+def bump_versions(cursor, *tables):
+    """
+    À appeler en fin de transaction d'écriture : incrémente une fois le
+    compteur de chaque table écrite (les tables modifiées en cascade sont
+    déduites par changed_tables). Dans un bloc transaction(), les versions
+    obtenues sont notées comme écritures de ce poste après la validation.
+    """
+    tables = sorted(set(tables))
+    marks = ", ".join(["%s"] * len(tables))
+    cursor.execute(f"UPDATE table_versions SET version = version + 1 WHERE table_name IN ({marks})", tuple(tables))
+    if in_transaction():
+        cursor.execute(f"SELECT table_name, version FROM table_versions WHERE table_name IN ({marks})", tuple(tables))
+        versions = {r["table_name"]: r["version"] for r in cursor.fetchall()}
+        on_commit(lambda: _note_own_versions(versions))
+
+
+def _note_own_versions(versions):
+    with _own_lock:
+        for table, version in versions.items():
+            _own_versions.setdefault(table, set()).add(version)
+
+
+def get_table_versions():
+    """Compteurs de version de chaque table suivie : {table: version}, en une requête."""
+    rows = execute_query("SELECT table_name, version FROM table_versions", fetchall=True) or []
+    return {r["table_name"]: r["version"] for r in rows}
+
+
+def changed_tables(previous, current):
+    """
+    Tables dont le compteur diffère entre deux lectures, avec celles modifiées
+    en cascade. Une table dont toutes les versions intermédiaires viennent
+    des écritures de ce poste n'est pas retenue.
+    """
+    changed = set()
+    with _own_lock:
+        for table in current.keys() | previous.keys():
+            before, after = previous.get(table), current.get(table)
+            if before == after:
+                continue
+            own = _own_versions.get(table, set())
+            if before is None or after is None or after < before or not all(v in own for v in range(before + 1, after + 1)):
+                changed.add(table)
+            if after is not None:
+                _own_versions[table] = {v for v in own if v > after}
+    for table in list(changed):
+        changed.update(_CASCADE_TABLES.get(table, ()))
+    return changed
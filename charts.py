@@ -0,0 +1,277 @@
+"""
+Graphiques légers dessinés directement sur un tk.Canvas (barres, camembert,
+courbe, histogramme), aux couleurs du thème de l'application.
+
+Les graphiques se mettent à jour sur place via set_data() : le widget est
+conservé, seuls les éléments dessinés sont remplacés. matplotlib n'est utilisé
+que pour l'export haute qualité (export_image), importé à ce moment-là.
+"""
+
+import abc
+import math
+import tkinter as tk
+
+from config import APP_CONFIG
+
+
+BAR_COLOR = "#3b82f6"
+LINE_COLOR = "#22c55e"
+PIE_COLORS = ["#ef4444", "#f59e0b", "#22c55e", "#2563eb", "#a855f7", "#14b8a6"]
+GRADE_BINS = (0, 5, 10, 15, 20)
+
+
+class CanvasChart(tk.Canvas, abc.ABC):
+    """Base commune : titre, marges, redessin au redimensionnement."""
+
+    def __init__(self, master, title="", empty_text="Aucune donnée", **kwargs):
+        base_kwargs = {
+            "bg": APP_CONFIG["card_bg"],
+            "highlightthickness": 0,
+            "bd": 0,
+            "height": 300,
+        }
+        base_kwargs.update(kwargs)
+        super().__init__(master, **base_kwargs)
+        self.title = title
+        self.empty_text = empty_text
+        self.labels = []
+        self.values = []
+        self.bind("<Configure>", lambda _e: self.redraw())
+
+    def set_data(self, labels, values, title=None):
+        """Remplace les données et redessine le graphique."""
+        self.labels = [str(label) for label in labels]
+        self.values = [float(v or 0) for v in values]
+        if title is not None:
+            self.title = title
+        self.redraw()
+
+    def has_data(self):
+        return bool(self.values) and any(v > 0 for v in self.values)
+
+    def redraw(self):
+        self.delete("all")
+        w, h = self.winfo_width(), self.winfo_height()
+        if w < 20 or h < 20:
+            return
+        if self.title:
+            self.create_text(
+                w / 2, 14, text=self.title, fill=APP_CONFIG["text_primary"], font=("Segoe UI", 11, "bold")
+            )
+        if not self.has_data():
+            self.create_text(
+                w / 2, h / 2, text=self.empty_text, fill=APP_CONFIG["text_secondary"], font=("Segoe UI", 11)
+            )
+            return
+        self._draw(w, h)
+
+    @abc.abstractmethod
+    def _draw(self, w, h):
+        """Dessine les données dans le canevas de taille w x h (titre déjà tracé)."""
+
+    # --- Export haute qualité (matplotlib optionnel)
+
+    def export_image(self, path, dpi=150):
+        """Exporte ce graphique via matplotlib. Voir export_charts()."""
+        return export_charts([self], path, dpi=dpi)
+
+    @abc.abstractmethod
+    def _plot_matplotlib(self, ax):
+        """Trace les données sur un Axes matplotlib (export)."""
+
+
+class _AxesChart(CanvasChart):
+    """Graphiques à axes (barres, courbe) : calcule la zone de tracé et les graduations."""
+
+    margin_left = 44
+    margin_bottom = 56
+    margin_top = 34
+    margin_right = 16
+
+    def _plot_area(self, w, h):
+        return self.margin_left, self.margin_top, w - self.margin_right, h - self.margin_bottom
+
+    def _draw_axes(self, x0, y0, x1, y1, vmax):
+        secondary = APP_CONFIG["text_secondary"]
+        self.create_line(x0, y1, x1, y1, fill=secondary)
+        self.create_line(x0, y0, x0, y1, fill=secondary)
+        step = _nice_step(vmax)
+        tick = 0.0
+        while tick <= vmax + 1e-9:
+            y = y1 - (y1 - y0) * tick / vmax
+            self.create_line(x0 - 4, y, x0, y, fill=secondary)
+            self.create_text(x0 - 6, y, text=f"{tick:g}", anchor="e", fill=secondary, font=("Segoe UI", 8))
+            tick += step
+
+    def _draw_x_labels(self, centers, y1):
+        secondary = APP_CONFIG["text_secondary"]
+        rotate = len(self.labels) > 5
+        for x, label in zip(centers, self.labels):
+            if rotate:
+                self.create_text(x, y1 + 6, text=label, anchor="ne", angle=35, fill=secondary, font=("Segoe UI", 8))
+            else:
+                self.create_text(x, y1 + 6, text=label, anchor="n", fill=secondary, font=("Segoe UI", 8))
+
+
+class BarChart(_AxesChart):
+    """Diagramme en barres verticales."""
+
+    def __init__(self, master, color=BAR_COLOR, **kwargs):
+        super().__init__(master, **kwargs)
+        self.color = color
+
+    def _draw(self, w, h):
+        x0, y0, x1, y1 = self._plot_area(w, h)
+        vmax = _nice_max(max(self.values))
+        self._draw_axes(x0, y0, x1, y1, vmax)
+        n = len(self.values)
+        slot = (x1 - x0) / n
+        bar_w = slot * 0.7
+        centers = []
+        for i, v in enumerate(self.values):
+            cx = x0 + slot * (i + 0.5)
+            centers.append(cx)
+            top = y1 - (y1 - y0) * v / vmax
+            self.create_rectangle(cx - bar_w / 2, top, cx + bar_w / 2, y1, fill=self.color, outline="")
+        self._draw_x_labels(centers, y1)
+
+    def _plot_matplotlib(self, ax):
+        ax.bar(range(len(self.values)), self.values, color=self.color)
+        ax.set_xticks(range(len(self.labels)))
+        ax.set_xticklabels(self.labels, rotation=35, ha="right")
+
+
+class LineChart(_AxesChart):
+    """Courbe reliant les points (une valeur par étiquette)."""
+
+    def __init__(self, master, color=LINE_COLOR, **kwargs):
+        super().__init__(master, **kwargs)
+        self.color = color
+
+    def _draw(self, w, h):
+        x0, y0, x1, y1 = self._plot_area(w, h)
+        vmax = _nice_max(max(self.values))
+        self._draw_axes(x0, y0, x1, y1, vmax)
+        n = len(self.values)
+        slot = (x1 - x0) / n
+        points = []
+        for i, v in enumerate(self.values):
+            points.append((x0 + slot * (i + 0.5), y1 - (y1 - y0) * v / vmax))
+        if len(points) > 1:
+            self.create_line(*[c for p in points for c in p], fill=self.color, width=2)
+        for x, y in points:
+            self.create_oval(x - 3, y - 3, x + 3, y + 3, fill=self.color, outline="")
+        self._draw_x_labels([p[0] for p in points], y1)
+
+    def _plot_matplotlib(self, ax):
+        ax.plot(self.labels, self.values, color=self.color, marker="o")
+        ax.tick_params(axis="x", rotation=35)
+
+
+class HistogramChart(BarChart):
+    """Histogramme : répartit des valeurs brutes dans des tranches (par défaut 0-5, 5-10, 10-15, 15-20)."""
+
+    def set_values(self, raw_values, bins=GRADE_BINS, title=None):
+        """Calcule les effectifs par tranche puis redessine. La dernière tranche inclut sa borne haute."""
+        counts = [0] * (len(bins) - 1)
+        for v in raw_values:
+            if v is None:
+                continue
+            v = float(v)
+            for i in range(len(bins) - 1):
+                last = i == len(bins) - 2
+                if bins[i] <= v < bins[i + 1] or (last and v == bins[i + 1]):
+                    counts[i] += 1
+                    break
+        labels = [f"{bins[i]:g}-{bins[i + 1]:g}" for i in range(len(bins) - 1)]
+        self.set_data(labels, counts, title=title)
+
+
+class PieChart(CanvasChart):
+    """Camembert avec pourcentages et légende."""
+
+    def __init__(self, master, colors=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.colors = colors or PIE_COLORS
+
+    def _draw(self, w, h):
+        total = sum(self.values)
+        legend_w = 90
+        size = min(w - legend_w - 24, h - 48)
+        if size < 20:
+            return
+        cx, cy = (w - legend_w) / 2, 30 + (h - 30) / 2
+        r = size / 2
+        start = 90.0
+        for i, v in enumerate(self.values):
+            if v <= 0:
+                continue
+            extent = -360.0 * v / total
+            color = self.colors[i % len(self.colors)]
+            if abs(extent) >= 359.999:
+                self.create_oval(cx - r, cy - r, cx + r, cy + r, fill=color, outline=APP_CONFIG["card_bg"])
+            else:
+                self.create_arc(
+                    cx - r, cy - r, cx + r, cy + r,
+                    start=start, extent=extent, fill=color, outline=APP_CONFIG["card_bg"],
+                )
+            mid = math.radians(start + extent / 2)
+            self.create_text(
+                cx + r * 0.62 * math.cos(mid),
+                cy - r * 0.62 * math.sin(mid),
+                text=f"{100 * v / total:.0f}%",
+                fill="white",
+                font=("Segoe UI", 8, "bold"),
+            )
+            start += extent
+        lx = w - legend_w
+        for i, label in enumerate(self.labels):
+            y = 40 + i * 18
+            self.create_rectangle(lx, y - 5, lx + 10, y + 5, fill=self.colors[i % len(self.colors)], outline="")
+            self.create_text(
+                lx + 16, y, text=label, anchor="w", fill=APP_CONFIG["text_primary"], font=("Segoe UI", 9)
+            )
+
+    def _plot_matplotlib(self, ax):
+        ax.pie(self.values, labels=self.labels, autopct="%1.0f%%", colors=self.colors, startangle=90)
+
+
+def export_charts(charts, path, dpi=150):
+    """
+    Exporte un ou plusieurs graphiques côte à côte dans un fichier image
+    (PNG, SVG, PDF selon l'extension). Nécessite matplotlib : lève ImportError sinon.
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(5 * len(charts), 4), facecolor="white")
+    for i, chart in enumerate(charts, start=1):
+        ax = fig.add_subplot(1, len(charts), i)
+        if chart.has_data():
+            chart._plot_matplotlib(ax)
+        else:
+            ax.text(0.5, 0.5, chart.empty_text, ha="center", va="center")
+        if chart.title:
+            ax.set_title(chart.title)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def _nice_max(vmax):
+    """Borne supérieure « ronde » de l'axe vertical."""
+    if vmax <= 0:
+        return 1.0
+    step = _nice_step(vmax)
+    return math.ceil(vmax / step) * step
+
+
+def _nice_step(vmax):
+    """Pas de graduation (1, 2 ou 5 × 10^n) donnant environ 5 graduations."""
+    if vmax <= 0:
+        return 1.0
+    raw = vmax / 5
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for m in (1, 2, 5, 10):
+        if raw <= m * magnitude:
+            return m * magnitude
+    return 10 * magnitude
@@ -24,5 +24,34 @@ APP_CONFIG = {
     "card_bg": "#111827",
     "text_primary": "#e5e7eb",
     "text_secondary": "#9ca3af",
+    # Vues gardées en mémoire entre deux changements de menu (LRU)
+    "view_cache_size": 6,
+    "view_cache_rows": 50000,
+    # Lignes gardées dans les onglets des archives (les onglets masqués les plus anciens sont vidés au-delà)
+    "archive_rows_budget": 100000,
+    # Cache des lectures fréquentes (query_cache.py) : nombre d'entrées (0 = désactivé), durée de vie (s)
+    "query_cache_size": 256,
+    "query_cache_ttl": 30.0,
+    # Instantané local des données de référence (reference_data.py), relu au lancement s'il est à jour
+    "reference_cache_path": os.environ.get(
+        "REFERENCE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "reference_data.json")
+    ),
+    # Scrutation des compteurs de version (table_versions) pour voir les écritures des autres postes (ms, 0 = désactivée)
+    "change_poll_ms": int(os.environ.get("CHANGE_POLL_MS", "5000")),
+    # Réplique locale SQLite (replica.py) pour travailler hors connexion : activée par REPLICA=1.
+    # replica_reads : "offline" (lectures locales seulement serveur injoignable) ou "always".
+    "replica_enabled": os.environ.get("REPLICA", "0") == "1",
+    "replica_path": os.environ.get(
+        "REPLICA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "replica.sqlite3")
+    ),
+    "replica_reads": os.environ.get("REPLICA_READS", "offline"),
+    "replica_sync_ms": int(os.environ.get("REPLICA_SYNC_MS", "30000")),
+    "replica_connect_timeout": 5,
+    # Budget de démarrage (ms) jusqu'à l'écran de connexion, vérifié par bench_startup.py
+    "startup_budget_ms": int(os.environ.get("STARTUP_BUDGET_MS", "1500")),
+    # Moyenne minimale d'admission (passage d'année) et de réussite (statistiques)
+    "pass_threshold": float(os.environ.get("PASS_THRESHOLD", "10")),
+    # Intervalle d'enregistrement automatique de la grille de saisie des notes (ms)
+    "grade_autosave_ms": 30000,
 }
 
@@ -0,0 +1,94 @@
+"""
+Export CSV en flux : les lignes sont lues par paquets depuis MySQL
+(db.iter_query) et écrites au fur et à mesure via le module csv, sans
+construire la liste complète en mémoire. Compression gzip optionnelle
+(extension .gz), progression et annulation pour l'exécution en arrière-plan.
+"""
+
+import csv
+import gzip
+import os
+
+from db import iter_query
+
+
+BATCH_SIZE = 2000
+
+# Colonnes exportées par jeu de données (même ordre que les écrans).
+COLUMNS = {
+    "students": ("matricule", "last_name", "first_name", "email", "phone"),
+    "teachers": ("last_name", "first_name", "email", "department", "phone"),
+    "courses": ("code", "name", "credits", "teacher_name"),
+    "enrollments": ("academic_year", "semester", "matricule", "student_name", "class_name"),
+    "grades": ("academic_year", "semester", "student_name", "class_name", "course_name", "grade"),
+}
+
+# Les archives par année n'ont pas de colonne classe pour les notes.
+ARCHIVE_COLUMNS = dict(COLUMNS, grades=("academic_year", "semester", "student_name", "course_name", "grade"))
+
+
+class ExportCancelled(Exception):
+    """Levée lorsque l'export est annulé par l'utilisateur."""
+
+
+def export_query(path, query, params, columns, progress=None, cancel=None, compress=None, batch_size=BATCH_SIZE):
+    """
+    Écrit le résultat de query dans path (séparateur « ; », UTF-8).
+    compress : gzip si True, ou si None et que path se termine par .gz.
+    progress(n) est appelé tous les batch_size lignes ; cancel est un
+    threading.Event consulté au même rythme. En cas d'annulation ou d'erreur,
+    le fichier partiel est supprimé. Retourne le nombre de lignes écrites.
+    """
+    if compress is None:
+        compress = path.lower().endswith(".gz")
+    opener = gzip.open if compress else open
+    count = 0
+    try:
+        with opener(path, "wt", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(columns)
+            for row in iter_query(query, params, batch_size=batch_size):
+                writer.writerow(["" if row.get(c) is None else row[c] for c in columns])
+                count += 1
+                if count % batch_size == 0:
+                    if cancel is not None and cancel.is_set():
+                        raise ExportCancelled()
+                    if progress is not None:
+                        progress(count)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    if progress is not None:
+        progress(count)
+    return count
+
+
+def export_dataset(path, dataset, search="", **kwargs):
+    """Exporte un écran complet : "students" (filtré par search), "teachers", "courses", "enrollments" ou "grades"."""
+    from models_courses import courses_query
+    from models_enrollments import enrollments_query
+    from models_grades import grades_query
+    from models_students import students_query
+    from models_teachers import teachers_query
+
+    builders = {
+        "students": lambda: students_query(search),
+        "teachers": teachers_query,
+        "courses": courses_query,
+        "enrollments": enrollments_query,
+        "grades": grades_query,
+    }
+    query, params = builders[dataset]()
+    return export_query(path, query, params, COLUMNS[dataset], **kwargs)
+
+
+def export_archive(path, dataset, academic_year=None, **kwargs):
+    """Exporte un onglet des archives pour une année académique (toutes si None)."""
+    from models_archives import archive_query
+
+    query, params = archive_query(dataset, academic_year)
+    columns = ARCHIVE_COLUMNS[dataset] if academic_year else COLUMNS[dataset]
+    return export_query(path, query, params, columns, **kwargs)
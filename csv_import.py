@@ -0,0 +1,646 @@
+"""
+Import CSV en masse des étudiants, enseignants et cours.
+
+Le fichier est lu ligne à ligne ; chaque ligne est validée et normalisée, puis
+comparée par paquets à l'existant via la clé naturelle (matricule, email de
+l'enseignant, code du cours). Seules les lignes nouvelles ou modifiées sont
+écrites (executemany), le tout dans une seule transaction : en cas d'erreur
+SQL ou d'annulation, rien n'est enregistré. Les lignes rejetées sont listées
+dans le rapport, qui peut être écrit en CSV.
+
+Les notes (import_grades) sont importées pour une année et un semestre :
+matricule et code du cours sont résolus en inscription et cours par quelques
+requêtes ensemblistes, puis toutes les notes sont écrites en un seul
+INSERT ... ON DUPLICATE KEY UPDATE groupé. Un fichier de résultats donne le
+statut de chaque ligne.
+
+Usage:
+  python csv_import.py students nouveaux.csv --dry-run
+  python csv_import.py teachers enseignants.csv --errors erreurs.csv
+  python csv_import.py courses catalogue.csv
+  python csv_import.py grades notes.csv --year 2024-2025 --semester S1 --results resultats.csv
+
+Colonnes reconnues (en-têtes de l'export CSV ou libellés français) :
+  students : matricule, nom, prénom, email, téléphone
+  teachers : nom, prénom, email, département, téléphone
+  courses  : code, intitulé, crédits, email_enseignant
+  grades   : matricule, code (ou code_cours), note
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import re
+import sys
+import unicodedata
+
+from change_events import publish
+from change_tracking import bump_versions
+from db import transaction
+from grade_aggregates import ABSENT, apply_changes
+
+
+CHUNK_SIZE = 500
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+LABELS = {
+    "matricule": "matricule",
+    "last_name": "nom",
+    "first_name": "prénom",
+    "email": "email",
+    "phone": "téléphone",
+    "department": "département",
+    "code": "code",
+    "name": "intitulé",
+    "credits": "crédits",
+    "teacher_email": "email enseignant",
+    "grade": "note",
+}
+
+
+class ImportCancelled(Exception):
+    """Levée lorsque l'import est annulé ; la transaction est annulée."""
+
+
+# --- Normalisation des champs (ValueError = ligne rejetée)
+
+
+def _text(max_len):
+    def normalize(value):
+        value = " ".join(value.split())
+        if len(value) > max_len:
+            raise ValueError(f"{max_len} caractères maximum")
+        return value or None
+
+    return normalize
+
+
+def _code(max_len):
+    text = _text(max_len)
+
+    def normalize(value):
+        value = text(value)
+        if value and " " in value:
+            raise ValueError("ne doit pas contenir d'espace")
+        return value.upper() if value else None
+
+    return normalize
+
+
+def _email(value):
+    value = value.strip().lower()
+    if not value:
+        return None
+    if len(value) > 150 or not EMAIL_RE.match(value):
+        raise ValueError("adresse invalide")
+    return value
+
+
+def _credits(value):
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        credits = int(value)
+    except ValueError:
+        raise ValueError("nombre entier attendu") from None
+    if not 1 <= credits <= 30:
+        raise ValueError("doit être entre 1 et 30")
+    return credits
+
+
+class Entity:
+    """Description d'un type importable : table, clé naturelle et champs."""
+
+    def __init__(self, table, key, fields, required, columns, aliases):
+        self.table = table
+        self.key = key
+        self.fields = fields  # {champ du fichier: normalisation}
+        self.required = required
+        self.columns = columns  # colonnes écrites en base, dans l'ordre
+        self.aliases = {_header_key(f): f for f in fields}  # {en-tête normalisé: champ}
+        self.aliases.update(aliases)
+
+
+def _header_key(text):
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]", "", text.casefold())
+
+
+def _aliases(mapping):
+    result = {}
+    for field, names in mapping.items():
+        for name in (field, *names):
+            result[_header_key(name)] = field
+    return result
+
+
+ENTITIES = {
+    "students": Entity(
+        table="students",
+        key="matricule",
+        fields={
+            "matricule": _code(50),
+            "last_name": _text(100),
+            "first_name": _text(100),
+            "email": _email,
+            "phone": _text(50),
+        },
+        required=("matricule", "last_name", "first_name"),
+        columns=("matricule", "first_name", "last_name", "email", "phone"),
+        aliases=_aliases({
+            "last_name": ("nom",),
+            "first_name": ("prenom",),
+            "email": ("mail", "courriel"),
+            "phone": ("telephone", "tel"),
+        }),
+    ),
+    "teachers": Entity(
+        table="teachers",
+        key="email",
+        fields={
+            "last_name": _text(100),
+            "first_name": _text(100),
+            "email": _email,
+            "department": _text(100),
+            "phone": _text(50),
+        },
+        required=("last_name", "first_name", "email"),
+        columns=("first_name", "last_name", "email", "phone", "department"),
+        aliases=_aliases({
+            "last_name": ("nom",),
+            "first_name": ("prenom",),
+            "email": ("mail", "courriel"),
+            "department": ("departement",),
+            "phone": ("telephone", "tel"),
+        }),
+    ),
+    "courses": Entity(
+        table="courses",
+        key="code",
+        fields={
+            "code": _code(50),
+            "name": _text(150),
+            "credits": _credits,
+            "teacher_email": _email,
+        },
+        required=("code", "name", "credits"),
+        columns=("code", "name", "credits", "teacher_id"),
+        aliases=_aliases({
+            "name": ("intitule", "nom"),
+            "teacher_email": ("email_enseignant", "enseignant_email", "enseignant"),
+        }),
+    ),
+}
+
+
+class ImportReport:
+    """Compteurs et erreurs d'un import (ou d'une simulation)."""
+
+    def __init__(self, entity, dry_run):
+        self.entity = entity
+        self.dry_run = dry_run
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []  # (ligne, clé, message)
+
+    def add_error(self, line, key, message):
+        self.errors.append((line, key or "", message))
+
+    def summary(self):
+        verb = "à créer" if self.dry_run else "créées"
+        verb_upd = "à modifier" if self.dry_run else "modifiées"
+        lines = [
+            f"{self.read} lignes lues",
+            f"{self.inserted} {verb}",
+            f"{self.updated} {verb_upd}",
+            f"{self.unchanged} inchangées",
+            f"{len(self.errors)} rejetées",
+        ]
+        return ("Simulation : " if self.dry_run else "") + ", ".join(lines) + "."
+
+    def write_errors(self, path):
+        """Écrit les lignes rejetées dans un CSV (ligne;clé;erreur)."""
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(("ligne", "cle", "erreur"))
+            writer.writerows(self.errors)
+        return path
+
+
+def _map_header(entity, header):
+    mapping = {}
+    for index, name in enumerate(header):
+        field = entity.aliases.get(_header_key(name))
+        if field and field not in mapping:
+            mapping[field] = index
+    missing = [LABELS[f] for f in entity.required if f not in mapping]
+    if missing:
+        raise ValueError("Colonnes obligatoires manquantes : " + ", ".join(missing))
+    return mapping
+
+
+def _normalize_row(entity, mapping, row):
+    """Retourne (valeurs, erreurs) pour une ligne du fichier."""
+    values, errors = {}, []
+    for field, normalize in entity.fields.items():
+        index = mapping.get(field)
+        raw = row[index] if index is not None and index < len(row) else ""
+        try:
+            values[field] = normalize(raw)
+        except ValueError as e:
+            errors.append(f"{LABELS[field]} : {e}")
+            continue
+        if values[field] is None and field in entity.required:
+            errors.append(f"{LABELS[field]} obligatoire")
+    return values, errors
+
+
+def _in_clause(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _resolve_teachers(cursor, chunk, report):
+    """Cours : remplace teacher_email par teacher_id ; email inconnu = ligne rejetée."""
+    emails = sorted({v["teacher_email"] for _, v in chunk if v["teacher_email"]})
+    ids = {}
+    if emails:
+        cursor.execute(
+            f"SELECT id, email FROM teachers WHERE email IN ({_in_clause(emails)}) ORDER BY id",
+            tuple(emails),
+        )
+        for r in cursor.fetchall():
+            ids.setdefault(r["email"].casefold(), r["id"])
+    resolved = []
+    for line, values in chunk:
+        email = values.pop("teacher_email")
+        if email and email.casefold() not in ids:
+            report.add_error(line, values["code"], f"enseignant inconnu : {email}")
+            continue
+        values["teacher_id"] = ids.get(email.casefold()) if email else None
+        resolved.append((line, values))
+    return resolved
+
+
+def _same(a, b):
+    return (a if a not in ("", None) else None) == (b if b not in ("", None) else None)
+
+
+def _apply_chunk(cursor, entity, chunk, report, dry_run):
+    """Compare un paquet à l'existant et écrit les lignes nouvelles ou modifiées."""
+    if entity.table == "courses":
+        chunk = _resolve_teachers(cursor, chunk, report)
+    if not chunk:
+        return
+    keys = [values[entity.key] for _, values in chunk]
+    cursor.execute(
+        f"SELECT id, {', '.join(entity.columns)} FROM {entity.table} "
+        f"WHERE {entity.key} IN ({_in_clause(keys)}) ORDER BY id",
+        tuple(keys),
+    )
+    existing = {}
+    for r in cursor.fetchall():
+        existing.setdefault(r[entity.key].casefold(), r)
+
+    inserts, updates = [], []
+    for _line, values in chunk:
+        row = tuple(values[c] for c in entity.columns)
+        current = existing.get(values[entity.key].casefold())
+        if current is None:
+            inserts.append(row)
+        elif all(_same(current[c], values[c]) for c in entity.columns):
+            report.unchanged += 1
+        else:
+            updates.append(row + (current["id"],))
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+    if dry_run:
+        return
+    if inserts:
+        cursor.executemany(
+            f"INSERT INTO {entity.table} ({', '.join(entity.columns)}) "
+            f"VALUES ({_in_clause(entity.columns)})",
+            inserts,
+        )
+    if updates:
+        cursor.executemany(
+            f"UPDATE {entity.table} SET {', '.join(c + ' = %s' for c in entity.columns)} WHERE id = %s",
+            updates,
+        )
+
+
+def _sniff_delimiter(first_line):
+    return ";" if first_line.count(";") >= first_line.count(",") else ","
+
+
+def import_csv(path, entity, dry_run=False, progress=None, cancel=None, chunk_size=CHUNK_SIZE, **options):
+    """
+    Importe le fichier path dans la table de entity ("students", "teachers",
+    "courses", ou "grades" avec academic_year et semester dans options).
+    dry_run : tout est validé et comparé, rien n'est écrit.
+    progress(n) reçoit le nombre de lignes lues ; cancel (threading.Event)
+    annule l'import. Retourne un ImportReport.
+    """
+    if entity == "grades":
+        return import_grades(path, dry_run=dry_run, progress=progress, cancel=cancel, **options)
+    spec = ENTITIES[entity]
+    report = ImportReport(entity, dry_run)
+    seen = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        delimiter = _sniff_delimiter(f.readline())
+        f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if not header:
+            raise ValueError("Fichier vide.")
+        mapping = _map_header(spec, header)
+        with transaction() as cursor:
+            chunk = []
+            for row in reader:
+                if not any(cell.strip() for cell in row):
+                    continue
+                report.read += 1
+                line = reader.line_num
+                values, errors = _normalize_row(spec, mapping, row)
+                key = values.get(spec.key)
+                if not errors:
+                    first = seen.setdefault(key.casefold(), line)
+                    if first != line:
+                        errors.append(f"{LABELS[spec.key]} en double dans le fichier (ligne {first})")
+                if errors:
+                    report.add_error(line, key, " ; ".join(errors))
+                    continue
+                chunk.append((line, values))
+                if len(chunk) >= chunk_size:
+                    _apply_chunk(cursor, spec, chunk, report, dry_run)
+                    chunk = []
+                    if cancel is not None and cancel.is_set():
+                        raise ImportCancelled()
+                    if progress is not None:
+                        progress(report.read)
+            if chunk:
+                _apply_chunk(cursor, spec, chunk, report, dry_run)
+            if not dry_run and (report.inserted or report.updated):
+                bump_versions(cursor, spec.table)
+    if not dry_run and (report.inserted or report.updated):
+        publish(spec.table)
+    if progress is not None:
+        progress(report.read)
+    return report
+
+
+# --- Notes
+
+
+GRADE_ALIASES = {
+    _header_key(name): field
+    for field, names in {
+        "matricule": ("matricule",),
+        "code": ("code", "code_cours", "cours", "course_code"),
+        "grade": ("note", "grade"),
+    }.items()
+    for name in names
+}
+LOOKUP_CHUNK = 1000
+
+
+class GradeImportReport(ImportReport):
+    """Rapport d'import de notes, avec le statut de chaque ligne du fichier."""
+
+    def __init__(self, dry_run):
+        super().__init__("grades", dry_run)
+        self.results = []  # (ligne, matricule, code, note, statut)
+
+    def write_results(self, path):
+        """Écrit une ligne de résultat par ligne importée (ligne;matricule;code;note;statut)."""
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(("ligne", "matricule", "code", "note", "statut"))
+            writer.writerows(self.results)
+        return path
+
+
+def _grade(value):
+    value = value.strip().replace(",", ".")
+    if not value:
+        raise ValueError("note vide")
+    try:
+        grade = round(float(value), 2)
+    except ValueError:
+        raise ValueError("nombre attendu") from None
+    if not 0 <= grade <= 20:
+        raise ValueError("doit être entre 0 et 20")
+    return grade
+
+
+def _select_in(cursor, query, values, params=()):
+    """Exécute query (contenant {in}) par paquets de LOOKUP_CHUNK valeurs ; retourne toutes les lignes."""
+    values = list(values)
+    rows = []
+    for i in range(0, len(values), LOOKUP_CHUNK):
+        part = values[i:i + LOOKUP_CHUNK]
+        cursor.execute(query.format(**{"in": _in_clause(part)}), (*params, *part))
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def import_grades(path, academic_year, semester, dry_run=False, progress=None, cancel=None):
+    """
+    Importe un fichier matricule;code;note pour academic_year / semester.
+    Chaque ligne doit désigner un étudiant inscrit sur la période dans une
+    classe à laquelle le cours est attribué. Les notes valides sont écrites
+    ensemble (rien si dry_run). Retourne un GradeImportReport.
+    """
+    report = GradeImportReport(dry_run)
+    parsed = []  # (ligne, matricule, code, note, texte de la note)
+    seen = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        delimiter = _sniff_delimiter(f.readline())
+        f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if not header:
+            raise ValueError("Fichier vide.")
+        mapping = {}
+        for index, name in enumerate(header):
+            field = GRADE_ALIASES.get(_header_key(name))
+            if field and field not in mapping:
+                mapping[field] = index
+        missing = [LABELS[f] for f in ("matricule", "code", "grade") if f not in mapping]
+        if missing:
+            raise ValueError("Colonnes obligatoires manquantes : " + ", ".join(missing))
+
+        def cell(row, field):
+            index = mapping[field]
+            return row[index] if index < len(row) else ""
+
+        for row in reader:
+            if not any(c.strip() for c in row):
+                continue
+            report.read += 1
+            line = reader.line_num
+            matricule = cell(row, "matricule").strip().upper()
+            code = cell(row, "code").strip().upper()
+            raw_grade = cell(row, "grade").strip()
+            errors = []
+            if not matricule:
+                errors.append("matricule obligatoire")
+            if not code:
+                errors.append("code obligatoire")
+            try:
+                grade = _grade(raw_grade)
+            except ValueError as e:
+                errors.append(f"note : {e}")
+                grade = None
+            if not errors:
+                first = seen.setdefault((matricule.casefold(), code.casefold()), line)
+                if first != line:
+                    errors.append(f"note en double dans le fichier (ligne {first})")
+            if errors:
+                message = " ; ".join(errors)
+                report.add_error(line, f"{matricule}/{code}", message)
+                report.results.append((line, matricule, code, raw_grade, "rejetée : " + message))
+                continue
+            parsed.append((line, matricule, code, grade, raw_grade))
+            if progress is not None and report.read % CHUNK_SIZE == 0:
+                progress(report.read)
+            if cancel is not None and cancel.is_set():
+                raise ImportCancelled()
+
+    with transaction() as cursor:
+        students = {
+            r["matricule"].casefold(): r["id"]
+            for r in _select_in(cursor, "SELECT id, matricule FROM students WHERE matricule IN ({in})", {p[1] for p in parsed})
+        }
+        courses = {
+            r["code"].casefold(): r["id"]
+            for r in _select_in(cursor, "SELECT id, code FROM courses WHERE code IN ({in})", {p[2] for p in parsed})
+        }
+        enrollments = {}  # student_id -> [(enrollment_id, class_id)]
+        for r in _select_in(
+            cursor,
+            "SELECT id, student_id, class_id FROM enrollments WHERE academic_year = %s AND semester = %s AND student_id IN ({in})",
+            set(students.values()),
+            (academic_year, semester),
+        ):
+            enrollments.setdefault(r["student_id"], []).append((r["id"], r["class_id"]))
+        class_ids = {cl for pairs in enrollments.values() for _e, cl in pairs}
+        class_courses = {
+            (r["class_id"], r["course_id"])
+            for r in _select_in(
+                cursor,
+                "SELECT class_id, course_id FROM class_courses WHERE class_id IN ({in})",
+                class_ids,
+            )
+        }
+        existing = {
+            (r["enrollment_id"], r["course_id"]): r["grade"]
+            for r in _select_in(
+                cursor,
+                "SELECT enrollment_id, course_id, grade FROM grades WHERE enrollment_id IN ({in}) FOR UPDATE",
+                {e for pairs in enrollments.values() for e, _cl in pairs},
+            )
+        }
+
+        class_of = {e: cl for pairs in enrollments.values() for e, cl in pairs}
+
+        upserts = []
+        changes = []  # (inscription, cours, classe, ancienne note, nouvelle) pour grade_aggregates
+        for line, matricule, code, grade, raw_grade in parsed:
+            student_id = students.get(matricule.casefold())
+            course_id = courses.get(code.casefold())
+            if student_id is None:
+                error = "matricule inconnu"
+            elif course_id is None:
+                error = "code de cours inconnu"
+            elif student_id not in enrollments:
+                error = f"étudiant non inscrit en {academic_year} {semester}"
+            else:
+                matches = [e for e, cl in enrollments[student_id] if (cl, course_id) in class_courses]
+                error = None
+                if not matches:
+                    error = "cours non attribué à la classe de l'étudiant"
+                elif len(matches) > 1:
+                    error = "cours présent dans plusieurs classes de l'étudiant"
+            if error:
+                report.add_error(line, f"{matricule}/{code}", error)
+                report.results.append((line, matricule, code, raw_grade, "rejetée : " + error))
+                continue
+            key = (matches[0], course_id)
+            if key not in existing:
+                status = "à créer" if dry_run else "créée"
+                report.inserted += 1
+            elif existing[key] is not None and float(existing[key]) == grade:
+                report.unchanged += 1
+                report.results.append((line, matricule, code, raw_grade, "inchangée"))
+                continue
+            else:
+                status = "à modifier" if dry_run else "modifiée"
+                report.updated += 1
+            upserts.append((matches[0], course_id, grade))
+            changes.append((matches[0], course_id, class_of[matches[0]], existing.get(key, ABSENT), grade))
+            report.results.append((line, matricule, code, raw_grade, status))
+
+        if cancel is not None and cancel.is_set():
+            raise ImportCancelled()
+        if upserts and not dry_run:
+            cursor.executemany(
+                """
+                INSERT INTO grades (enrollment_id, course_id, grade) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE grade = VALUES(grade)
+                """,
+                upserts,
+            )
+            apply_changes(cursor, changes)
+            bump_versions(cursor, "grades")
+    report.results.sort(key=lambda r: r[0])
+    if upserts and not dry_run:
+        publish("grades")
+    if progress is not None:
+        progress(report.read)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("entity", choices=sorted([*ENTITIES, "grades"]), help="Type de données importées.")
+    parser.add_argument("path", help="Fichier CSV (séparateur ; ou ,).")
+    parser.add_argument("--dry-run", action="store_true", help="Valide et compare sans rien écrire.")
+    parser.add_argument("--errors", help="Écrit les lignes rejetées dans ce fichier CSV.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--year", help="Notes : année académique (ex. 2024-2025).")
+    parser.add_argument("--semester", choices=["S1", "S2"], help="Notes : semestre.")
+    parser.add_argument("--results", help="Notes : écrit le statut de chaque ligne dans ce fichier CSV.")
+    args = parser.parse_args()
+    options = {}
+    if args.entity == "grades":
+        if not args.year or not args.semester:
+            parser.error("--year et --semester sont obligatoires pour les notes.")
+        options = {"academic_year": args.year, "semester": args.semester}
+
+    def _progress(n):
+        print(f"\r{n} lignes lues…", end="", file=sys.stderr, flush=True)
+
+    report = import_csv(
+        args.path, args.entity, dry_run=args.dry_run, progress=_progress, chunk_size=args.chunk_size, **options
+    )
+    print(file=sys.stderr)
+    print(report.summary())
+    for line, key, message in report.errors[:20]:
+        print(f"  ligne {line} ({key}) : {message}")
+    if len(report.errors) > 20:
+        print(f"  … {len(report.errors) - 20} autres erreurs")
+    if args.errors and report.errors:
+        report.write_errors(args.errors)
+        print(f"Rapport d'erreurs : {args.errors}")
+    if args.results and args.entity == "grades":
+        report.write_results(args.results)
+        print(f"Résultats par ligne : {args.results}")
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
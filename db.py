@@ -1,17 +1,40 @@
-import mysql.connector
-from mysql.connector import Error
+import threading
+from contextlib import contextmanager
 
-from config import DB_CONFIG
+from config import APP_CONFIG, DB_CONFIG
+
+
+# Taille maximale des listes « IN (...) » envoyées en une requête
+IN_CHUNK_SIZE = 1000
+
+# Connexions gardées ouvertes pour les lectures parallèles (voir fetch.py)
+POOL_SIZE = 5
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Actions à exécuter après la validation du bloc transaction() en cours, par thread
+_tx = threading.local()
 
 
 def get_connection():
     """Retourne une connexion MySQL ou lève une exception claire."""
+    # Import différé : le pilote n'est chargé qu'à la première connexion,
+    # pas au démarrage de l'interface.
+    import mysql.connector
+    from mysql.connector import Error
+
+    options = {}
+    if APP_CONFIG["replica_enabled"]:
+        # Avec la réplique locale, un serveur injoignable doit être détecté vite
+        options["connection_timeout"] = APP_CONFIG["replica_connect_timeout"]
     try:
         conn = mysql.connector.connect(
             host=DB_CONFIG["host"],
             user=DB_CONFIG["user"],
             password=DB_CONFIG["password"],
             database=DB_CONFIG["database"],
+            **options,
         )
         if not conn.is_connected():
             raise Error("Connexion MySQL échouée.")
@@ -20,17 +43,89 @@ def get_connection():
         raise RuntimeError(f"Erreur de connexion MySQL: {e}") from e
 
 
-def execute_query(query, params=None, fetchone=False, fetchall=False, commit=False):
+def get_pooled_connection():
+    """
+    Retourne une connexion du pool partagé (créé au premier appel, POOL_SIZE
+    connexions). close() la rend au pool au lieu de la fermer. Lève
+    RuntimeError si le pool est épuisé : seuls les POOL_SIZE threads de
+    fetch._executor l'utilisent, chacun ne tenant qu'une connexion.
+    """
+    global _pool
+    from mysql.connector import Error, pooling
+
+    try:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(pool_name="university", pool_size=POOL_SIZE, **DB_CONFIG)
+        return _pool.get_connection()
+    except Error as e:
+        raise RuntimeError(f"Erreur de connexion MySQL: {e}") from e
+
+
+def _replica():
+    """Module replica si la réplique locale est activée, sinon None (import différé)."""
+    if not APP_CONFIG["replica_enabled"]:
+        return None
+    import replica
+
+    return replica
+
+
+def offline_replica():
+    """
+    Module replica si la réplique locale est activée et le serveur injoignable :
+    les modèles y mettent alors leurs écritures en file. Sinon None.
+    """
+    replica = _replica()
+    return replica if replica is not None and replica.is_offline() else None
+
+
+def serves_locally(query):
+    """True si la lecture query est servie par la réplique locale (voir replica.serves)."""
+    replica = _replica()
+    return replica is not None and replica.serves(query)
+
+
+def warm_up_connection():
+    """Ouvre puis ferme une connexion : charge le pilote et valide l'accès au serveur."""
+    get_connection().close()
+
+
+def execute_query(query, params=None, fetchone=False, fetchall=False, commit=False, lastrowid=False, cache=None):
     """
     Utilitaire générique pour exécuter une requête.
     - params : tuple ou dict de paramètres
     - fetchone / fetchall : contrôle du retour
     - commit : si True, commit la transaction
+    - lastrowid : si True, retourne l'id AUTO_INCREMENT généré par un INSERT
+    - cache : tables lues par une requête de lecture ; le résultat est alors
+      gardé dans query_cache et invalidé par les écritures sur ces tables
+    Avec la réplique locale (replica.py), les lectures des tables répliquées
+    lui sont envoyées hors connexion (ou toujours, selon replica_reads).
     """
+    replica = _replica()
+    if replica is not None and not commit and not lastrowid and replica.serves(query):
+        return replica.query(query, params, fetchone=fetchone, fetchall=fetchall)
+
+    if cache and not commit and not lastrowid:
+        from query_cache import cached
+
+        if isinstance(params, dict):
+            key_params = tuple(sorted(params.items()))
+        else:
+            key_params = tuple(params or ())
+        key = (query, key_params, "one" if fetchone else "all" if fetchall else "none")
+        return cached(key, cache, lambda: execute_query(query, params, fetchone=fetchone, fetchall=fetchall))
+
     conn = None
     cursor = None
     try:
-        conn = get_connection()
+        try:
+            conn = get_connection()
+        except RuntimeError as e:
+            if replica is not None:
+                replica.set_offline(e)
+            raise
         cursor = conn.cursor(dictionary=True)
         cursor.execute(query, params or ())
 
@@ -39,6 +134,8 @@ def execute_query(query, params=None, fetchone=False, fetchall=False, commit=Fal
             result = cursor.fetchone()
         elif fetchall:
             result = cursor.fetchall()
+        elif lastrowid:
+            result = cursor.lastrowid
 
         if commit:
             conn.commit()
@@ -50,3 +147,88 @@ def execute_query(query, params=None, fetchone=False, fetchall=False, commit=Fal
         if conn is not None and conn.is_connected():
             conn.close()
 
+
+@contextmanager
+def transaction(commit=True):
+    """
+    Ouvre une connexion et fournit un curseur (dict) : toutes les requêtes
+    exécutées dans le bloc sont validées ensemble, ou annulées si une
+    exception survient. Avec commit=False, tout est annulé en fin de bloc
+    (simulation : les compteurs sont exacts mais rien n'est écrit).
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    outer, _tx.hooks = getattr(_tx, "hooks", None), []
+    try:
+        yield cursor
+        if commit:
+            conn.commit()
+            for hook in _tx.hooks:
+                hook()
+        else:
+            conn.rollback()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _tx.hooks = outer
+        cursor.close()
+        if conn.is_connected():
+            conn.close()
+
+
+def in_transaction():
+    """True si un bloc transaction() est ouvert sur le thread courant."""
+    return getattr(_tx, "hooks", None) is not None
+
+
+def on_commit(func):
+    """Appelle func() après la validation du bloc transaction() ouvert sur ce thread (jamais s'il est annulé)."""
+    _tx.hooks.append(func)
+
+
+def execute_in(cursor, query, ids, params=(), chunk_size=IN_CHUNK_SIZE):
+    """
+    Exécute query pour une liste d'ids, par paquets de chunk_size : « {ids} »
+    dans query est remplacé par les marqueurs du paquet, placés après params.
+    Retourne le nombre total de lignes affectées.
+    """
+    ids = list(ids)
+    total = 0
+    for i in range(0, len(ids), chunk_size):
+        part = ids[i:i + chunk_size]
+        cursor.execute(query.format(ids=", ".join(["%s"] * len(part))), (*params, *part))
+        total += max(cursor.rowcount, 0)
+    return total
+
+
+def iter_query(query, params=None, batch_size=1000):
+    """
+    Itère sur les lignes (dict) d'une requête sans tout charger en mémoire :
+    curseur non bufferisé lu par paquets de batch_size. La connexion est fermée
+    à la fin de l'itération (ou si le générateur est abandonné).
+    """
+    conn = get_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        cursor.execute(query, params or ())
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from batch
+    finally:
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass  # résultat non entièrement lu (itération interrompue)
+        if conn.is_connected():
+            conn.close()
+
+
+def like_prefix(text):
+    """Motif LIKE « commence par text », les jokers % et _ saisis étant échappés."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
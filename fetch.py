@@ -0,0 +1,90 @@
+"""
+Lecture groupée de plusieurs jeux de données (archives, tableau de bord).
+
+fetch_all() exécute un groupe de requêtes en lecture :
+- par défaut en parallèle, chacune sur une connexion du pool (db.POOL_SIZE) :
+  la durée totale est celle de la requête la plus lente, pas la somme ;
+- avec consistent=True, l'une après l'autre sur une seule connexion, dans une
+  transaction START TRANSACTION WITH CONSISTENT SNAPSHOT : tous les résultats
+  reflètent le même état de la base, même si des notes sont saisies pendant
+  la lecture.
+
+Chaque requête est un tuple (sql, params) — le format des *_query() des
+modèles — ou (sql, params, "one") pour ne lire qu'une ligne.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from db import POOL_SIZE, execute_query, get_pooled_connection, serves_locally
+
+
+# Un thread par connexion du pool : un thread ne tient jamais plus d'une connexion.
+_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="fetch")
+
+
+def fetch_all(queries, consistent=False):
+    """
+    queries : {nom: (sql, params[, "one"])}. Retourne {nom: lignes} (ou une
+    ligne / None pour "one"). À appeler hors du thread Tk (run_in_background),
+    et jamais depuis une tâche de fetch_all elle-même.
+    """
+    queries = dict(queries)
+    if not queries:
+        return {}
+    if all(serves_locally(spec[0]) for spec in queries.values()):
+        # Réplique locale (replica.py) : lectures locales, sans passer par le pool
+        return {name: _run_local(spec) for name, spec in queries.items()}
+    if consistent or len(queries) == 1:
+        # Sur un thread du pool aussi : seuls les POOL_SIZE threads de _executor tiennent des connexions
+        return _executor.submit(_fetch_in_snapshot, queries, consistent).result()
+    futures = {name: _executor.submit(_fetch_one, spec) for name, spec in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def fetch_scalar(row, key, default=0):
+    """Valeur d'une colonne d'un résultat "one" (compteurs), default si aucune ligne."""
+    return row[key] if row and row[key] is not None else default
+
+
+def _run(cursor, spec):
+    query, params = spec[0], spec[1]
+    mode = spec[2] if len(spec) > 2 else "all"
+    cursor.execute(query, params or ())
+    if mode == "one":
+        row = cursor.fetchone()
+        cursor.fetchall()  # vide le reste du résultat avant la requête suivante
+        return row
+    return cursor.fetchall()
+
+
+def _run_local(spec):
+    mode = spec[2] if len(spec) > 2 else "all"
+    return execute_query(spec[0], spec[1], fetchone=mode == "one", fetchall=mode != "one")
+
+
+def _fetch_one(spec):
+    conn = get_pooled_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            return _run(cursor, spec)
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+
+
+def _fetch_in_snapshot(queries, snapshot):
+    conn = get_pooled_connection()
+    try:
+        if snapshot:
+            conn.start_transaction(consistent_snapshot=True, isolation_level="REPEATABLE READ", readonly=True)
+        cursor = conn.cursor(dictionary=True)
+        try:
+            return {name: _run(cursor, spec) for name, spec in queries.items()}
+        finally:
+            cursor.close()
+            if snapshot:
+                conn.rollback()
+    finally:
+        conn.close()
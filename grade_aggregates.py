@@ -0,0 +1,273 @@
+"""
+Agrégats des notes tenus à jour à chaque écriture, pour lire moyennes et
+écarts types sans parcourir la table grades.
+
+grade_aggregates porte une ligne par portée : l'ensemble des notes
+("all", 0), un cours, une classe (celle de l'inscription) ou une inscription.
+Chaque ligne compte les notes (grades_count, notes vides comprises), les
+notes saisies (n), leur somme (total) et la somme de leurs carrés
+(total_sq), en DECIMAL : les sommes sont exactes et se comparent à l'égalité
+avec une reconstruction.
+
+Les fonctions d'écriture des modèles appliquent, dans leur transaction, la
+différence entre ancienne et nouvelle note (apply_changes) ; les suppressions
+retirent les notes supprimées, y compris en cascade (remove_grades) : les
+clés étrangères ON DELETE CASCADE ne déclenchent pas de trigger, la mise à
+jour se fait donc côté application, comme record_deletes.
+
+python grade_aggregates.py --verify recalcule les agrégats depuis grades et
+signale les écarts ; --rebuild les remplace par le recalcul.
+"""
+
+import argparse
+import math
+from decimal import ROUND_HALF_UP, Decimal
+
+from db import IN_CHUNK_SIZE, execute_query, serves_locally, transaction
+
+
+SCOPES = ("all", "course", "class", "enrollment")
+ABSENT = object()  # pas de ligne dans grades (différent de None : note vide)
+
+_CENT = Decimal("0.01")
+_ZERO = Decimal(0)
+_COLUMNS = ("grades_count", "n", "total", "total_sq")
+
+# Clé de chaque portée, sur grades g JOIN enrollments e
+_SCOPE_KEYS = {"all": "0", "course": "g.course_id", "class": "e.class_id", "enrollment": "g.enrollment_id"}
+
+# Notes supprimées avec les lignes d'une table (y compris en cascade) : condition sur les ids
+_REMOVALS = {
+    "grades": "g.id IN ({ids})",
+    "enrollments": "g.enrollment_id IN ({ids})",
+    "students": "e.student_id IN ({ids})",
+    "classes": "e.class_id IN ({ids})",
+    "courses": "g.course_id IN ({ids})",
+}
+
+_AVERAGE_SCAN = "SELECT AVG(grade) AS avg_grade FROM grades WHERE grade IS NOT NULL"
+
+_UPSERT = """
+    INSERT INTO grade_aggregates (scope, scope_id, grades_count, n, total, total_sq)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE grades_count = grades_count + VALUES(grades_count), n = n + VALUES(n),
+                            total = total + VALUES(total), total_sq = total_sq + VALUES(total_sq)
+"""
+
+
+def _decimal(value):
+    """Note telle que stockée par MySQL (DECIMAL(4,2), arrondi au centième)."""
+    return Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def apply_changes(cursor, changes):
+    """
+    À appeler dans la transaction de l'écriture. changes : itérable de tuples
+    (enrollment_id, course_id, class_id, ancienne, nouvelle), chaque note
+    valant ABSENT (pas de ligne), None (note vide) ou un nombre.
+    """
+    deltas = {}
+    for enrollment_id, course_id, class_id, old, new in changes:
+        delta = [0, 0, _ZERO, _ZERO]
+        for value, sign in ((old, -1), (new, 1)):
+            if value is ABSENT:
+                continue
+            delta[0] += sign
+            if value is not None:
+                v = _decimal(value)
+                delta[1] += sign
+                delta[2] += sign * v
+                delta[3] += sign * v * v
+        if not any(delta):
+            continue
+        for key in (("all", 0), ("course", course_id), ("class", class_id), ("enrollment", enrollment_id)):
+            total = deltas.setdefault(key, [0, 0, _ZERO, _ZERO])
+            for i, d in enumerate(delta):
+                total[i] += d
+    rows = [(scope, scope_id, *d) for (scope, scope_id), d in deltas.items() if any(d)]
+    if not rows:
+        return
+    cursor.executemany(_UPSERT, rows)
+    # Portées vidées (notes supprimées) : la ligne disparaît, comme après une reconstruction
+    emptied = [(scope, scope_id) for scope, scope_id, count, *_rest in rows if count < 0]
+    if emptied:
+        cursor.executemany(
+            "DELETE FROM grade_aggregates WHERE scope = %s AND scope_id = %s AND grades_count = 0", emptied
+        )
+
+
+def current_grades(cursor, course_id, enrollment_ids):
+    """
+    Verrouille (FOR UPDATE) et lit les notes d'un cours pour des inscriptions
+    avant leur écriture : {enrollment_id: (class_id, grade_id ou None, note ou ABSENT)}.
+    Les inscriptions inexistantes sont absentes du résultat.
+    """
+    ids = sorted(set(enrollment_ids))
+    found = {}
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        part = ids[i:i + IN_CHUNK_SIZE]
+        cursor.execute(
+            f"""
+            SELECT e.id AS enrollment_id, e.class_id, g.id AS grade_id, g.grade
+            FROM enrollments e
+            LEFT JOIN grades g ON g.enrollment_id = e.id AND g.course_id = %s
+            WHERE e.id IN ({", ".join(["%s"] * len(part))})
+            FOR UPDATE
+            """,
+            (course_id, *part),
+        )
+        for r in cursor.fetchall():
+            grade = r["grade"] if r["grade_id"] is not None else ABSENT
+            found[r["enrollment_id"]] = (r["class_id"], r["grade_id"], grade)
+    return found
+
+
+def remove_grades(cursor, table, ids):
+    """
+    À appeler dans la transaction, juste avant DELETE FROM table WHERE id IN (ids) :
+    retire des agrégats les notes supprimées avec ces lignes.
+    """
+    condition = _REMOVALS[table]
+    ids = list(ids)
+    changes = []
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        part = ids[i:i + IN_CHUNK_SIZE]
+        cursor.execute(
+            "SELECT g.enrollment_id, g.course_id, e.class_id, g.grade "
+            "FROM grades g JOIN enrollments e ON e.id = g.enrollment_id "
+            "WHERE " + condition.format(ids=", ".join(["%s"] * len(part))),
+            tuple(part),
+        )
+        changes.extend(
+            (r["enrollment_id"], r["course_id"], r["class_id"], r["grade"], ABSENT) for r in cursor.fetchall()
+        )
+    apply_changes(cursor, changes)
+
+
+# --- Lecture
+
+
+def _describe(row):
+    """Moyenne et écart type (échantillon) d'une ligne d'agrégats."""
+    if row is None:
+        return {"grades_count": 0, "count": 0, "mean": None, "stdev": None}
+    n, total, total_sq = int(row["n"]), Decimal(row["total"]), Decimal(row["total_sq"])
+    stats = {"grades_count": int(row["grades_count"]), "count": n, "mean": None, "stdev": None}
+    if n:
+        stats["mean"] = float(total / n)
+    if n > 1:
+        stats["stdev"] = math.sqrt(max(float((total_sq - total * total / n) / (n - 1)), 0.0))
+    return stats
+
+
+def average_query():
+    """
+    Requête (sql, params) de la moyenne générale, colonne avg_grade : une ligne
+    de grade_aggregates ; AVG sur grades si la lecture est servie par la
+    réplique locale, qui n'a pas cette table.
+    """
+    if serves_locally(_AVERAGE_SCAN):
+        return _AVERAGE_SCAN, ()
+    return "SELECT total / NULLIF(n, 0) AS avg_grade FROM grade_aggregates WHERE scope = 'all' AND scope_id = 0", ()
+
+
+def get_aggregates(scope):
+    """
+    Statistiques de toutes les lignes d'une portée (une ligne par classe, cours
+    ou inscription) : {scope_id: {grades_count, count, mean, stdev}}.
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"Portée inconnue : {scope!r}")
+    rows = execute_query(
+        "SELECT scope_id, grades_count, n, total, total_sq FROM grade_aggregates WHERE scope = %s",
+        params=(scope,),
+        fetchall=True,
+    ) or []
+    return {r["scope_id"]: _describe(r) for r in rows}
+
+
+# --- Reconstruction et vérification
+
+
+def _recompute(cursor):
+    """Agrégats recalculés depuis grades : {(scope, scope_id): (grades_count, n, total, total_sq)}."""
+    parts = [
+        f"SELECT '{scope}' AS scope, {key} AS scope_id, COUNT(*) AS grades_count, COUNT(g.grade) AS n, "
+        f"COALESCE(SUM(g.grade), 0) AS total, COALESCE(SUM(g.grade * g.grade), 0) AS total_sq "
+        f"FROM grades g JOIN enrollments e ON e.id = g.enrollment_id GROUP BY {key}"
+        for scope, key in _SCOPE_KEYS.items()
+    ]
+    cursor.execute(" UNION ALL ".join(parts))
+    return {
+        (r["scope"], int(r["scope_id"])): tuple((int(r[c]) if i < 2 else Decimal(r[c])) for i, c in enumerate(_COLUMNS))
+        for r in cursor.fetchall()
+    }
+
+
+def _stored(cursor):
+    cursor.execute("SELECT scope, scope_id, grades_count, n, total, total_sq FROM grade_aggregates")
+    return {
+        (r["scope"], int(r["scope_id"])): (int(r["grades_count"]), int(r["n"]), Decimal(r["total"]), Decimal(r["total_sq"]))
+        for r in cursor.fetchall()
+    }
+
+
+def verify():
+    """
+    Compare les agrégats tenus à jour à un recalcul complet, dans un même
+    instantané. Retourne les écarts : [(scope, scope_id, stocké, recalculé)],
+    None pour une ligne manquante.
+    """
+    with transaction(commit=False) as cursor:
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        expected = _recompute(cursor)
+        stored = _stored(cursor)
+    return [
+        (scope, scope_id, stored.get((scope, scope_id)), expected.get((scope, scope_id)))
+        for scope, scope_id in sorted(expected.keys() | stored.keys())
+        if stored.get((scope, scope_id)) != expected.get((scope, scope_id))
+    ]
+
+
+def rebuild(cursor=None):
+    """Remplace les agrégats par un recalcul complet depuis grades. Retourne le nombre de lignes écrites."""
+    if cursor is None:
+        with transaction() as cursor:
+            return rebuild(cursor)
+    # Verrouille grades le temps du recalcul : aucune écriture ne se perd entre lecture et remplacement
+    cursor.execute("SELECT COUNT(*) AS cnt FROM grades FOR UPDATE")
+    cursor.fetchall()
+    expected = _recompute(cursor)
+    cursor.execute("DELETE FROM grade_aggregates")
+    rows = [(scope, scope_id, *values) for (scope, scope_id), values in expected.items()]
+    if rows:
+        cursor.executemany(
+            "INSERT INTO grade_aggregates (scope, scope_id, grades_count, n, total, total_sq) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            rows,
+        )
+    return len(rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Vérifie ou reconstruit les agrégats des notes.")
+    parser.add_argument("--rebuild", action="store_true", help="Remplace les agrégats par un recalcul complet.")
+    parser.add_argument("--verify", action="store_true", help="Compare les agrégats à un recalcul (par défaut).")
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"Agrégats reconstruits : {rebuild()} ligne(s).")
+        if not args.verify:
+            return 0
+    mismatches = verify()
+    if not mismatches:
+        print("Agrégats conformes au recalcul.")
+        return 0
+    print(f"{len(mismatches)} écart(s) (portée, id, stocké, recalculé) :")
+    for scope, scope_id, stored, expected in mismatches:
+        print(f"- {scope} {scope_id} : {stored} != {expected}")
+    print("Relancez avec --rebuild pour corriger.")
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
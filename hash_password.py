@@ -1,17 +1,26 @@
-from argon2 import PasswordHasher, exceptions
+_ph = None
 
 
-_ph = PasswordHasher()
+def _hasher():
+    """PasswordHasher Argon2, instancié au premier usage (import différé d'argon2)."""
+    global _ph
+    if _ph is None:
+        from argon2 import PasswordHasher
+
+        _ph = PasswordHasher()
+    return _ph
 
 
 def hash_password(password: str) -> str:
     """Hash Argon2 d'un mot de passe en texte clair."""
-    return _ph.hash(password)
+    return _hasher().hash(password)
 
 
 def verify_password(hashed: str, password: str) -> bool:
     """Vérifie un mot de passe par rapport à un hash Argon2 stocké."""
+    from argon2 import exceptions
+
     try:
-        return _ph.verify(hashed, password)
+        return _hasher().verify(hashed, password)
     except (exceptions.VerifyMismatchError, exceptions.VerificationError, exceptions.InvalidHashError):
         return False
@@ -1,7 +1,7 @@
-from mysql.connector import Error
-
+from change_tracking import TRACKED_TABLES, UPDATED_AT_COLUMN, VERSIONED_TABLES
 from config import DB_CONFIG
 from db import get_connection
+from grade_aggregates import rebuild as rebuild_grade_aggregates
 
 
 def create_database_if_not_exists():
@@ -35,6 +35,32 @@ def create_database_if_not_exists():
                 pass
 
 
+def _ensure_index(cursor, table, name, columns):
+    """Ajoute l'index name sur table(columns) s'il n'existe pas encore."""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """,
+        (table, name),
+    )
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+
+
+def _ensure_column(cursor, table, name, definition):
+    """Ajoute la colonne name à table si elle n'existe pas encore."""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """,
+        (table, name),
+    )
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
 def create_tables():
     """Crée les tables principales nécessaires au système universitaire."""
     conn = None
@@ -66,10 +92,15 @@ def create_tables():
                 last_name VARCHAR(100) NOT NULL,
                 email VARCHAR(150),
                 phone VARCHAR(50),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_students_name (last_name, first_name),
+                INDEX idx_students_first_name (first_name)
             )
             """
         )
+        # Bases créées avant ces index (recherche par préfixe des sélecteurs)
+        _ensure_index(cursor, "students", "idx_students_name", "last_name, first_name")
+        _ensure_index(cursor, "students", "idx_students_first_name", "first_name")
 
         # Professeurs
         cursor.execute(
@@ -166,7 +197,57 @@ def create_tables():
             """
         )
 
+        # Suivi des modifications (change_tracking.py) : date de dernière écriture
+        # de chaque ligne, et lignes supprimées pour les rafraîchissements incrémentaux.
+        for table in TRACKED_TABLES:
+            _ensure_column(cursor, table, "updated_at", UPDATED_AT_COLUMN)
+            _ensure_index(cursor, table, f"idx_{table}_updated_at", "updated_at")
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS deleted_rows (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                table_name VARCHAR(32) NOT NULL,
+                row_id INT NOT NULL,
+                deleted_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+                INDEX idx_deleted_rows_table (table_name, deleted_at)
+            )
+            """
+        )
+
+        # Compteurs de version par table, incrémentés une fois par transaction
+        # d'écriture (change_tracking.bump_versions) : les postes clients les
+        # scrutent pour actualiser leurs écrans.
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS table_versions (
+                table_name VARCHAR(32) PRIMARY KEY,
+                version BIGINT UNSIGNED NOT NULL DEFAULT 0
+            )
+            """
+        )
+        cursor.executemany(
+            "INSERT IGNORE INTO table_versions (table_name) VALUES (%s)", [(t,) for t in VERSIONED_TABLES]
+        )
+
+        # Agrégats des notes (grade_aggregates.py) : effectifs, sommes et sommes des
+        # carrés par portée, tenus à jour par les écritures ; recalculés à chaque
+        # exécution, grades venant d'être recréée ci-dessus.
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS grade_aggregates (
+                scope ENUM('all', 'course', 'class', 'enrollment') NOT NULL,
+                scope_id INT NOT NULL,
+                grades_count INT NOT NULL DEFAULT 0,
+                n INT NOT NULL DEFAULT 0,
+                total DECIMAL(14,2) NOT NULL DEFAULT 0,
+                total_sq DECIMAL(18,4) NOT NULL DEFAULT 0,
+                PRIMARY KEY (scope, scope_id)
+            )
+            """
+        )
+
         conn.commit()
+        rebuild_grade_aggregates()
     finally:
         if cursor is not None:
             cursor.close()
@@ -176,7 +257,10 @@ def create_tables():
 
 def verify_tables():
     """Vérifie que toutes les tables requises existent. Retourne la liste des tables manquantes."""
-    required = ("users", "students", "teachers", "courses", "classes", "class_courses", "enrollments", "grades")
+    required = (
+        "users", "students", "teachers", "courses", "classes", "class_courses", "enrollments", "grades", "deleted_rows",
+        "table_versions", "grade_aggregates",
+    )
     conn = None
     cursor = None
     missing = []
@@ -221,7 +305,7 @@ if __name__ == "__main__":
         print("ATTENTION - Tables manquantes après création :", ", ".join(missing))
         print("Relancez ce script. Si le problème persiste, vérifiez la connexion MySQL et les droits.")
     else:
-        print("Toutes les tables sont présentes : users, students, teachers, courses, classes, class_courses, enrollments, grades.")
+        print("Toutes les tables sont présentes : users, students, teachers, courses, classes, class_courses, enrollments, grades, deleted_rows, table_versions, grade_aggregates.")
     seed_default_data()
     print("Terminé.")
 
@@ -1,123 +1,223 @@
+import time
+
+_T0 = time.perf_counter()
+
+import logging
+from collections import OrderedDict
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
 from tkinter import filedialog
 
 from config import APP_CONFIG
-from models_users import authenticate_user
+from models_users import authenticate_user, create_default_admin_if_not_exists
 from models_students import (
     get_all_students,
-    get_student_count,
+    get_students_changed_since,
     get_student_by_id,
+    search_students,
+    get_student_ids_by_matricules,
     create_student,
     update_student,
-    delete_student,
+    delete_students,
 )
 from models_teachers import (
     get_all_teachers,
-    get_teacher_count,
+    get_teachers_changed_since,
     get_teacher_by_id,
     create_teacher,
     update_teacher,
-    delete_teacher,
+    delete_teachers,
+    set_teachers_department,
 )
 from models_courses import (
-    get_all_courses,
-    get_course_count,
-    get_course_by_id,
+    get_courses_changed_since,
     create_course,
     update_course,
-    delete_course,
+    delete_courses,
+    set_courses_teacher,
 )
 from models_classes import (
-    get_all_classes,
-    get_class_count,
+    get_classes_changed_since,
     get_class_by_id,
-    get_courses_for_class,
+    get_class_row,
     create_class,
     update_class,
-    delete_class,
+    delete_classes,
     set_class_courses,
 )
 from models_enrollments import (
     get_all_enrollments,
+    get_enrollments_changed_since,
+    get_enrollment_rows,
+    bulk_enroll,
+    get_class_student_ids,
+    search_enrollments,
     create_enrollment,
-    delete_enrollment,
-    get_enrollment_count_for_year,
+    delete_enrollments,
     get_enrollments_per_year,
 )
 from models_grades import (
     get_all_grades,
+    get_grades_changed_since,
+    get_class_gradebook,
+    save_grades_batch,
     create_or_update_grade,
-    delete_grade,
-    get_average_grade,
+    delete_grades,
     get_grade_distribution,
     get_bulletin_data,
     get_student_periods,
 )
-from models_archives import (
-    get_available_academic_years,
-    get_enrollments_by_year,
-    get_grades_by_year,
-    get_students_by_year,
-    get_courses_by_year,
-    get_teachers_by_year,
-    get_archive_count,
-)
 from init_db import verify_tables
+from grade_aggregates import get_aggregates
+from background import run_in_background, submit
+from db import offline_replica, warm_up_connection
+from change_events import publish, subscribe, unsubscribe
+from change_tracking import changed_tables, get_table_versions
+from view_cache import ViewCache
+from tree_rows import TreeRows, make_sortable
+import reference_data
+from csv_export import export_dataset
+from widgets import GradeEntryGrid, SearchPicker, VirtualChecklist
 
 
-def _export_treeview_to_csv(tree, filename=None):
-    """Exporte le contenu d'un Treeview en CSV. Retourne le chemin du fichier ou None."""
-    path = filedialog.asksaveasfilename(
-        defaultextension=".csv",
-        filetypes=[("CSV", "*.csv"), ("Tous", "*.*")],
-        initialfile=filename or "export.csv",
-    )
-    if not path:
-        return None
-    cols = [c for c in tree["columns"] if tree.column(c, "width") > 0]
-    rows = []
-    for item in tree.get_children(""):
-        vals = tree.item(item)["values"]
-        col_vals = [str(vals[tree["columns"].index(c)]) if c in tree["columns"] else "" for c in cols]
-        rows.append(";".join(col_vals))
+log = logging.getLogger(__name__)
+
+
+def load_dashboard_stats():
+    """Compteurs du tableau de bord. Sans accès Tk : peut tourner hors du thread principal."""
+    from models_dashboard import get_dashboard_stats
+
+    return get_dashboard_stats("2024-2025")
+
+
+def load_dashboard_charts():
+    """Données des graphiques du tableau de bord (inscriptions par année, répartition des notes)."""
+    years, counts = get_enrollments_per_year()
+    labels, values = get_grade_distribution()
+    return {"years": years, "counts": counts, "labels": labels, "values": values}
+
+
+def warm_reference_data():
+    """Relit l'instantané local des données de référence s'il est à jour (hors du thread Tk)."""
+    t0 = time.perf_counter()
+    tables = reference_data.warm_start()
+    if tables:
+        log.info("Données de référence relues depuis le disque en %.0f ms : %s", (time.perf_counter() - t0) * 1000, ", ".join(tables))
+    return tables
+
+
+def start_replica_sync():
+    """Met à jour la réplique locale puis la synchronise en continu (REPLICA=1, hors du thread Tk)."""
+    import replica
+
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(";".join(cols) + "\n")
-            f.write("\n".join(rows))
-        return path
-    except Exception as e:
-        messagebox.showerror("Erreur", f"Impossible d'exporter : {e}")
-        return None
-
-
-def _make_tree_sortable(tree, columns_with_types=None):
-    """Rend un Treeview triable au clic sur les en-têtes. columns_with_types: {col_id: 'str'|'int'|'float'}."""
-    columns_with_types = columns_with_types or {}
-    sort_state = {}
-
-    def _sort_by_column(col):
-        reverse = sort_state.get(col, False)
-        sort_state[col] = not reverse
-        col_idx = tree["columns"].index(col)
-        data = [(tree.set(k, col), k) for k in tree.get_children("")]
-        conv = columns_with_types.get(col, "str")
-        if conv == "int":
-            data.sort(key=lambda t: (int(t[0]) if str(t[0]).lstrip("-").isdigit() else 0, t[1]), reverse=reverse)
-        elif conv == "float":
-            try:
-                data.sort(key=lambda t: (float(t[0]) if t[0] and t[0] != "-" else -1, t[1]), reverse=reverse)
-            except ValueError:
-                data.sort(key=lambda t: (t[0], t[1]), reverse=reverse)
-        else:
-            data.sort(key=lambda t: (str(t[0]).lower(), t[1]), reverse=reverse)
-        for i, (_, k) in enumerate(data):
-            tree.move(k, "", i)
+        result = replica.sync()
+        log.info("Réplique locale synchronisée : %s", result["tables"] or "à jour")
+    except replica.OfflineError as e:
+        log.warning("Réplique locale non synchronisée : %s", e)
+    replica.start()
+
+
+def run_startup_checks():
+    """
+    Vérifications de démarrage : tables présentes et admin par défaut.
+    Retourne la liste des tables manquantes (vide si tout est en place).
+    """
+    missing = verify_tables()
+    if not missing:
+        create_default_admin_if_not_exists()
+    return missing
+
+
+def authenticate_after_checks(startup_checks, username, password):
+    """
+    Authentifie une fois les vérifications de démarrage terminées : sur une
+    base neuve, l'admin par défaut est créé par run_startup_checks.
+    """
+    if startup_checks is not None:
+        startup_checks.result()
+    return authenticate_user(username, password)
+
+
+def _student_choice(s):
+    return f"{s['matricule']} - {s['last_name']} {s['first_name']}"
+
+
+def _enrollment_choice(e):
+    return f"{e['matricule']} - {e['student_name']} | {e['class_name']} ({e['academic_year']} {e['semester']})"
 
-    for col in tree["columns"]:
-        if tree.column(col, "width") > 0:
-            tree.heading(col, command=lambda c=col: _sort_by_column(c))
+
+def _course_check_items(courses):
+    return [(c["id"], f"{c['code']} - {c['name']}") for c in courses]
+
+
+def _student_values(s):
+    return (s["id"], s["matricule"], s["last_name"], s["first_name"], s["email"] or "", s["phone"] or "")
+
+
+def _teacher_values(t):
+    return (t["id"], t["last_name"], t["first_name"], t["email"] or "", t["department"] or "", t["phone"] or "")
+
+
+def _course_values(c):
+    return (c["id"], c["code"], c["name"], c["credits"], c["teacher_name"] or "Non assigné")
+
+
+def _class_values(cl):
+    return (
+        cl["id"], cl["name"], cl["academic_year"], cl["semester"], cl["courses_count"],
+        _format_stat(cl.get("average")), _format_stat(cl.get("stdev")),
+    )
+
+
+def _format_stat(value):
+    return f"{value:.2f}" if value is not None else ""
+
+
+def _with_class_averages(classes, stats=None):
+    """
+    Ajoute à chaque classe la moyenne (average) et l'écart type (stdev) de ses
+    notes, lus dans grade_aggregates (une ligne par classe, sans parcourir grades).
+    stats : résultat de get_aggregates("class") déjà lu (sinon, lu ici).
+    """
+    if stats is None:
+        try:
+            stats = get_aggregates("class")
+        except Exception as e:
+            log.info("Moyennes des classes indisponibles : %s", e)
+            stats = {}
+    rows = []
+    for cl in classes:
+        row = dict(cl)
+        found = stats.get(cl["id"], {})
+        row["average"], row["stdev"] = found.get("mean"), found.get("stdev")
+        rows.append(row)
+    return rows
+
+
+def _classes_changed_since(token):
+    delta = get_classes_changed_since(token)
+    delta["upserts"] = _with_class_averages(delta["upserts"])
+    return delta
+
+
+def _enrollment_values(e):
+    return (e["id"], e["academic_year"], e["semester"], e["matricule"], e["student_name"], e["class_name"])
+
+
+def _grade_values(g):
+    return (
+        g["id"],
+        g["enrollment_id"],
+        g["course_id"],
+        g["academic_year"],
+        g["semester"],
+        g["student_name"],
+        g["class_name"],
+        g["course_name"],
+        g["grade"] if g["grade"] is not None else "-",
+    )
 
 
 class ModernButton(tk.Button):
@@ -150,9 +250,10 @@ class ModernButton(tk.Button):
 
 
 class LoginFrame(tk.Frame):
-    def __init__(self, master, on_login_success, **kwargs):
+    def __init__(self, master, on_login_success, startup_checks=None, **kwargs):
         super().__init__(master, **kwargs)
         self.on_login_success = on_login_success
+        self.startup_checks = startup_checks  # Future de run_startup_checks, attendu avant l'authentification
         self.configure(bg=APP_CONFIG["bg_color"])
         self._build_ui()
 
@@ -220,6 +321,7 @@ class LoginFrame(tk.Frame):
             text="Se connecter",
             command=self._handle_login,
         )
+        self.login_btn = login_btn
 
         for i in range(7):
             card.grid_rowconfigure(i, pad=6)
@@ -239,18 +341,37 @@ class LoginFrame(tk.Frame):
         if not username or not password:
             messagebox.showwarning("Connexion", "Veuillez saisir vos identifiants.")
             return
-        user = authenticate_user(username, password)
+        # La vérification Argon2 est volontairement coûteuse : hors du thread Tk.
+        self.login_btn.configure(state="disabled", text="Connexion…")
+        run_in_background(
+            self,
+            authenticate_after_checks,
+            self.startup_checks,
+            username,
+            password,
+            on_done=self._on_authenticated,
+            on_error=self._on_authentication_error,
+        )
+
+    def _on_authenticated(self, user):
+        self.login_btn.configure(state="normal", text="Se connecter")
         if not user:
             messagebox.showerror("Connexion", "Identifiants invalides.")
             return
         self.on_login_success(user)
 
+    def _on_authentication_error(self, error):
+        self.login_btn.configure(state="normal", text="Se connecter")
+        messagebox.showerror("Connexion", f"Connexion impossible.\n{error}")
+
 
 class DashboardFrame(tk.Frame):
-    def __init__(self, master, on_logout, current_user, **kwargs):
+    def __init__(self, master, on_logout, current_user, prefetched=None, **kwargs):
         super().__init__(master, **kwargs)
         self.on_logout = on_logout
         self.current_user = current_user
+        # Données chargées pendant la connexion, consommées au premier affichage
+        self._prefetched = dict(prefetched or {})
         self.is_admin = (current_user or {}).get("role") == "admin"
         self.configure(bg=APP_CONFIG["bg_color"])
         self._build_ui()
@@ -317,6 +438,7 @@ class DashboardFrame(tk.Frame):
         add_menu_button("Classes", "classes")
         add_menu_button("Inscriptions", "enrollments")
         add_menu_button("Notes", "grades")
+        add_menu_button("Statistiques", "statistics")
         add_menu_button("Bulletins", "bulletins")
         add_menu_button("Archives", "archives")
 
@@ -349,6 +471,9 @@ class DashboardFrame(tk.Frame):
         )
         self.header_title.grid(row=0, column=0, sticky="w")
         self.header_subtitle.grid(row=1, column=0, sticky="w")
+        # État de la réplique locale (replica.py) : vide tant que le serveur répond
+        self.connection_label = tk.Label(header, text="", bg=bg, fg="#f59e0b", font=("Segoe UI", 9, "bold"))
+        self.connection_label.grid(row=0, column=1, rowspan=2, sticky="e")
 
         # Cartes de stats
         self.cards = tk.Frame(self.main, bg=bg)
@@ -381,28 +506,43 @@ class DashboardFrame(tk.Frame):
         self.avg_grade_card.grid(row=1, column=1, padx=6, pady=4, sticky="nsew")
         self.archives_card.grid(row=1, column=2, padx=6, pady=4, sticky="nsew")
 
-        # Initial load
-        self.refresh_dashboard_stats()
-
         # Placeholder pour d'autres écrans (liste étudiants, etc.)
         self.content_frame = tk.Frame(self.main, bg=bg)
         self.content_frame.grid(row=2, column=0, sticky="nsew", padx=16, pady=(0, 16))
         self.main.rowconfigure(2, weight=1)
 
+        # Vues construites conservées entre deux changements de menu
+        self._views = ViewCache(APP_CONFIG["view_cache_size"], APP_CONFIG["view_cache_rows"])
+        self._current_view = None
+        self._current_key = None
+        self._stats_stale = True
+        self._view_tokens = {}  # vue -> (Treeview, jeton de la dernière lecture) pour Actualiser
+        self._live_views = {}  # vue -> (Treeview, changed_since, keep) : actualisables par delta
+        self._table_versions = None  # derniers compteurs lus dans table_versions
+        self._poll_job = None
+        subscribe(self._on_data_changed)
+
         self._on_menu_click("dashboard")
+        self._schedule_version_poll()
 
-    def refresh_dashboard_stats(self):
-        try:
-            self.students_card.value_label.configure(text=str(get_student_count()))
-            self.teachers_card.value_label.configure(text=str(get_teacher_count()))
-            self.courses_card.value_label.configure(text=str(get_course_count()))
-            self.classes_card.value_label.configure(text=str(get_class_count()))
-            self.enrollments_card.value_label.configure(text=str(get_enrollment_count_for_year("2024-2025")))
-            avg = get_average_grade()
-            self.avg_grade_card.value_label.configure(text=str(avg) if avg is not None else "-")
-            self.archives_card.value_label.configure(text=str(get_archive_count()))
-        except Exception:
-            pass
+    def refresh_dashboard_stats(self, stats=None):
+        """Affiche stats, ou les relit en arrière-plan (fetch_all ne doit pas tourner sur le thread Tk)."""
+        stats = stats or self._prefetched.pop("stats", None)
+        if stats is None:
+            run_in_background(self, load_dashboard_stats, on_done=self.refresh_dashboard_stats, on_error=self._on_stats_error)
+            return
+        self._stats_stale = False
+        self.students_card.value_label.configure(text=str(stats["students"]))
+        self.teachers_card.value_label.configure(text=str(stats["teachers"]))
+        self.courses_card.value_label.configure(text=str(stats["courses"]))
+        self.classes_card.value_label.configure(text=str(stats["classes"]))
+        self.enrollments_card.value_label.configure(text=str(stats["enrollments"]))
+        avg = stats["avg_grade"]
+        self.avg_grade_card.value_label.configure(text=str(avg) if avg is not None else "-")
+        self.archives_card.value_label.configure(text=str(stats["archives"]))
+
+    def _on_stats_error(self, ex):
+        log.warning("Compteurs du tableau de bord non actualisés : %s", ex)
 
     _SECTION_TITLES = {
         "dashboard": ("Tableau de bord", "Vue synthétique de l'université"),
@@ -412,6 +552,7 @@ class DashboardFrame(tk.Frame):
         "classes": ("Gestion des classes", "Classes et cours attribués"),
         "enrollments": ("Gestion des inscriptions", "Inscription des étudiants aux classes"),
         "grades": ("Gestion des notes", "Notes par cours (étudiant + classe)"),
+        "statistics": ("Statistiques", "Distribution des notes par année, semestre, classe, cours ou enseignant"),
         "bulletins": ("Bulletins", "Consulter et imprimer les bulletins des étudiants"),
         "archives": ("Archives", "Consultation des données sur les 10 dernières années"),
     }
@@ -428,131 +569,521 @@ class DashboardFrame(tk.Frame):
         for k, btn in self.menu_buttons.items():
             btn.configure(fg=accent if k == key else text_primary, font=("Segoe UI", 10, "bold" if k == key else "normal"))
 
+    # Tables dont dépend chaque vue : une écriture sur l'une d'elles périme la vue.
+    _VIEW_TABLES = {
+        "dashboard": {"students", "teachers", "courses", "classes", "enrollments", "grades"},
+        "students": {"students"},
+        "teachers": {"teachers"},
+        "courses": {"courses", "teachers"},
+        "classes": {"classes", "class_courses", "grades"},
+        "enrollments": {"enrollments", "students", "classes"},
+        "grades": {"grades", "enrollments", "students", "classes", "courses"},
+        "statistics": {"grades", "enrollments", "classes", "class_courses", "courses", "teachers"},
+        "bulletins": {"students", "enrollments", "grades", "classes", "class_courses", "courses"},
+        "archives": {"students", "teachers", "courses", "classes", "class_courses", "enrollments", "grades"},
+    }
+
+    def _on_data_changed(self, table, _ids):
+        # Appelé éventuellement hors du thread Tk : on ne fait que marquer.
+        self._views.mark_stale([k for k, tables in self._VIEW_TABLES.items() if table in tables])
+        if table != "users":
+            self._stats_stale = True
+
+    def destroy(self):
+        unsubscribe(self._on_data_changed)
+        if self._poll_job is not None:
+            self.after_cancel(self._poll_job)
+            self._poll_job = None
+        super().destroy()
+
     def _on_menu_click(self, key: str):
-        for child in self.content_frame.winfo_children():
-            child.destroy()
+        if self._current_view is not None:
+            self._current_view.pack_forget()
         self._update_header(key)
         self._update_menu_active(key)
-        self.refresh_dashboard_stats()
+        if self._stats_stale:
+            self.refresh_dashboard_stats()
 
+        frame = self._views.get(key)
+        if frame is None or self._views.is_stale(key):
+            frame = self._build_view(key)
+            self._views.put(key, frame)
+        frame.pack(fill="both", expand=True)
+        self._current_view = frame
+        self._current_key = key
+
+    def _build_view(self, key: str):
+        """Construit la vue `key` dans un nouveau cadre de content_frame (non affiché)."""
+        frame = tk.Frame(self.content_frame, bg=APP_CONFIG["bg_color"])
         if key == "dashboard":
-            self._show_dashboard_charts()
+            self._show_dashboard_charts(frame)
         elif key == "students":
-            self._show_students_view()
+            self._show_students_view(frame)
         elif key == "teachers":
-            self._show_teachers_view()
+            self._show_teachers_view(frame)
         elif key == "courses":
-            self._show_courses_view()
+            self._show_courses_view(frame)
         elif key == "classes":
-            self._show_classes_view()
+            self._show_classes_view(frame)
         elif key == "enrollments":
-            self._show_enrollments_view()
+            self._show_enrollments_view(frame)
         elif key == "grades":
-            self._show_grades_view()
+            self._show_grades_view(frame)
+        elif key == "statistics":
+            self._show_statistics_view(frame)
         elif key == "bulletins":
-            self._show_bulletins_view()
+            self._show_bulletins_view(frame)
         elif key == "archives":
-            self._show_archives_view()
+            self._show_archives_view(frame)
         else:
-            self._show_placeholder_view(key)
-
-    def _show_dashboard_charts(self):
-        """Affiche le tableau de bord avec graphiques (inscriptions par année, répartition des notes)."""
-        bg = APP_CONFIG["bg_color"]
-        card_bg = APP_CONFIG["card_bg"]
-        text_primary = APP_CONFIG["text_primary"]
-        text_secondary = APP_CONFIG["text_secondary"]
+            self._show_placeholder_view(frame, key)
+        return frame
+
+    def _patch_view(self, key: str, tree, upserts=(), deletes=()):
+        """Applique une écriture locale aux lignes de la vue (par id) sans la reconstruire."""
+        TreeRows.of(tree).patch(upserts, deletes)
+        self._views.mark_fresh([key])
+
+    def _reload_view(self, key: str):
+        """Reconstruit une vue (bouton Actualiser, après un enregistrement)."""
+        if self._current_key == key:
+            self._current_view = None
+            self._views.discard(key)
+            self._on_menu_click(key)
+        else:
+            self._views.discard(key)
+
+    def _refresh_view_delta(self, key: str, tree, changed_since, keep=None):
+        """
+        Bouton Actualiser. La première fois, relit toute la table depuis la
+        base (changed_since(None)) ; ensuite, seulement les lignes créées,
+        modifiées ou supprimées depuis la lecture précédente, appliquées par id.
+        keep(ligne) : filtre affiché (recherche) ; une ligne qui n'y répond
+        plus est retirée. Si la base n'a pas les colonnes de suivi
+        (init_db.py non relancé), la vue est reconstruite.
+        """
+        last_tree, token = self._view_tokens.get(key, (None, None))
+        if last_tree is not tree:
+            token = None  # vue reconstruite depuis : son contenu ne correspond plus au jeton
+
+        def _on_done(delta):
+            if not tree.winfo_exists():
+                return
+            rows = TreeRows.of(tree)
+            if token is None:
+                publish(key)  # les caches peuvent être plus anciens que cette lecture
+                rows.load([r for r in delta["upserts"] if keep is None or keep(r)])
+                self._views.mark_fresh([key])
+            else:
+                changed = [r["id"] for r in delta["upserts"]] + list(delta["deletes"])
+                if changed:
+                    # Écritures d'un autre poste : caches et autres vues concernées
+                    publish(key, changed)
+                upserts = [r for r in delta["upserts"] if keep is None or keep(r)]
+                hidden = [r["id"] for r in delta["upserts"] if keep is not None and not keep(r)]
+                self._patch_view(key, tree, upserts, list(delta["deletes"]) + hidden)
+            self._view_tokens[key] = (tree, delta["token"])
+
+        def _on_error(ex):
+            log.warning("Rafraîchissement incrémental de %s impossible (%s) : rechargement complet.", key, ex)
+            self._view_tokens.pop(key, None)
+            self._reload_view(key)
+
+        run_in_background(tree, changed_since, token, on_done=_on_done, on_error=_on_error)
+
+    def _register_live_view(self, key: str, tree, changed_since, keep=None):
+        """Déclare une liste actualisable par delta (bouton Actualiser et écritures des autres postes)."""
+        self._live_views[key] = (tree, changed_since, keep)
+
+    def _refresh_live_view(self, key: str):
+        tree, changed_since, keep = self._live_views[key]
+        self._refresh_view_delta(key, tree, changed_since, keep)
+        if key == "classes":
+            self._refresh_class_averages(tree)
+
+    def _refresh_class_averages(self, tree):
+        """
+        Relit les moyennes de toutes les classes affichées : une note saisie ne
+        touche pas classes.updated_at, le delta de la vue ne les ramène donc pas.
+        """
+
+        def _on_done(stats):
+            if not tree.winfo_exists():
+                return
+            rows = TreeRows.of(tree)
+            columns = tree["columns"]
+            loaded = [dict(zip(columns, values), id=int(values[0])) for values in rows.rows.values()]
+            for row in _with_class_averages(loaded, stats):
+                rows.upsert(row)
+
+        def _on_error(ex):
+            log.warning("Moyennes des classes non relues (%s) : la vue sera reconstruite.", ex)
+            self._views.mark_stale(["classes"])
+
+        run_in_background(tree, get_aggregates, "class", on_done=_on_done, on_error=_on_error)
+
+    def _schedule_version_poll(self):
+        interval = APP_CONFIG["change_poll_ms"]
+        if interval > 0:
+            self._poll_job = self.after(interval, self._poll_versions)
+
+    def _poll_versions(self):
+        """
+        Scrutation des écritures des autres postes : une requête sur
+        table_versions en arrière-plan. Les tables dont le compteur a bougé
+        sont publiées (caches, vues gardées en mémoire), la liste affichée
+        est actualisée par delta si elle en dépend, et les compteurs du
+        bandeau sont relus. Le tour suivant est planifié à la fin de celui-ci.
+        """
+        self._poll_job = None
+
+        def _on_done(versions):
+            self._show_connection_state()
+            previous, self._table_versions = self._table_versions, versions
+            if previous is not None:
+                changed = changed_tables(previous, versions)
+                if changed:
+                    self._apply_table_changes(changed)
+            self._schedule_version_poll()
+
+        def _on_error(ex):
+            log.warning("Lecture de table_versions impossible : %s", ex)
+            self._show_connection_state()
+            self._schedule_version_poll()
+
+        run_in_background(self, get_table_versions, on_done=_on_done, on_error=_on_error)
+
+    def _show_connection_state(self):
+        replica = offline_replica()
+        text = ""
+        if replica is not None:
+            text = f"Hors connexion : {replica.pending_count()} modification(s) en attente"
+        self.connection_label.configure(text=text)
+
+    def _apply_table_changes(self, tables):
+        key = self._current_key
+        live = False
+        if key in self._live_views and self._VIEW_TABLES.get(key, set()) & tables:
+            live = self._live_views[key][0].winfo_exists()
+        for table in sorted(tables):
+            if live and table == key:
+                continue  # le delta de la liste affichée publie les ids changés
+            publish(table)
+        if live:
+            self._refresh_live_view(key)
+        if tables - {"users"}:
+            self.refresh_dashboard_stats()
 
+    def _delete_selected(
+        self, key, tree, delete_func, select_text, confirm_one, plural, done_one, done_many,
+        refresh_stats=False, warning="",
+    ):
+        """
+        Suppression des lignes sélectionnées (multi-sélection) : une seule
+        confirmation, delete_func(ids) en une transaction, puis retrait des
+        lignes de la vue sans la recharger.
+        """
+        ids = TreeRows.of(tree).selected_ids()
+        if not ids:
+            messagebox.showwarning("Sélection", f"Veuillez sélectionner {select_text}.")
+            return
+        if len(ids) == 1:
+            question = confirm_one
+        else:
+            question = f"Supprimer ces {len(ids)} {plural} ?" + (f" {warning}" if warning else "")
+        if not messagebox.askyesno("Confirmation", question):
+            return
         try:
-            import matplotlib
-            matplotlib.use("TkAgg")
-            from matplotlib.figure import Figure
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-        except ImportError:
-            tk.Label(
-                self.content_frame,
-                text="Graphiques indisponibles : installez matplotlib (pip install matplotlib).",
-                bg=bg,
-                fg=text_secondary,
-                font=("Segoe UI", 10),
-            ).pack(pady=20)
+            deleted = delete_func(ids)
+            messagebox.showinfo("Succès", done_one if len(deleted) == 1 else f"{len(deleted)} {plural} {done_many}.")
+            if refresh_stats:
+                self.refresh_dashboard_stats()
+            self._patch_view(key, tree, deletes=deleted)
+        except Exception as ex:
+            messagebox.showerror("Erreur", str(ex))
+
+    def _bulk_edit(self, key, tree, title, label, choices, apply_func, free_text=False):
+        """
+        Modification groupée d'un champ pour les lignes sélectionnées :
+        choices = [(libellé, valeur)], apply_func(ids, valeur) -> lignes modifiées.
+        free_text : accepte aussi une valeur saisie hors de la liste.
+        """
+        ids = TreeRows.of(tree).selected_ids()
+        if not ids:
+            messagebox.showwarning("Sélection", "Veuillez sélectionner au moins une ligne.")
             return
+        d = tk.Toplevel(self)
+        d.title(title)
+        d.geometry("420x160")
+        d.transient(self.winfo_toplevel())
+        d.grab_set()
+        bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
+        d.configure(bg=bg)
+        tk.Label(d, text=f"{len(ids)} ligne(s) sélectionnée(s)", bg=bg, fg=APP_CONFIG["text_secondary"]).pack(anchor="w", padx=10, pady=(10, 4))
+        row = tk.Frame(d, bg=bg)
+        row.pack(fill="x", padx=10, pady=4)
+        tk.Label(row, text=label, bg=bg, fg=fg).pack(side="left")
+        cb = ttk.Combobox(row, values=[c[0] for c in choices], state="normal" if free_text else "readonly", width=32)
+        cb.pack(side="left", padx=8)
+        if choices:
+            cb.current(0)
 
-        charts_frame = tk.Frame(self.content_frame, bg=bg)
-        charts_frame.pack(fill="both", expand=True)
+        def save():
+            text = cb.get().strip()
+            values = dict(choices)
+            value = values[text] if text in values else text
+            try:
+                rows = apply_func(ids, value)
+                d.destroy()
+                self._patch_view(key, tree, upserts=rows)
+                for r in rows:
+                    tree.selection_add(str(r["id"]))
+            except Exception as ex:
+                messagebox.showerror("Erreur", str(ex), parent=d)
 
-        fig = Figure(figsize=(10, 4), facecolor=bg, edgecolor="none")
-        fig.patch.set_facecolor(bg)
+        bottom = tk.Frame(d, bg=bg)
+        bottom.pack(fill="x", padx=10, pady=10)
+        ModernButton(bottom, text="Annuler", command=d.destroy, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        ModernButton(bottom, text="Appliquer", command=save, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
 
-        # Couleurs assorties au thème
-        accent = APP_CONFIG["accent_color"]
-        bars_color = "#3b82f6"
-        pie_colors = ["#ef4444", "#f59e0b", "#22c55e", "#2563eb"]
-
-        # 1) Inscriptions par année (barres)
-        ax1 = fig.add_subplot(121)
-        ax1.set_facecolor(card_bg)
-        ax1.tick_params(colors=text_secondary, labelsize=8)
-        ax1.spines["bottom"].set_color(text_secondary)
-        ax1.spines["left"].set_color(text_secondary)
-        ax1.spines["top"].set_visible(False)
-        ax1.spines["right"].set_visible(False)
-        ax1.xaxis.label.set_color(text_primary)
-        ax1.yaxis.label.set_color(text_primary)
-        ax1.title.set_color(text_primary)
-
-        years, counts = get_enrollments_per_year()
-        if years and any(c > 0 for c in counts):
-            bars = ax1.bar(range(len(years)), counts, color=bars_color, edgecolor="none")
-            ax1.set_xticks(range(len(years)))
-            ax1.set_xticklabels(years, rotation=35, ha="right")
-            ax1.set_ylabel("Nombre d'inscriptions", fontsize=9)
-            ax1.set_title("Inscriptions par année académique", fontsize=11)
-        else:
-            ax1.text(0.5, 0.5, "Aucune donnée", ha="center", va="center", color=text_secondary, fontsize=11)
-            ax1.set_title("Inscriptions par année", fontsize=11)
-
-        # 2) Répartition des notes (camembert)
-        ax2 = fig.add_subplot(122)
-        ax2.set_facecolor(card_bg)
-        ax2.tick_params(colors=text_secondary, labelsize=8)
-
-        labels, values = get_grade_distribution()
-        if sum(values) > 0:
-            wedges, texts, autotexts = ax2.pie(
-                values,
-                labels=labels,
-                autopct="%1.0f%%",
-                colors=pie_colors,
-                startangle=90,
-                textprops={"color": text_primary, "fontsize": 9},
-            )
-            for at in autotexts:
-                at.set_color("white")
-                at.set_fontsize(8)
-            ax2.set_title("Répartition des notes (sur 20)", fontsize=11, color=text_primary)
-        else:
-            ax2.text(0.5, 0.5, "Aucune note enregistrée", ha="center", va="center", color=text_secondary, fontsize=10)
-            ax2.set_title("Répartition des notes", fontsize=11, color=text_primary)
+    def _show_dashboard_charts(self, parent):
+        """Affiche le tableau de bord avec graphiques (inscriptions par année, répartition des notes)."""
+        from charts import BarChart, PieChart
+
+        bg = APP_CONFIG["bg_color"]
 
-        fig.tight_layout(pad=2)
-        canvas = FigureCanvasTkAgg(fig, master=charts_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        charts_frame = tk.Frame(parent, bg=bg)
+        charts_frame.pack(fill="both", expand=True)
+        charts_frame.columnconfigure(0, weight=1, uniform="chart")
+        charts_frame.columnconfigure(1, weight=1, uniform="chart")
+        charts_frame.rowconfigure(0, weight=1)
+
+        self._enrollments_chart = BarChart(charts_frame, title="Inscriptions par année académique")
+        self._enrollments_chart.grid(row=0, column=0, sticky="nsew", padx=(0, 6))
+        self._grades_chart = PieChart(
+            charts_frame, title="Répartition des notes (sur 20)", empty_text="Aucune note enregistrée"
+        )
+        self._grades_chart.grid(row=0, column=1, sticky="nsew", padx=(6, 0))
+        self._refresh_dashboard_charts()
 
-        # Bouton actualiser
-        btn_frame = tk.Frame(self.content_frame, bg=bg)
+        # Boutons actualiser / exporter
+        btn_frame = tk.Frame(parent, bg=bg)
         btn_frame.pack(fill="x", pady=(8, 0))
         ModernButton(
             btn_frame,
             text="Actualiser les graphiques",
-            command=lambda: (self._on_menu_click("dashboard")),
+            command=lambda: (self.refresh_dashboard_stats(), self._refresh_dashboard_charts()),
             font=("Segoe UI", 9),
             padx=10,
             pady=4,
         ).pack(side="left")
+        ModernButton(
+            btn_frame,
+            text="Exporter (image)",
+            command=self._export_dashboard_charts,
+            font=("Segoe UI", 9),
+            padx=10,
+            pady=4,
+        ).pack(side="left", padx=4)
 
-    def _show_placeholder_view(self, key: str):
+    def _refresh_dashboard_charts(self):
+        """Recharge les données des graphiques et les redessine sur place."""
+        try:
+            charts = self._prefetched.pop("charts", None) or load_dashboard_charts()
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Impossible de charger les graphiques.\n{e}")
+            return
+        self._enrollments_chart.set_data(charts["years"], charts["counts"])
+        self._grades_chart.set_data(charts["labels"], charts["values"])
+
+    def _export_dashboard_charts(self):
+        """Export haute qualité des graphiques via matplotlib (optionnel)."""
+        from charts import export_charts
+
+        path = filedialog.asksaveasfilename(
+            defaultextension=".png",
+            filetypes=[("PNG", "*.png"), ("SVG", "*.svg"), ("PDF", "*.pdf")],
+            initialfile="tableau_de_bord.png",
+        )
+        if not path:
+            return
+        try:
+            export_charts([self._enrollments_chart, self._grades_chart], path)
+        except ImportError:
+            messagebox.showwarning("Export", "Export indisponible : installez matplotlib (pip install matplotlib).")
+            return
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Impossible d'exporter : {e}")
+            return
+        messagebox.showinfo("Export", "Export terminé.")
+
+    def _run_with_progress(self, title, func, *args, on_done, on_error=None, **kwargs):
+        """
+        Lance func(*args, progress=..., cancel=..., **kwargs) en arrière-plan avec
+        une fenêtre de progression (nombre de lignes traitées) et un bouton Annuler.
+        on_done(résultat) / on_error(exception) sont appelés dans le thread Tk.
+        """
+        import threading
+
+        d = tk.Toplevel(self)
+        d.title(title)
+        d.geometry("360x120")
+        d.transient(self.winfo_toplevel())
+        bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
+        d.configure(bg=bg)
+        status = tk.Label(d, text=f"{title} en cours…", bg=bg, fg=fg, font=("Segoe UI", 10))
+        status.pack(fill="x", padx=12, pady=(14, 6))
+        bar = ttk.Progressbar(d, mode="indeterminate")
+        bar.pack(fill="x", padx=12)
+        bar.start(15)
+        cancel = threading.Event()
+        progress = {"rows": 0}
+        ModernButton(d, text="Annuler", command=cancel.set, font=("Segoe UI", 9), padx=10, pady=4).pack(pady=8)
+        d.protocol("WM_DELETE_WINDOW", cancel.set)
+
+        def _on_progress(n):
+            # Appelé depuis le thread de travail : simple affectation, lue par _poll_progress.
+            progress["rows"] = n
+
+        def _poll_progress():
+            if not d.winfo_exists():
+                return
+            status.config(text=f"{title} en cours… {progress['rows']:,} lignes".replace(",", " "))
+            d.after(200, _poll_progress)
+
+        def _finish():
+            if d.winfo_exists():
+                d.destroy()
+
+        def _done(result):
+            _finish()
+            on_done(result)
+
+        def _error(error):
+            _finish()
+            if on_error is not None:
+                on_error(error)
+            else:
+                messagebox.showerror("Erreur", str(error))
+
+        _poll_progress()
+        run_in_background(
+            self, func, *args,
+            progress=_on_progress, cancel=cancel, on_done=_done, on_error=_error, **kwargs
+        )
+
+    def _run_csv_export(self, default_name, export_func, *args, **kwargs):
+        """Export CSV en arrière-plan (csv_export) : choix du fichier (.csv ou .csv.gz), progression, annulation."""
+        from csv_export import ExportCancelled
+
+        path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("CSV compressé", "*.csv.gz"), ("Tous", "*.*")],
+            initialfile=default_name,
+        )
+        if not path:
+            return
+
+        def _on_done(count):
+            messagebox.showinfo("Export", f"Export terminé : {count} lignes.\n{path}")
+
+        def _on_error(error):
+            if isinstance(error, ExportCancelled):
+                messagebox.showinfo("Export", "Export annulé.")
+            else:
+                messagebox.showerror("Erreur", f"Impossible d'exporter : {error}")
+
+        self._run_with_progress("Export CSV", export_func, path, *args, on_done=_on_done, on_error=_on_error, **kwargs)
+
+    def _import_csv(self, entity, view_key, **options):
+        """
+        Import CSV (csv_import) : simulation d'abord, résumé, confirmation,
+        puis import réel dans une transaction ; rapport d'erreurs enregistrable.
+        options : academic_year et semester pour les notes.
+        """
+        from csv_import import ImportCancelled, import_csv
+
+        path = filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("Tous", "*.*")])
+        if not path:
+            return
+
+        def _on_error(error):
+            if isinstance(error, ImportCancelled):
+                messagebox.showinfo("Import", "Import annulé : aucune donnée enregistrée.")
+            else:
+                messagebox.showerror("Erreur", f"Import impossible : {error}")
+
+        def _offer_error_report(report):
+            if getattr(report, "results", None):
+                if messagebox.askyesno("Import", "Enregistrer le fichier de résultats (statut de chaque ligne) ?"):
+                    out = filedialog.asksaveasfilename(defaultextension=".csv", initialfile="resultats_import_notes.csv")
+                    if out:
+                        report.write_results(out)
+                return
+            if not report.errors:
+                return
+            if messagebox.askyesno("Import", f"{len(report.errors)} ligne(s) rejetée(s). Enregistrer le rapport d'erreurs ?"):
+                out = filedialog.asksaveasfilename(defaultextension=".csv", initialfile="erreurs_import.csv")
+                if out:
+                    report.write_errors(out)
+
+        def _details(report):
+            lines = [f"Ligne {line} ({key}) : {message}" for line, key, message in report.errors[:8]]
+            if len(report.errors) > 8:
+                lines.append(f"… {len(report.errors) - 8} autres erreurs")
+            return ("\n\n" + "\n".join(lines)) if lines else ""
+
+        def _on_imported(report):
+            messagebox.showinfo("Import", report.summary() + _details(report))
+            _offer_error_report(report)
+            self.refresh_dashboard_stats()
+            self._reload_view(view_key)
+
+        def _on_simulated(report):
+            if not report.inserted and not report.updated:
+                messagebox.showinfo("Import", report.summary() + "\nAucune modification à enregistrer." + _details(report))
+                _offer_error_report(report)
+                return
+            if messagebox.askyesno("Import", report.summary() + _details(report) + "\n\nEnregistrer les lignes valides ?"):
+                self._run_with_progress("Import CSV", import_csv, path, entity, on_done=_on_imported, on_error=_on_error, **options)
+
+        self._run_with_progress("Vérification", import_csv, path, entity, dry_run=True, on_done=_on_simulated, on_error=_on_error, **options)
+
+    def _import_grades_csv(self):
+        """Choix de l'année et du semestre, puis import d'un fichier matricule;code;note."""
+        from models_archives import get_available_academic_years
+
+        d = tk.Toplevel(self)
+        d.title("Importer des notes")
+        d.geometry("420x170")
+        d.transient(self.winfo_toplevel())
+        d.grab_set()
+        bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
+        d.configure(bg=bg)
+        tk.Label(d, text="Fichier CSV : matricule ; code du cours ; note (0-20)", bg=bg, fg=APP_CONFIG["text_secondary"]).grid(row=0, column=0, columnspan=2, sticky="w", padx=10, pady=(10, 4))
+        tk.Label(d, text="Année académique *", bg=bg, fg=fg).grid(row=1, column=0, sticky="w", padx=10, pady=4)
+        cb_year = ttk.Combobox(d, values=get_available_academic_years() or [], width=15)
+        cb_year.grid(row=1, column=1, padx=10, pady=4, sticky="w")
+        if cb_year["values"]:
+            cb_year.current(0)
+        tk.Label(d, text="Semestre *", bg=bg, fg=fg).grid(row=2, column=0, sticky="w", padx=10, pady=4)
+        cb_sem = ttk.Combobox(d, values=["S1", "S2"], state="readonly", width=10)
+        cb_sem.current(0)
+        cb_sem.grid(row=2, column=1, padx=10, pady=4, sticky="w")
+
+        def choose_file():
+            year = cb_year.get().strip()
+            if not year:
+                messagebox.showwarning("Validation", "Année obligatoire.", parent=d)
+                return
+            semester = cb_sem.get()
+            d.destroy()
+            self._import_csv("grades", "grades", academic_year=year, semester=semester)
+
+        ModernButton(d, text="Annuler", command=d.destroy, font=("Segoe UI", 9), padx=10, pady=4).grid(row=3, column=0, padx=5, pady=8)
+        ModernButton(d, text="Choisir le fichier…", command=choose_file, font=("Segoe UI", 9), padx=10, pady=4).grid(row=3, column=1, padx=5, pady=8)
+
+    def _show_placeholder_view(self, parent, key: str):
         text_primary = APP_CONFIG["text_primary"]
         text_secondary = APP_CONFIG["text_secondary"]
 
@@ -567,7 +1098,7 @@ class DashboardFrame(tk.Frame):
         title = mapping.get(key, "Section en cours de construction.")
 
         label = tk.Label(
-            self.content_frame,
+            parent,
             text=title,
             bg=APP_CONFIG["bg_color"],
             fg=text_primary,
@@ -577,7 +1108,7 @@ class DashboardFrame(tk.Frame):
         label.pack(fill="x")
 
         hint = tk.Label(
-            self.content_frame,
+            parent,
             text="(Contenu détaillé à implémenter)",
             bg=APP_CONFIG["bg_color"],
             fg=text_secondary,
@@ -586,13 +1117,13 @@ class DashboardFrame(tk.Frame):
         )
         hint.pack(fill="x")
 
-    def _show_students_view(self):
+    def _show_students_view(self, parent):
         bg = APP_CONFIG["bg_color"]
         text_primary = APP_CONFIG["text_primary"]
         text_secondary = APP_CONFIG["text_secondary"]
 
         header = tk.Label(
-            self.content_frame,
+            parent,
             text="Gestion des étudiants",
             bg=bg,
             fg=text_primary,
@@ -602,7 +1133,7 @@ class DashboardFrame(tk.Frame):
         header.pack(fill="x")
 
         sub = tk.Label(
-            self.content_frame,
+            parent,
             text="Liste des étudiants." + (" Ajout, modification et suppression disponibles." if self.is_admin else " Lecture seule."),
             bg=bg,
             fg=text_secondary,
@@ -612,12 +1143,13 @@ class DashboardFrame(tk.Frame):
         sub.pack(fill="x")
 
         # Barre d'outils
-        toolbar = tk.Frame(self.content_frame, bg=bg)
+        toolbar = tk.Frame(parent, bg=bg)
         toolbar.pack(fill="x", pady=(8, 4))
-        ModernButton(toolbar, text="Exporter CSV", command=lambda: _export_treeview_to_csv(tree, "etudiants.csv") and messagebox.showinfo("Export", "Export terminé."), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
-        refresh_btn = ModernButton(toolbar, text="Actualiser", command=self._show_students_view, font=("Segoe UI", 9), padx=10, pady=4)
+        ModernButton(toolbar, text="Exporter CSV", command=lambda: self._export_students_csv(e_search.get()), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        refresh_btn = ModernButton(toolbar, text="Actualiser", command=lambda: self._refresh_live_view("students"), font=("Segoe UI", 9), padx=10, pady=4)
         refresh_btn.pack(side="right", padx=2)
         if self.is_admin:
+            ModernButton(toolbar, text="Importer CSV", command=lambda: self._import_csv("students", "students"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             del_btn = ModernButton(toolbar, text="Supprimer", command=lambda: self._delete_student(tree), font=("Segoe UI", 9), padx=10, pady=4)
             del_btn.pack(side="right", padx=2)
             edit_btn = ModernButton(toolbar, text="Modifier", command=lambda: self._edit_student(tree), font=("Segoe UI", 9), padx=10, pady=4)
@@ -625,13 +1157,13 @@ class DashboardFrame(tk.Frame):
             add_btn = ModernButton(toolbar, text="Ajouter", command=lambda: self._add_student(tree), font=("Segoe UI", 9), padx=10, pady=4)
             add_btn.pack(side="right", padx=2)
 
-        search_frame = tk.Frame(self.content_frame, bg=bg)
+        search_frame = tk.Frame(parent, bg=bg)
         search_frame.pack(fill="x", pady=(0, 4))
         tk.Label(search_frame, text="Rechercher:", bg=bg, fg=text_secondary, font=("Segoe UI", 9)).pack(side="left", padx=(0, 8))
         e_search = tk.Entry(search_frame, width=25, bg="#020617", fg=text_primary, insertbackground=text_primary)
         e_search.pack(side="left", padx=2)
 
-        table_frame = tk.Frame(self.content_frame, bg=bg)
+        table_frame = tk.Frame(parent, bg=bg)
         table_frame.pack(fill="both", expand=True, pady=(8, 0))
 
         columns = ("id", "matricule", "last_name", "first_name", "email", "phone")
@@ -653,24 +1185,30 @@ class DashboardFrame(tk.Frame):
         tree.pack(side="left", fill="both", expand=True)
         vsb.pack(side="right", fill="y")
 
+        rows = TreeRows(tree, _student_values)
         try:
-            for s in get_all_students() or []:
-                tree.insert("", "end", values=(s["id"], s["matricule"], s["last_name"], s["first_name"], s["email"] or "", s["phone"] or ""))
+            rows.load(get_all_students() or [])
         except Exception as e:
             messagebox.showerror("Erreur", f"Impossible de charger les étudiants.\n{e}")
-        _make_tree_sortable(tree, {"matricule": "str", "last_name": "str", "first_name": "str"})
+        make_sortable(tree, {"matricule": "str", "last_name": "str", "first_name": "str"})
 
-        def _on_search_change(*_):
+        def _matches(s):
             q = e_search.get().strip().lower()
-            for item in tree.get_children(""):
-                tree.delete(item)
-            for s in get_all_students() or []:
-                row_text = f"{s.get('matricule','')} {s.get('last_name','')} {s.get('first_name','')} {s.get('email','')} {s.get('phone','')}".lower()
-                if not q or q in row_text:
-                    tree.insert("", "end", values=(s["id"], s["matricule"], s["last_name"], s["first_name"], s["email"] or "", s["phone"] or ""))
+            row_text = f"{s.get('matricule','')} {s.get('last_name','')} {s.get('first_name','')} {s.get('email','')} {s.get('phone','')}".lower()
+            return not q or q in row_text
+
+        def _on_search_change(*_):
+            rows.load([s for s in get_all_students() or [] if _matches(s)])
+
+        self._register_live_view("students", tree, get_students_changed_since, keep=_matches)
 
         e_search.bind("<KeyRelease>", _on_search_change)
 
+    def _export_students_csv(self, search=""):
+        """Exporte les étudiants avec le même filtre que la recherche affichée."""
+        name = "etudiants_filtre.csv" if search.strip() else "etudiants.csv"
+        self._run_csv_export(name, export_dataset, "students", search=search)
+
     def _add_student(self, tree):
         d = tk.Toplevel(self)
         d.title("Ajouter un étudiant")
@@ -700,11 +1238,11 @@ class DashboardFrame(tk.Frame):
                 messagebox.showwarning("Validation", "Matricule, nom et prénom sont obligatoires.", parent=d)
                 return
             try:
-                create_student(e_mat.get(), e_prenom.get(), e_nom.get(), e_email.get(), e_phone.get())
+                row = create_student(e_mat.get(), e_prenom.get(), e_nom.get(), e_email.get(), e_phone.get())
                 messagebox.showinfo("Succès", "Étudiant ajouté.", parent=d)
                 d.destroy()
                 self.refresh_dashboard_stats()
-                self._show_students_view()
+                self._patch_view("students", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
@@ -755,11 +1293,11 @@ class DashboardFrame(tk.Frame):
                 messagebox.showwarning("Validation", "Matricule, nom et prénom sont obligatoires.", parent=d)
                 return
             try:
-                update_student(sid, e_mat.get(), e_prenom.get(), e_nom.get(), e_email.get(), e_phone.get())
+                row = update_student(sid, e_mat.get(), e_prenom.get(), e_nom.get(), e_email.get(), e_phone.get())
                 messagebox.showinfo("Succès", "Étudiant modifié.", parent=d)
                 d.destroy()
                 self.refresh_dashboard_stats()
-                self._show_students_view()
+                self._patch_view("students", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
@@ -767,28 +1305,21 @@ class DashboardFrame(tk.Frame):
         ModernButton(d, text="Enregistrer", command=save, font=("Segoe UI", 9), padx=10, pady=4).grid(row=6, column=1, padx=5)
 
     def _delete_student(self, tree):
-        sel = tree.selection()
-        if not sel:
-            messagebox.showwarning("Sélection", "Veuillez sélectionner un étudiant.")
-            return
-        if not messagebox.askyesno("Confirmation", "Supprimer cet étudiant ?"):
-            return
-        try:
-            delete_student(tree.item(sel[0])["values"][0])
-            messagebox.showinfo("Succès", "Étudiant supprimé.")
-            self.refresh_dashboard_stats()
-            self._show_students_view()
-        except Exception as ex:
-            messagebox.showerror("Erreur", str(ex))
-    def _show_teachers_view(self):
+        """Supprime les étudiants sélectionnés (avec leurs inscriptions et notes)."""
+        self._delete_selected(
+            "students", tree, delete_students, "un étudiant", "Supprimer cet étudiant ?",
+            "étudiants", "Étudiant supprimé.", "supprimés", refresh_stats=True,
+        )
+
+    def _show_teachers_view(self, parent):
         bg = APP_CONFIG["bg_color"]
         text_primary = APP_CONFIG["text_primary"]
         text_secondary = APP_CONFIG["text_secondary"]
 
-        header = tk.Label(self.content_frame, text="Gestion des enseignants", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
+        header = tk.Label(parent, text="Gestion des enseignants", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
         header.pack(fill="x")
         sub = tk.Label(
-            self.content_frame,
+            parent,
             text="Liste des enseignants." + (" CRUD disponible." if self.is_admin else " Lecture seule."),
             bg=bg,
             fg=text_secondary,
@@ -797,15 +1328,17 @@ class DashboardFrame(tk.Frame):
         )
         sub.pack(fill="x")
 
-        toolbar = tk.Frame(self.content_frame, bg=bg)
+        toolbar = tk.Frame(parent, bg=bg)
         toolbar.pack(fill="x", pady=(8, 4))
-        ModernButton(toolbar, text="Actualiser", command=self._show_teachers_view, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        ModernButton(toolbar, text="Actualiser", command=lambda: self._refresh_live_view("teachers"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
         if self.is_admin:
+            ModernButton(toolbar, text="Importer CSV", command=lambda: self._import_csv("teachers", "teachers"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+            ModernButton(toolbar, text="Changer de département", command=lambda: self._bulk_set_department(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Supprimer", command=lambda: self._delete_teacher(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Modifier", command=lambda: self._edit_teacher(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Ajouter", command=lambda: self._add_teacher(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
 
-        table_frame = tk.Frame(self.content_frame, bg=bg)
+        table_frame = tk.Frame(parent, bg=bg)
         table_frame.pack(fill="both", expand=True, pady=(8, 0))
         columns = ("id", "last_name", "first_name", "email", "department", "phone")
         tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
@@ -826,11 +1359,11 @@ class DashboardFrame(tk.Frame):
         vsb.pack(side="right", fill="y")
 
         try:
-            for t in get_all_teachers() or []:
-                tree.insert("", "end", values=(t["id"], t["last_name"], t["first_name"], t["email"] or "", t["department"] or "", t["phone"] or ""))
+            TreeRows(tree, _teacher_values).load(get_all_teachers() or [])
         except Exception as e:
             messagebox.showerror("Erreur", f"Impossible de charger les enseignants.\n{e}")
-        _make_tree_sortable(tree)
+        make_sortable(tree)
+        self._register_live_view("teachers", tree, get_teachers_changed_since)
 
     def _add_teacher(self, tree):
         d = tk.Toplevel(self)
@@ -861,11 +1394,11 @@ class DashboardFrame(tk.Frame):
                 messagebox.showwarning("Validation", "Nom et prénom sont obligatoires.", parent=d)
                 return
             try:
-                create_teacher(e_prenom.get(), e_nom.get(), e_email.get(), e_phone.get(), e_dept.get())
+                row = create_teacher(e_prenom.get(), e_nom.get(), e_email.get(), e_phone.get(), e_dept.get())
                 messagebox.showinfo("Succès", "Enseignant ajouté.", parent=d)
                 d.destroy()
                 self.refresh_dashboard_stats()
-                self._show_teachers_view()
+                self._patch_view("teachers", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
@@ -913,11 +1446,11 @@ class DashboardFrame(tk.Frame):
                 messagebox.showwarning("Validation", "Nom et prénom sont obligatoires.", parent=d)
                 return
             try:
-                update_teacher(t["id"], e_prenom.get(), e_nom.get(), e_email.get(), e_phone.get(), e_dept.get())
+                row = update_teacher(t["id"], e_prenom.get(), e_nom.get(), e_email.get(), e_phone.get(), e_dept.get())
                 messagebox.showinfo("Succès", "Enseignant modifié.", parent=d)
                 d.destroy()
                 self.refresh_dashboard_stats()
-                self._show_teachers_view()
+                self._patch_view("teachers", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
@@ -925,29 +1458,28 @@ class DashboardFrame(tk.Frame):
         ModernButton(d, text="Enregistrer", command=save, font=("Segoe UI", 9), padx=10, pady=4).grid(row=6, column=1, padx=5)
 
     def _delete_teacher(self, tree):
-        sel = tree.selection()
-        if not sel:
-            messagebox.showwarning("Sélection", "Veuillez sélectionner un enseignant.")
-            return
-        if not messagebox.askyesno("Confirmation", "Supprimer cet enseignant ?"):
-            return
-        try:
-            delete_teacher(tree.item(sel[0])["values"][0])
-            messagebox.showinfo("Succès", "Enseignant supprimé.")
-            self.refresh_dashboard_stats()
-            self._show_teachers_view()
-        except Exception as ex:
-            messagebox.showerror("Erreur", str(ex))
+        """Supprime les enseignants sélectionnés (leurs cours deviennent non assignés)."""
+        self._delete_selected(
+            "teachers", tree, delete_teachers, "un enseignant", "Supprimer cet enseignant ?",
+            "enseignants", "Enseignant supprimé.", "supprimés", refresh_stats=True,
+        )
 
-    def _show_courses_view(self):
+    def _bulk_set_department(self, tree):
+        departments = reference_data.departments()
+        self._bulk_edit(
+            "teachers", tree, "Changer de département", "Département",
+            [(dep, dep) for dep in departments], set_teachers_department, free_text=True,
+        )
+
+    def _show_courses_view(self, parent):
         bg = APP_CONFIG["bg_color"]
         text_primary = APP_CONFIG["text_primary"]
         text_secondary = APP_CONFIG["text_secondary"]
 
-        header = tk.Label(self.content_frame, text="Gestion des cours", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
+        header = tk.Label(parent, text="Gestion des cours", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
         header.pack(fill="x")
         sub = tk.Label(
-            self.content_frame,
+            parent,
             text="Liste des cours." + (" CRUD disponible." if self.is_admin else " Lecture seule."),
             bg=bg,
             fg=text_secondary,
@@ -956,21 +1488,23 @@ class DashboardFrame(tk.Frame):
         )
         sub.pack(fill="x")
 
-        toolbar = tk.Frame(self.content_frame, bg=bg)
+        toolbar = tk.Frame(parent, bg=bg)
         toolbar.pack(fill="x", pady=(8, 4))
-        ModernButton(toolbar, text="Actualiser", command=self._show_courses_view, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        ModernButton(toolbar, text="Actualiser", command=lambda: self._refresh_live_view("courses"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
         if self.is_admin:
+            ModernButton(toolbar, text="Importer CSV", command=lambda: self._import_csv("courses", "courses"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+            ModernButton(toolbar, text="Changer d'enseignant", command=lambda: self._bulk_set_teacher(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Supprimer", command=lambda: self._delete_course(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Modifier", command=lambda: self._edit_course(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Ajouter", command=lambda: self._add_course(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
 
-        search_frame_c = tk.Frame(self.content_frame, bg=bg)
+        search_frame_c = tk.Frame(parent, bg=bg)
         search_frame_c.pack(fill="x", pady=(0, 4))
         tk.Label(search_frame_c, text="Rechercher:", bg=bg, fg=text_secondary, font=("Segoe UI", 9)).pack(side="left", padx=(0, 8))
         e_search_c = tk.Entry(search_frame_c, width=25, bg="#020617", fg=text_primary, insertbackground=text_primary)
         e_search_c.pack(side="left", padx=2)
 
-        table_frame = tk.Frame(self.content_frame, bg=bg)
+        table_frame = tk.Frame(parent, bg=bg)
         table_frame.pack(fill="both", expand=True, pady=(8, 0))
         columns = ("id", "code", "name", "credits", "teacher_name")
         tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
@@ -988,26 +1522,27 @@ class DashboardFrame(tk.Frame):
         tree.pack(side="left", fill="both", expand=True)
         vsb.pack(side="right", fill="y")
 
+        rows = TreeRows(tree, _course_values)
         try:
-            for c in get_all_courses() or []:
-                tree.insert("", "end", values=(c["id"], c["code"], c["name"], c["credits"], c["teacher_name"] or "Non assigné"))
+            rows.load(reference_data.courses())
         except Exception as e:
             messagebox.showerror("Erreur", f"Impossible de charger les cours.\n{e}")
-        _make_tree_sortable(tree, {"credits": "int"})
+        make_sortable(tree, {"credits": "int"})
 
-        def _on_search_courses(*_):
+        def _matches(c):
             q = e_search_c.get().strip().lower()
-            for item in tree.get_children(""):
-                tree.delete(item)
-            for c in get_all_courses() or []:
-                row_text = f"{c.get('code','')} {c.get('name','')} {c.get('teacher_name','')}".lower()
-                if not q or q in row_text:
-                    tree.insert("", "end", values=(c["id"], c["code"], c["name"], c["credits"], c["teacher_name"] or "Non assigné"))
+            row_text = f"{c.get('code','')} {c.get('name','')} {c.get('teacher_name','')}".lower()
+            return not q or q in row_text
+
+        def _on_search_courses(*_):
+            rows.load([c for c in reference_data.courses() if _matches(c)])
+
+        self._register_live_view("courses", tree, get_courses_changed_since, keep=_matches)
 
         e_search_c.bind("<KeyRelease>", _on_search_courses)
 
     def _add_course(self, tree):
-        teachers = get_all_teachers() or []
+        teachers = reference_data.teachers()
         teacher_choices = ["-- Aucun --"] + [f"{t['last_name']} {t['first_name']} (id:{t['id']})" for t in teachers]
 
         d = tk.Toplevel(self)
@@ -1046,11 +1581,11 @@ class DashboardFrame(tk.Frame):
                 sel = cb_teacher.get()
                 tid = int(sel.split("id:")[1].rstrip(")"))
             try:
-                create_course(e_code.get(), e_name.get(), cred, tid)
+                row = create_course(e_code.get(), e_name.get(), cred, tid)
                 messagebox.showinfo("Succès", "Cours ajouté.", parent=d)
                 d.destroy()
                 self.refresh_dashboard_stats()
-                self._show_courses_view()
+                self._patch_view("courses", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
@@ -1062,10 +1597,10 @@ class DashboardFrame(tk.Frame):
         if not sel:
             messagebox.showwarning("Sélection", "Veuillez sélectionner un cours.")
             return
-        c = get_course_by_id(tree.item(sel[0])["values"][0])
+        c = reference_data.get_course(tree.item(sel[0])["values"][0])
         if not c:
             return
-        teachers = get_all_teachers() or []
+        teachers = reference_data.teachers()
         teacher_choices = ["-- Aucun --"] + [f"{t['last_name']} {t['first_name']} (id:{t['id']})" for t in teachers]
         d = tk.Toplevel(self)
         d.title("Modifier le cours")
@@ -1111,11 +1646,11 @@ class DashboardFrame(tk.Frame):
                 sel = cb_teacher.get()
                 tid = int(sel.split("id:")[1].rstrip(")"))
             try:
-                update_course(c["id"], e_code.get(), e_name.get(), cred, tid)
+                row = update_course(c["id"], e_code.get(), e_name.get(), cred, tid)
                 messagebox.showinfo("Succès", "Cours modifié.", parent=d)
                 d.destroy()
                 self.refresh_dashboard_stats()
-                self._show_courses_view()
+                self._patch_view("courses", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
@@ -1123,29 +1658,28 @@ class DashboardFrame(tk.Frame):
         ModernButton(d, text="Enregistrer", command=save, font=("Segoe UI", 9), padx=10, pady=4).grid(row=5, column=1, padx=5)
 
     def _delete_course(self, tree):
-        sel = tree.selection()
-        if not sel:
-            messagebox.showwarning("Sélection", "Veuillez sélectionner un cours.")
-            return
-        if not messagebox.askyesno("Confirmation", "Supprimer ce cours ?"):
-            return
-        try:
-            delete_course(tree.item(sel[0])["values"][0])
-            messagebox.showinfo("Succès", "Cours supprimé.")
-            self.refresh_dashboard_stats()
-            self._show_courses_view()
-        except Exception as ex:
-            messagebox.showerror("Erreur", str(ex))
+        """Supprime les cours sélectionnés."""
+        self._delete_selected(
+            "courses", tree, delete_courses, "un cours", "Supprimer ce cours ?",
+            "cours", "Cours supprimé.", "supprimés", refresh_stats=True,
+        )
+
+    def _bulk_set_teacher(self, tree):
+        teachers = reference_data.teachers()
+        choices = [("-- Aucun --", None)] + [
+            (f"{t['last_name']} {t['first_name']} (id:{t['id']})", t["id"]) for t in teachers
+        ]
+        self._bulk_edit("courses", tree, "Changer d'enseignant", "Enseignant", choices, set_courses_teacher)
 
-    def _show_classes_view(self):
+    def _show_classes_view(self, parent):
         bg = APP_CONFIG["bg_color"]
         text_primary = APP_CONFIG["text_primary"]
         text_secondary = APP_CONFIG["text_secondary"]
 
-        header = tk.Label(self.content_frame, text="Gestion des classes", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
+        header = tk.Label(parent, text="Gestion des classes", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
         header.pack(fill="x")
         sub = tk.Label(
-            self.content_frame,
+            parent,
             text="Les cours sont attribués aux classes. Inscrivez les étudiants aux classes." + (" CRUD disponible." if self.is_admin else " Lecture seule."),
             bg=bg,
             fg=text_secondary,
@@ -1154,44 +1688,48 @@ class DashboardFrame(tk.Frame):
         )
         sub.pack(fill="x")
 
-        toolbar = tk.Frame(self.content_frame, bg=bg)
+        toolbar = tk.Frame(parent, bg=bg)
         toolbar.pack(fill="x", pady=(8, 4))
-        ModernButton(toolbar, text="Actualiser", command=self._show_classes_view, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        ModernButton(toolbar, text="Actualiser", command=lambda: self._refresh_live_view("classes"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
         if self.is_admin:
+            ModernButton(toolbar, text="Passage d'année", command=self._rollover_year, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Supprimer", command=lambda: self._delete_class(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Modifier", command=lambda: self._edit_class(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Ajouter", command=lambda: self._add_class(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
 
-        table_frame = tk.Frame(self.content_frame, bg=bg)
+        table_frame = tk.Frame(parent, bg=bg)
         table_frame.pack(fill="both", expand=True, pady=(8, 0))
-        columns = ("id", "name", "academic_year", "semester", "courses_count")
+        columns = ("id", "name", "academic_year", "semester", "courses_count", "average", "stdev")
         tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
         tree.column("id", width=0, minwidth=0)
         tree.heading("name", text="Classe")
         tree.heading("academic_year", text="Année")
         tree.heading("semester", text="Semestre")
         tree.heading("courses_count", text="Nb cours")
+        tree.heading("average", text="Moyenne")
+        tree.heading("stdev", text="Écart type")
         tree.column("name", width=180, anchor="w")
         tree.column("academic_year", width=100, anchor="center")
         tree.column("semester", width=70, anchor="center")
         tree.column("courses_count", width=80, anchor="center")
+        tree.column("average", width=80, anchor="center")
+        tree.column("stdev", width=80, anchor="center")
         vsb = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
         tree.configure(yscrollcommand=vsb.set)
         tree.pack(side="left", fill="both", expand=True)
         vsb.pack(side="right", fill="y")
 
         try:
-            for cl in get_all_classes() or []:
-                courses = get_courses_for_class(cl["id"]) or []
-                tree.insert("", "end", values=(cl["id"], cl["name"], cl["academic_year"], cl["semester"], len(courses)))
+            TreeRows(tree, _class_values).load(_with_class_averages(reference_data.classes()))
         except Exception as e:
             messagebox.showerror("Erreur", f"Impossible de charger les classes.\n{e}")
-        _make_tree_sortable(tree, {"courses_count": "int"})
+        make_sortable(tree, {"courses_count": "int", "average": "float", "stdev": "float"})
+        self._register_live_view("classes", tree, _classes_changed_since)
 
     def _add_class(self, tree):
         d = tk.Toplevel(self)
         d.title("Ajouter une classe")
-        d.geometry("480x280")
+        d.geometry("520x440")
         d.transient(self.winfo_toplevel())
         d.grab_set()
         bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
@@ -1208,29 +1746,22 @@ class DashboardFrame(tk.Frame):
         cb_sem.current(0)
         cb_sem.grid(row=2, column=1, padx=10, pady=4, sticky="w")
         tk.Label(d, text="Cours attribués à la classe", bg=bg, fg=fg).grid(row=3, column=0, sticky="nw", padx=10, pady=4)
-        courses = get_all_courses() or []
-        list_frame = tk.Frame(d, bg=bg)
-        list_frame.grid(row=3, column=1, padx=10, pady=4, sticky="nsew")
-        course_vars = []
-        for c in courses:
-            v = tk.BooleanVar(value=False)
-            course_vars.append((c["id"], v))
-            tk.Checkbutton(list_frame, text=f"{c['code']} - {c['name']}", variable=v, bg=bg, fg=fg, selectcolor=bg, activebackground=bg, activeforeground=fg).pack(anchor="w")
-        if not courses:
-            tk.Label(list_frame, text="Aucun cours. Créez des cours d'abord.", bg=bg, fg=fg).pack(anchor="w")
+        checklist = VirtualChecklist(d, _course_check_items(reference_data.courses()), bg=bg)
+        checklist.grid(row=3, column=1, padx=10, pady=4, sticky="nsew")
 
         def save():
             if not e_name.get().strip() or not e_year.get().strip():
                 messagebox.showwarning("Validation", "Nom et année obligatoires.", parent=d)
                 return
             try:
-                new_id = create_class(e_name.get(), e_year.get(), cb_sem.get())
-                if new_id and courses:
-                    set_class_courses(new_id, [cid for cid, v in course_vars if v.get()])
+                row = create_class(e_name.get(), e_year.get(), cb_sem.get())
+                if row and checklist.selected:
+                    set_class_courses(row["id"], checklist.get_selected())
+                    row = get_class_row(row["id"])
                 messagebox.showinfo("Succès", "Classe ajoutée.", parent=d)
                 d.destroy()
                 self.refresh_dashboard_stats()
-                self._show_classes_view()
+                self._patch_view("classes", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
@@ -1247,7 +1778,7 @@ class DashboardFrame(tk.Frame):
             return
         d = tk.Toplevel(self)
         d.title("Modifier la classe")
-        d.geometry("480x280")
+        d.geometry("520x440")
         d.transient(self.winfo_toplevel())
         d.grab_set()
         bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
@@ -1265,15 +1796,9 @@ class DashboardFrame(tk.Frame):
         cb_sem.set(cl["semester"])
         cb_sem.grid(row=2, column=1, padx=10, pady=4, sticky="w")
         tk.Label(d, text="Cours attribués", bg=bg, fg=fg).grid(row=3, column=0, sticky="nw", padx=10, pady=4)
-        courses = get_all_courses() or []
-        class_course_ids = {c["id"] for c in (get_courses_for_class(cl["id"]) or [])}
-        list_frame = tk.Frame(d, bg=bg)
-        list_frame.grid(row=3, column=1, padx=10, pady=4, sticky="nsew")
-        course_vars = []
-        for c in courses:
-            v = tk.BooleanVar(value=c["id"] in class_course_ids)
-            course_vars.append((c["id"], v))
-            tk.Checkbutton(list_frame, text=f"{c['code']} - {c['name']}", variable=v, bg=bg, fg=fg, selectcolor=bg, activebackground=bg, activeforeground=fg).pack(anchor="w")
+        class_course_ids = reference_data.class_course_ids(cl["id"])
+        checklist = VirtualChecklist(d, _course_check_items(reference_data.courses()), selected=class_course_ids, bg=bg)
+        checklist.grid(row=3, column=1, padx=10, pady=4, sticky="nsew")
 
         def save():
             if not e_name.get().strip() or not e_year.get().strip():
@@ -1281,11 +1806,12 @@ class DashboardFrame(tk.Frame):
                 return
             try:
                 update_class(cl["id"], e_name.get(), e_year.get(), cb_sem.get())
-                set_class_courses(cl["id"], [cid for cid, v in course_vars if v.get()])
+                set_class_courses(cl["id"], checklist.get_selected())
+                row = _with_class_averages([get_class_row(cl["id"])])[0]
                 messagebox.showinfo("Succès", "Classe modifiée.", parent=d)
                 d.destroy()
                 self.refresh_dashboard_stats()
-                self._show_classes_view()
+                self._patch_view("classes", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
@@ -1293,29 +1819,135 @@ class DashboardFrame(tk.Frame):
         ModernButton(d, text="Enregistrer", command=save, font=("Segoe UI", 9), padx=10, pady=4).grid(row=5, column=1, padx=5)
 
     def _delete_class(self, tree):
-        sel = tree.selection()
-        if not sel:
-            messagebox.showwarning("Sélection", "Veuillez sélectionner une classe.")
-            return
-        if not messagebox.askyesno("Confirmation", "Supprimer cette classe ? Les inscriptions et notes liées seront supprimées."):
+        """Supprime les classes sélectionnées (avec leurs inscriptions et notes)."""
+        self._delete_selected(
+            "classes", tree, delete_classes, "une classe",
+            "Supprimer cette classe ? Les inscriptions et notes liées seront supprimées.",
+            "classes", "Classe supprimée.", "supprimées", refresh_stats=True,
+            warning="Les inscriptions et notes liées seront supprimées.",
+        )
+
+    def _rollover_year(self):
+        """Passage d'année (rollover.py) : aperçu des compteurs, puis application après confirmation."""
+        from rollover import PASS_THRESHOLD, next_academic_year, rollover, summary
+
+        years = sorted({cl["academic_year"] for cl in reference_data.classes()}, reverse=True)
+        if not years:
+            messagebox.showwarning("Données", "Aucune classe à reconduire.")
             return
-        try:
-            delete_class(tree.item(sel[0])["values"][0])
-            messagebox.showinfo("Succès", "Classe supprimée.")
-            self.refresh_dashboard_stats()
-            self._show_classes_view()
-        except Exception as ex:
-            messagebox.showerror("Erreur", str(ex))
 
-    def _show_enrollments_view(self):
+        d = tk.Toplevel(self)
+        d.title("Passage d'année")
+        d.geometry("640x520")
+        d.transient(self.winfo_toplevel())
+        d.grab_set()
+        bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
+        d.configure(bg=bg)
+
+        form = tk.Frame(d, bg=bg)
+        form.pack(fill="x", padx=10, pady=(10, 4))
+        tk.Label(form, text="Année source", bg=bg, fg=fg).grid(row=0, column=0, sticky="w", pady=2)
+        cb_source = ttk.Combobox(form, values=years, state="readonly", width=15)
+        cb_source.current(0)
+        cb_source.grid(row=0, column=1, sticky="w", padx=8)
+        tk.Label(form, text="Année cible", bg=bg, fg=fg).grid(row=1, column=0, sticky="w", pady=2)
+        e_target = tk.Entry(form, width=17)
+        e_target.grid(row=1, column=1, sticky="w", padx=8)
+        tk.Label(form, text="Moyenne d'admission (/20)", bg=bg, fg=fg).grid(row=2, column=0, sticky="w", pady=2)
+        e_threshold = tk.Entry(form, width=8)
+        e_threshold.insert(0, f"{PASS_THRESHOLD:g}")
+        e_threshold.grid(row=2, column=1, sticky="w", padx=8)
+
+        def on_source_change(*_):
+            e_target.delete(0, "end")
+            try:
+                e_target.insert(0, next_academic_year(cb_source.get()))
+            except ValueError:
+                pass
+
+        cb_source.bind("<<ComboboxSelected>>", on_source_change)
+        on_source_change()
+
+        out = tk.Text(d, height=18, bg="#020617", fg=fg, wrap="none")
+        out.pack(fill="both", expand=True, padx=10, pady=6)
+        out.insert("1.0", "Lancez l'aperçu pour voir les classes reconduites et les étudiants promus.")
+        out.config(state="disabled")
+        previewed = {}
+
+        def _params():
+            try:
+                threshold = float(e_threshold.get().replace(",", "."))
+            except ValueError:
+                raise ValueError("Moyenne d'admission invalide.")
+            return cb_source.get(), e_target.get().strip() or None, threshold
+
+        def _show(text):
+            out.config(state="normal")
+            out.delete("1.0", "end")
+            out.insert("1.0", text)
+            out.config(state="disabled")
+
+        def run(apply):
+            try:
+                params = _params()
+            except ValueError as ex:
+                messagebox.showwarning("Validation", str(ex), parent=d)
+                return
+            if apply:
+                if previewed.get("params") != params:
+                    messagebox.showwarning("Validation", "Lancez d'abord l'aperçu avec ces paramètres.", parent=d)
+                    return
+                if not messagebox.askyesno(
+                    "Confirmation", f"Appliquer le passage d'année {params[0]} → {previewed['target_year']} ?", parent=d
+                ):
+                    return
+            btn_preview.config(state="disabled")
+            btn_apply.config(state="disabled")
+            _show("Calcul en cours…")
+
+            def _on_done(result):
+                if not d.winfo_exists():
+                    return
+                _show(summary(result))
+                btn_preview.config(state="normal")
+                if apply:
+                    previewed.clear()
+                    self.refresh_dashboard_stats()
+                    self._reload_view("classes")
+                else:
+                    previewed.update(params=params, target_year=result["target_year"])
+                    btn_apply.config(state="normal")
+
+            def _on_error(error):
+                if not d.winfo_exists():
+                    return
+                _show("")
+                btn_preview.config(state="normal")
+                btn_apply.config(state="normal")
+                messagebox.showerror("Erreur", str(error), parent=d)
+
+            source, target, threshold = params
+            run_in_background(
+                d, rollover, source, target, threshold, apply=apply, on_done=_on_done, on_error=_on_error
+            )
+
+        bottom = tk.Frame(d, bg=bg)
+        bottom.pack(fill="x", padx=10, pady=8)
+        ModernButton(bottom, text="Fermer", command=d.destroy, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        btn_apply = ModernButton(bottom, text="Appliquer", command=lambda: run(True), font=("Segoe UI", 9), padx=10, pady=4)
+        btn_apply.pack(side="right", padx=2)
+        btn_preview = ModernButton(bottom, text="Aperçu", command=lambda: run(False), font=("Segoe UI", 9), padx=10, pady=4)
+        btn_preview.pack(side="right", padx=2)
+
+    def _show_enrollments_view(self, parent):
         bg = APP_CONFIG["bg_color"]
         text_primary = APP_CONFIG["text_primary"]
         text_secondary = APP_CONFIG["text_secondary"]
 
-        header = tk.Label(self.content_frame, text="Gestion des inscriptions", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
+        header = tk.Label(parent, text="Gestion des inscriptions", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
         header.pack(fill="x")
         sub = tk.Label(
-            self.content_frame,
+            parent,
             text="Inscription des étudiants aux classes (année + semestre)." + (" Ajout et suppression disponibles." if self.is_admin else " Lecture seule."),
             bg=bg,
             fg=text_secondary,
@@ -1324,14 +1956,16 @@ class DashboardFrame(tk.Frame):
         )
         sub.pack(fill="x")
 
-        toolbar = tk.Frame(self.content_frame, bg=bg)
+        toolbar = tk.Frame(parent, bg=bg)
         toolbar.pack(fill="x", pady=(8, 4))
-        ModernButton(toolbar, text="Actualiser", command=self._show_enrollments_view, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        ModernButton(toolbar, text="Exporter CSV", command=lambda: self._run_csv_export("inscriptions.csv", export_dataset, "enrollments"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        ModernButton(toolbar, text="Actualiser", command=lambda: self._refresh_live_view("enrollments"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
         if self.is_admin:
+            ModernButton(toolbar, text="Inscription groupée", command=self._bulk_enroll, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Supprimer", command=lambda: self._delete_enrollment(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Ajouter", command=lambda: self._add_enrollment(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
 
-        table_frame = tk.Frame(self.content_frame, bg=bg)
+        table_frame = tk.Frame(parent, bg=bg)
         table_frame.pack(fill="both", expand=True, pady=(8, 0))
         columns = ("id", "academic_year", "semester", "matricule", "student_name", "class_name")
         tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
@@ -1352,19 +1986,17 @@ class DashboardFrame(tk.Frame):
         vsb.pack(side="right", fill="y")
 
         try:
-            for item in get_all_enrollments() or []:
-                tree.insert("", "end", values=(item["id"], item["academic_year"], item["semester"], item["matricule"], item["student_name"], item["class_name"]))
+            TreeRows(tree, _enrollment_values).load(get_all_enrollments() or [])
         except Exception as e:
             messagebox.showerror("Erreur", f"Impossible de charger les inscriptions.\n{e}")
-        _make_tree_sortable(tree)
+        make_sortable(tree)
+        self._register_live_view("enrollments", tree, get_enrollments_changed_since)
 
     def _add_enrollment(self, tree):
-        students = get_all_students() or []
-        classes = get_all_classes() or []
-        student_choices = [f"{s['matricule']} - {s['last_name']} {s['first_name']}" for s in students]
+        classes = reference_data.classes()
         class_choices = [f"{cl['name']} ({cl['academic_year']} {cl['semester']})" for cl in classes]
-        if not students or not classes:
-            messagebox.showwarning("Données", "Aucun étudiant ou classe disponible. Créez-en d'abord.")
+        if not classes:
+            messagebox.showwarning("Données", "Aucune classe disponible. Créez-en d'abord.")
             return
 
         d = tk.Toplevel(self)
@@ -1375,51 +2007,167 @@ class DashboardFrame(tk.Frame):
         bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
         d.configure(bg=bg)
         tk.Label(d, text="Étudiant *", bg=bg, fg=fg).grid(row=0, column=0, sticky="w", padx=10, pady=4)
-        cb_student = ttk.Combobox(d, values=student_choices, state="readonly", width=40)
-        cb_student.current(0)
-        cb_student.grid(row=0, column=1, padx=10, pady=4, sticky="w")
+        picker_student = SearchPicker(d, search_students, _student_choice, tables=("students",), width=43)
+        picker_student.grid(row=0, column=1, padx=10, pady=4, sticky="w")
+        picker_student.entry.focus_set()
         tk.Label(d, text="Classe *", bg=bg, fg=fg).grid(row=1, column=0, sticky="w", padx=10, pady=4)
         cb_class = ttk.Combobox(d, values=class_choices, state="readonly", width=40)
         cb_class.current(0)
         cb_class.grid(row=1, column=1, padx=10, pady=4, sticky="w")
 
         def save():
-            sid = students[cb_student.current()]["id"]
+            sid = picker_student.get_id()
+            if sid is None:
+                messagebox.showwarning("Validation", "Recherchez puis sélectionnez un étudiant.", parent=d)
+                return
             cl = classes[cb_class.current()]
             try:
-                create_enrollment(sid, cl["id"], cl["academic_year"], cl["semester"])
+                row = create_enrollment(sid, cl["id"], cl["academic_year"], cl["semester"])
                 messagebox.showinfo("Succès", "Inscription ajoutée.", parent=d)
                 d.destroy()
-                self._show_enrollments_view()
+                self._patch_view("enrollments", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
         ModernButton(d, text="Annuler", command=d.destroy, font=("Segoe UI", 9), padx=10, pady=4).grid(row=3, column=0, padx=5)
         ModernButton(d, text="Enregistrer", command=save, font=("Segoe UI", 9), padx=10, pady=4).grid(row=3, column=1, padx=5)
 
-    def _delete_enrollment(self, tree):
-        sel = tree.selection()
-        if not sel:
-            messagebox.showwarning("Sélection", "Veuillez sélectionner une inscription.")
-            return
-        if not messagebox.askyesno("Confirmation", "Supprimer cette inscription ?"):
+    def _bulk_enroll(self):
+        """Inscription groupée : sélection multiple, promotion d'une classe précédente ou liste de matricules."""
+        classes = reference_data.classes()
+        if not classes:
+            messagebox.showwarning("Données", "Aucune classe disponible. Créez-en d'abord.")
             return
+        class_choices = [f"{cl['name']} ({cl['academic_year']} {cl['semester']})" for cl in classes]
+
+        d = tk.Toplevel(self)
+        d.title("Inscription groupée")
+        d.geometry("620x560")
+        d.transient(self.winfo_toplevel())
+        d.grab_set()
+        bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
+        secondary = APP_CONFIG["text_secondary"]
+        d.configure(bg=bg)
+
+        top = tk.Frame(d, bg=bg)
+        top.pack(fill="x", padx=10, pady=(10, 4))
+        tk.Label(top, text="Classe cible *", bg=bg, fg=fg).pack(side="left")
+        cb_target = ttk.Combobox(top, values=class_choices, state="readonly", width=45)
+        cb_target.current(0)
+        cb_target.pack(side="left", padx=8)
+
+        notebook = ttk.Notebook(d)
+        notebook.pack(fill="both", expand=True, padx=10, pady=4)
+
+        # 1. Sélection d'étudiants
+        tab_select = tk.Frame(notebook, bg=bg)
+        checklist = VirtualChecklist(tab_select, bg=bg, height=300)
+        checklist.pack(fill="both", expand=True, padx=6, pady=6)
         try:
-            delete_enrollment(tree.item(sel[0])["values"][0])
-            messagebox.showinfo("Succès", "Inscription supprimée.")
-            self._show_enrollments_view()
+            checklist.set_items((st["id"], _student_choice(st)) for st in reference_data.students())
         except Exception as ex:
-            messagebox.showerror("Erreur", str(ex))
+            messagebox.showerror("Erreur", f"Impossible de charger les étudiants.\n{ex}", parent=d)
+
+        # 2. Promotion d'une classe précédente
+        tab_class = tk.Frame(notebook, bg=bg)
+        tk.Label(tab_class, text="Inscrire tous les étudiants de la classe :", bg=bg, fg=fg).pack(anchor="w", padx=6, pady=(10, 4))
+        cb_source = ttk.Combobox(tab_class, values=class_choices, state="readonly", width=45)
+        cb_source.pack(anchor="w", padx=6)
+        source_info = tk.Label(tab_class, text="", bg=bg, fg=secondary)
+        source_info.pack(anchor="w", padx=6, pady=6)
+        source_ids = []
+
+        def on_source_change(*_):
+            source_ids[:] = get_class_student_ids(classes[cb_source.current()]["id"])
+            source_info.config(text=f"{len(source_ids)} étudiant(s) dans cette classe.")
+
+        cb_source.bind("<<ComboboxSelected>>", on_source_change)
+
+        # 3. Liste de matricules
+        tab_list = tk.Frame(notebook, bg=bg)
+        tk.Label(tab_list, text="Matricules (un par ligne, ou séparés par des virgules / espaces) :", bg=bg, fg=fg).pack(anchor="w", padx=6, pady=(10, 4))
+        txt = tk.Text(tab_list, height=14, bg="#020617", fg=fg, insertbackground=fg)
+        txt.pack(fill="both", expand=True, padx=6, pady=(0, 6))
+
+        notebook.add(tab_select, text="Sélection")
+        notebook.add(tab_class, text="Classe précédente")
+        notebook.add(tab_list, text="Liste de matricules")
+
+        def _selected_students():
+            """Retourne (ids, matricules inconnus) selon l'onglet actif."""
+            tab = notebook.index(notebook.select())
+            if tab == 0:
+                return checklist.get_selected(), []
+            if tab == 1:
+                return list(source_ids), []
+            tokens = txt.get("1.0", "end").replace(",", " ").replace(";", " ").split()
+            found, missing = get_student_ids_by_matricules(tokens)
+            return list(found.values()), missing
+
+        def _summary(result, missing):
+            lines = [f"{len(result['enrolled'])} étudiant(s) inscrit(s)."]
+            already = result["already"]
+            if already:
+                lines.append(f"{len(already)} déjà inscrit(s) dans cette classe :")
+                lines += [f"  {r['matricule']} - {r['student_name']}" for r in already[:15]]
+                if len(already) > 15:
+                    lines.append(f"  … et {len(already) - 15} autre(s)")
+            if result["unknown"]:
+                lines.append(f"{len(result['unknown'])} étudiant(s) introuvable(s) (supprimé(s) entre-temps).")
+            if missing:
+                lines.append(f"{len(missing)} matricule(s) inconnu(s) : " + ", ".join(missing[:15]) + (" …" if len(missing) > 15 else ""))
+            return "\n".join(lines)
+
+        def save():
+            try:
+                student_ids, missing = _selected_students()
+            except Exception as ex:
+                messagebox.showerror("Erreur", str(ex), parent=d)
+                return
+            if not student_ids:
+                text = "Aucun étudiant choisi."
+                if missing:
+                    text += "\nMatricules inconnus : " + ", ".join(missing[:15])
+                messagebox.showwarning("Validation", text, parent=d)
+                return
+            target = classes[cb_target.current()]
+            save_btn.config(state="disabled")
+
+            def _on_done(result):
+                messagebox.showinfo("Inscription groupée", _summary(result, missing), parent=d)
+                d.destroy()
+                self.refresh_dashboard_stats()
+                self._reload_view("enrollments")
+
+            def _on_error(error):
+                save_btn.config(state="normal")
+                messagebox.showerror("Erreur", str(error), parent=d)
+
+            run_in_background(d, bulk_enroll, student_ids, target["id"], on_done=_on_done, on_error=_on_error)
 
-    def _show_grades_view(self):
+        bottom = tk.Frame(d, bg=bg)
+        bottom.pack(fill="x", padx=10, pady=8)
+        ModernButton(bottom, text="Annuler", command=d.destroy, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        save_btn = ModernButton(bottom, text="Inscrire", command=save, font=("Segoe UI", 9), padx=10, pady=4)
+        save_btn.pack(side="right", padx=2)
+
+    def _delete_enrollment(self, tree):
+        """Supprime les inscriptions sélectionnées (avec leurs notes)."""
+        self._delete_selected(
+            "enrollments", tree, delete_enrollments, "une inscription", "Supprimer cette inscription ?",
+            "inscriptions", "Inscription supprimée.", "supprimées",
+            warning="Les notes liées seront supprimées.",
+        )
+
+    def _show_grades_view(self, parent):
         bg = APP_CONFIG["bg_color"]
         text_primary = APP_CONFIG["text_primary"]
         text_secondary = APP_CONFIG["text_secondary"]
 
-        header = tk.Label(self.content_frame, text="Gestion des notes", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
+        header = tk.Label(parent, text="Gestion des notes", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
         header.pack(fill="x")
         sub = tk.Label(
-            self.content_frame,
+            parent,
             text="Relevé des notes." + (" Ajout, modification et suppression disponibles." if self.is_admin else " Lecture seule."),
             bg=bg,
             fg=text_secondary,
@@ -1428,15 +2176,17 @@ class DashboardFrame(tk.Frame):
         )
         sub.pack(fill="x")
 
-        toolbar = tk.Frame(self.content_frame, bg=bg)
+        toolbar = tk.Frame(parent, bg=bg)
         toolbar.pack(fill="x", pady=(8, 4))
-        ModernButton(toolbar, text="Exporter CSV", command=lambda: _export_treeview_to_csv(tree, "notes.csv") and messagebox.showinfo("Export", "Export terminé."), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
-        ModernButton(toolbar, text="Actualiser", command=self._show_grades_view, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        ModernButton(toolbar, text="Exporter CSV", command=lambda: self._run_csv_export("notes.csv", export_dataset, "grades"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        ModernButton(toolbar, text="Actualiser", command=lambda: self._refresh_live_view("grades"), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
         if self.is_admin:
+            ModernButton(toolbar, text="Saisie par classe", command=self._open_grade_grid, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+            ModernButton(toolbar, text="Importer notes (CSV)", command=self._import_grades_csv, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Supprimer", command=lambda: self._delete_grade(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
             ModernButton(toolbar, text="Modifier / Ajouter", command=lambda: self._edit_or_add_grade(tree), font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
 
-        table_frame = tk.Frame(self.content_frame, bg=bg)
+        table_frame = tk.Frame(parent, bg=bg)
         table_frame.pack(fill="both", expand=True, pady=(8, 0))
         columns = ("id", "enrollment_id", "course_id", "academic_year", "semester", "student_name", "class_name", "course_name", "grade")
         tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
@@ -1463,33 +2213,13 @@ class DashboardFrame(tk.Frame):
             tree.bind("<Double-1>", lambda e: self._edit_or_add_grade(tree))
 
         try:
-            for item in get_all_grades() or []:
-                tree.insert(
-                    "",
-                    "end",
-                    values=(
-                        item["id"],
-                        item["enrollment_id"],
-                        item["course_id"],
-                        item["academic_year"],
-                        item["semester"],
-                        item["student_name"],
-                        item["class_name"],
-                        item["course_name"],
-                        item["grade"] if item["grade"] is not None else "-",
-                    ),
-                )
+            TreeRows(tree, _grade_values).load(get_all_grades() or [])
         except Exception as e:
             messagebox.showerror("Erreur", f"Impossible de charger les notes.\n{e}")
-        _make_tree_sortable(tree, {"grade": "float"})
+        make_sortable(tree, {"grade": "float"})
+        self._register_live_view("grades", tree, get_grades_changed_since)
 
     def _edit_or_add_grade(self, tree):
-        enrollments = get_all_enrollments() or []
-        if not enrollments:
-            messagebox.showwarning("Données", "Aucune inscription. Créez des inscriptions d'abord.")
-            return
-        enrollment_choices = [f"{e['matricule']} - {e['student_name']} | {e['class_name']} ({e['academic_year']} {e['semester']})" for e in enrollments]
-
         enrollment_id = None
         course_id = None
         initial_grade = ""
@@ -1508,40 +2238,29 @@ class DashboardFrame(tk.Frame):
         bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
         d.configure(bg=bg)
         tk.Label(d, text="Inscription (étudiant + classe)", bg=bg, fg=fg).grid(row=0, column=0, sticky="w", padx=10, pady=4)
-        cb_enr = ttk.Combobox(d, values=enrollment_choices, state="readonly", width=48)
-        enr_idx = 0
-        if enrollment_id:
-            for i, e in enumerate(enrollments):
-                if e["id"] == enrollment_id:
-                    enr_idx = i
-                    break
-        cb_enr.current(enr_idx)
-        cb_enr.grid(row=0, column=1, padx=10, pady=4, sticky="w")
-
-        class_id = enrollments[enr_idx].get("class_id") if enr_idx < len(enrollments) else None
-        course_list = get_courses_for_class(class_id) if class_id else []
-        course_choices = [f"{c['code']} - {c['name']}" for c in course_list]
         tk.Label(d, text="Cours (de la classe)", bg=bg, fg=fg).grid(row=1, column=0, sticky="w", padx=10, pady=4)
-        cb_course = ttk.Combobox(d, values=course_choices, state="readonly", width=48)
-        course_idx = 0
-        if course_id and course_list:
-            for i, c in enumerate(course_list):
-                if c["id"] == course_id:
-                    course_idx = i
-                    break
-        if course_list:
-            cb_course.current(min(course_idx, len(course_list) - 1))
+        cb_course = ttk.Combobox(d, values=[], state="readonly", width=48)
         cb_course.grid(row=1, column=1, padx=10, pady=4, sticky="w")
+        class_courses = []
+
+        def on_enr_change(enrollment, preferred_course=None):
+            class_courses[:] = reference_data.courses_for_class(enrollment["class_id"])
+            cb_course["values"] = [f"{c['code']} - {c['name']}" for c in class_courses]
+            idx = next((i for i, c in enumerate(class_courses) if c["id"] == preferred_course), 0)
+            if class_courses:
+                cb_course.current(idx)
+            else:
+                cb_course.set("")
 
-        def on_enr_change(*_):
-            i = cb_enr.current()
-            if 0 <= i < len(enrollments):
-                cid = enrollments[i].get("class_id")
-                cl = get_courses_for_class(cid) if cid else []
-                cb_course["values"] = [f"{c['code']} - {c['name']}" for c in cl]
-                cb_course.current(0 if cl else -1)
-
-        cb_enr.bind("<<ComboboxSelected>>", on_enr_change)
+        picker_enr = SearchPicker(d, search_enrollments, _enrollment_choice, tables=("enrollments",), on_select=on_enr_change, width=51)
+        picker_enr.grid(row=0, column=1, padx=10, pady=4, sticky="w")
+        if enrollment_id:
+            current = get_enrollment_rows([enrollment_id])
+            if current:
+                picker_enr.set_row(current[0])
+                on_enr_change(current[0], course_id)
+        else:
+            picker_enr.entry.focus_set()
 
         tk.Label(d, text="Note (0-20)", bg=bg, fg=fg).grid(row=2, column=0, sticky="w", padx=10, pady=4)
         e_grade = tk.Entry(d, width=10, bg="#020617", fg=fg, insertbackground=fg)
@@ -1549,18 +2268,18 @@ class DashboardFrame(tk.Frame):
         e_grade.grid(row=2, column=1, padx=10, pady=4, sticky="w")
 
         def save():
-            idx = cb_enr.current()
-            eid = enrollments[idx]["id"]
-            cid = enrollments[idx].get("class_id")
-            curr_courses = get_courses_for_class(cid) if cid else []
-            if not curr_courses:
+            eid = picker_enr.get_id()
+            if eid is None:
+                messagebox.showwarning("Validation", "Recherchez puis sélectionnez une inscription.", parent=d)
+                return
+            if not class_courses:
                 messagebox.showwarning("Validation", "Aucun cours dans cette classe.", parent=d)
                 return
             ci = cb_course.current()
-            if ci < 0 or ci >= len(curr_courses):
+            if ci < 0 or ci >= len(class_courses):
                 messagebox.showwarning("Validation", "Sélectionnez un cours.", parent=d)
                 return
-            course_id_val = curr_courses[ci]["id"]
+            course_id_val = class_courses[ci]["id"]
             g = e_grade.get().strip()
             try:
                 grade_val = float(g) if g else None
@@ -1571,40 +2290,318 @@ class DashboardFrame(tk.Frame):
                 messagebox.showwarning("Validation", "La note doit être un nombre.", parent=d)
                 return
             try:
-                create_or_update_grade(eid, course_id_val, grade_val)
+                row = create_or_update_grade(eid, course_id_val, grade_val)
                 messagebox.showinfo("Succès", "Note enregistrée.", parent=d)
                 d.destroy()
-                self._show_grades_view()
+                self._patch_view("grades", tree, upserts=[row])
             except Exception as ex:
                 messagebox.showerror("Erreur", str(ex), parent=d)
 
         ModernButton(d, text="Annuler", command=d.destroy, font=("Segoe UI", 9), padx=10, pady=4).grid(row=4, column=0, padx=5)
         ModernButton(d, text="Enregistrer", command=save, font=("Segoe UI", 9), padx=10, pady=4).grid(row=4, column=1, padx=5)
 
-    def _delete_grade(self, tree):
-        sel = tree.selection()
-        if not sel:
-            messagebox.showwarning("Sélection", "Veuillez sélectionner une note.")
+    def _open_grade_grid(self):
+        """Saisie des notes d'une classe pour un cours dans une grille, enregistrement groupé."""
+        classes = reference_data.classes()
+        if not classes:
+            messagebox.showwarning("Données", "Aucune classe disponible.")
             return
-        if not messagebox.askyesno("Confirmation", "Supprimer cette note ?"):
-            return
-        try:
-            delete_grade(tree.item(sel[0])["values"][0])
-            messagebox.showinfo("Succès", "Note supprimée.")
-            self._show_grades_view()
-        except Exception as ex:
-            messagebox.showerror("Erreur", str(ex))
 
-    def _show_bulletins_view(self):
+        d = tk.Toplevel(self)
+        d.title("Saisie des notes par classe")
+        d.geometry("560x600")
+        d.transient(self.winfo_toplevel())
+        d.grab_set()
+        bg, fg = APP_CONFIG["card_bg"], APP_CONFIG["text_primary"]
+        d.configure(bg=bg)
+
+        top = tk.Frame(d, bg=bg)
+        top.pack(fill="x", padx=10, pady=(10, 4))
+        tk.Label(top, text="Classe", bg=bg, fg=fg).grid(row=0, column=0, sticky="w", pady=2)
+        cb_class = ttk.Combobox(top, values=[f"{cl['name']} ({cl['academic_year']} {cl['semester']})" for cl in classes], state="readonly", width=40)
+        cb_class.grid(row=0, column=1, sticky="w", padx=8, pady=2)
+        tk.Label(top, text="Cours", bg=bg, fg=fg).grid(row=1, column=0, sticky="w", pady=2)
+        cb_course = ttk.Combobox(top, values=[], state="readonly", width=40)
+        cb_course.grid(row=1, column=1, sticky="w", padx=8, pady=2)
+
+        status = tk.Label(d, text="", bg=bg, fg=APP_CONFIG["text_secondary"], anchor="w", font=("Segoe UI", 9))
+        # key : (class_id, course_id) affiché dans la grille ; class_index : classe de state["class_courses"]
+        state = {"class_index": None, "class_courses": [], "key": None, "saving": False, "saved_any": False}
+
+        def _update_status():
+            n = len(grid.dirty())
+            save_btn.config(text=f"Enregistrer ({n})" if n else "Enregistrer")
+            status.config(text=f"{n} note(s) modifiée(s) non enregistrée(s)." if n else "Aucune modification en attente.", fg=APP_CONFIG["text_secondary"])
+
+        grid = GradeEntryGrid(d, on_change=lambda: _update_status(), on_message=lambda m: status.config(text=m, fg="#f87171"), bg=bg)
+        grid.pack(fill="both", expand=True, padx=10, pady=4)
+        status.pack(fill="x", padx=10)
+
+        bottom = tk.Frame(d, bg=bg)
+        bottom.pack(fill="x", padx=10, pady=8)
+        autosave = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            bottom,
+            text=f"Enregistrement automatique ({APP_CONFIG['grade_autosave_ms'] // 1000} s)",
+            variable=autosave,
+            bg=bg, fg=fg, selectcolor=bg, activebackground=bg, activeforeground=fg,
+        ).pack(side="left")
+
+        def save(commit=True, then=None):
+            if state["saving"] or state["key"] is None:
+                return
+            if commit and not grid.commit_current():
+                return
+            changes = grid.dirty()
+            if not changes:
+                if then is not None:
+                    then()
+                return
+            state["saving"] = True
+            key = state["key"]
+            status.config(text="Enregistrement…", fg=APP_CONFIG["text_secondary"])
+
+            def _on_done(_count):
+                state["saving"] = False
+                state["saved_any"] = True
+                if state["key"] == key:
+                    grid.mark_saved(changes)
+                if then is not None:
+                    then()
+
+            def _on_error(error):
+                state["saving"] = False
+                messagebox.showerror("Erreur", f"Enregistrement impossible : {error}", parent=d)
+                _update_status()
+
+            run_in_background(d, save_grades_batch, key[1], changes, on_done=_on_done, on_error=_on_error)
+
+        def _confirm_discard():
+            """True si l'on peut abandonner la grille courante (enregistrée ou non)."""
+            grid.commit_current()
+            if not grid.dirty():
+                return True
+            answer = messagebox.askyesnocancel("Notes", "Enregistrer les notes modifiées ?", parent=d)
+            if answer is None:
+                return False
+            if answer:
+                save(commit=False)
+            return True
+
+        def _show_gradebook(key):
+            state["key"] = key
+            try:
+                grid.load(get_class_gradebook(*key))
+            except Exception as ex:
+                messagebox.showerror("Erreur", str(ex), parent=d)
+
+        def load_gradebook(*_):
+            ci, ki = cb_class.current(), cb_course.current()
+            if ci < 0 or ki < 0:
+                return
+            key = (classes[ci]["id"], state["class_courses"][ki]["id"])
+            if key == state["key"]:
+                return
+            if state["saving"] or not _confirm_discard():
+                # La grille garde le cours affiché : la liste aussi
+                ids = [c["id"] for c in state["class_courses"]]
+                if state["key"] is not None and state["key"][1] in ids:
+                    cb_course.current(ids.index(state["key"][1]))
+                return
+            _show_gradebook(key)
+
+        def on_class_change(*_):
+            ci = cb_class.current()
+            if ci < 0 or ci == state["class_index"]:
+                return
+            if state["class_index"] is not None and (state["saving"] or not _confirm_discard()):
+                # Annulé : rien ne change, la liste revient à la classe affichée
+                cb_class.current(state["class_index"])
+                return
+            state["class_index"] = ci
+            state["class_courses"] = reference_data.courses_for_class(classes[ci]["id"])
+            cb_course["values"] = [f"{c['code']} - {c['name']}" for c in state["class_courses"]]
+            if state["class_courses"]:
+                cb_course.current(0)
+                _show_gradebook((classes[ci]["id"], state["class_courses"][0]["id"]))
+            else:
+                cb_course.set("")
+                state["key"] = None
+                grid.load([])
+                status.config(text="Aucun cours attribué à cette classe.")
+
+        def _autosave_tick():
+            if not d.winfo_exists():
+                return
+            if autosave.get() and grid.dirty():
+                save(commit=False)
+            d.after(APP_CONFIG["grade_autosave_ms"], _autosave_tick)
+
+        def close():
+            if state["saving"]:
+                return
+
+            def finish():
+                d.destroy()
+                if state["saved_any"]:
+                    self._reload_view("grades")
+
+            grid.commit_current()
+            if grid.dirty():
+                answer = messagebox.askyesnocancel("Notes", "Enregistrer les notes modifiées ?", parent=d)
+                if answer is None:
+                    return
+                if answer:
+                    save(commit=False, then=finish)
+                    return
+            finish()
+
+        cb_class.bind("<<ComboboxSelected>>", on_class_change)
+        cb_course.bind("<<ComboboxSelected>>", load_gradebook)
+        ModernButton(bottom, text="Fermer", command=close, font=("Segoe UI", 9), padx=10, pady=4).pack(side="right", padx=2)
+        save_btn = ModernButton(bottom, text="Enregistrer", command=save, font=("Segoe UI", 9), padx=10, pady=4)
+        save_btn.pack(side="right", padx=2)
+        d.protocol("WM_DELETE_WINDOW", close)
+        cb_class.current(0)
+        on_class_change()
+        d.after(APP_CONFIG["grade_autosave_ms"], _autosave_tick)
+
+    def _delete_grade(self, tree):
+        """Supprime les notes sélectionnées."""
+        self._delete_selected(
+            "grades", tree, delete_grades, "une note", "Supprimer cette note ?",
+            "notes", "Note supprimée.", "supprimées",
+        )
+
+    def _show_statistics_view(self, parent):
+        """Statistiques des notes par tranche (models_statistics), calculées en arrière-plan."""
+        from models_archives import get_available_academic_years
+        from models_statistics import get_grade_statistics, get_slice_statistics
+
+        bg = APP_CONFIG["bg_color"]
+        text_primary = APP_CONFIG["text_primary"]
+        text_secondary = APP_CONFIG["text_secondary"]
+
+        header = tk.Label(parent, text="Statistiques des notes", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
+        header.pack(fill="x")
+        sub = tk.Label(
+            parent,
+            text="Notes attendues (inscriptions × cours de la classe), saisies, manquantes, moyenne, dispersion et réussite (note ≥ 10).",
+            bg=bg,
+            fg=text_secondary,
+            font=("Segoe UI", 10),
+            anchor="w",
+        )
+        sub.pack(fill="x")
+
+        # Filtres : libellé affiché -> valeur passée au modèle
+        all_label = "Tous"
+        years = {all_label: None, **{y: y for y in get_available_academic_years() or []}}
+        semesters = {all_label: None, "S1": "S1", "S2": "S2"}
+        classes = {all_label: None, **{f"{cl['name']} ({cl['academic_year']} {cl['semester']})": cl["id"] for cl in reference_data.classes()}}
+        courses = {all_label: None, **{f"{c['code']} - {c['name']}": c["id"] for c in reference_data.courses()}}
+        teachers = {all_label: None, **{f"{t['last_name']} {t['first_name']}": t["id"] for t in reference_data.teachers()}}
+        groups = {"Cours": "course", "Classe": "class", "Enseignant": "teacher", "Année": "year", "Semestre": "semester"}
+
+        filter_frame = tk.Frame(parent, bg=bg)
+        filter_frame.pack(fill="x", pady=(8, 4))
+        combos = {}
+        for name, label, choices, width in (
+            ("academic_year", "Année", years, 11),
+            ("semester", "Semestre", semesters, 5),
+            ("class_id", "Classe", classes, 22),
+            ("course_id", "Cours", courses, 22),
+            ("teacher_id", "Enseignant", teachers, 18),
+            ("group_by", "Par", groups, 11),
+        ):
+            tk.Label(filter_frame, text=label, bg=bg, fg=text_primary, font=("Segoe UI", 9)).pack(side="left", padx=(8, 4))
+            cb = ttk.Combobox(filter_frame, values=list(choices), state="readonly", width=width)
+            cb.current(0)
+            cb.pack(side="left", padx=2)
+            cb.bind("<<ComboboxSelected>>", lambda _e: _compute())
+            combos[name] = (cb, choices)
+
+        summary = tk.Label(parent, text="", bg=bg, fg=text_secondary, font=("Segoe UI", 10), anchor="w", justify="left")
+        summary.pack(fill="x", pady=(4, 4))
+
+        table_frame = tk.Frame(parent, bg=bg)
+        table_frame.pack(fill="both", expand=True)
+        columns = ("key", "label", "slots", "count", "missing_rate", "mean", "median", "stdev", "q1", "q3", "min", "max", "pass_rate")
+        headings = {
+            "label": ("Groupe", 220, "w"), "slots": ("Attendues", 75, "e"), "count": ("Saisies", 65, "e"),
+            "missing_rate": ("Manquantes (%)", 95, "e"), "mean": ("Moyenne", 70, "e"), "median": ("Médiane", 70, "e"),
+            "stdev": ("Écart type", 75, "e"), "q1": ("Q1", 55, "e"), "q3": ("Q3", 55, "e"), "min": ("Min", 55, "e"),
+            "max": ("Max", 55, "e"), "pass_rate": ("Réussite (%)", 85, "e"),
+        }
+        tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
+        tree.column("key", width=0, minwidth=0, stretch=False)
+        for col, (text, width, anchor) in headings.items():
+            tree.heading(col, text=text)
+            tree.column(col, width=width, anchor=anchor)
+        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+
+        def _num(v):
+            return f"{v:.2f}" if v is not None else "-"
+
+        def _pct(v):
+            return f"{v * 100:.1f}" if v is not None else "-"
+
+        def _values(st):
+            return (
+                st["key"], st["label"], st["slots"], st["count"], _pct(st["missing_rate"]), _num(st["mean"]),
+                _num(st["median"]), _num(st["stdev"]), _num(st["q1"]), _num(st["q3"]), _num(st["min"]),
+                _num(st["max"]), _pct(st["pass_rate"]),
+            )
+
+        rows = TreeRows(tree, _values)
+        make_sortable(tree, {c: "float" for c in columns if c not in ("key", "label")})
+        state = {"generation": 0}
+
+        def _load(group_by, filters):
+            return get_slice_statistics(**filters), get_grade_statistics(group_by, **filters)
+
+        def _compute():
+            values = {name: choices[cb.get()] for name, (cb, choices) in combos.items()}
+            group_by = values.pop("group_by")
+            state["generation"] += 1
+            generation = state["generation"]
+            summary.configure(text="Calcul en cours…")
+
+            def _on_done(result):
+                if generation != state["generation"]:
+                    return
+                total, groups_stats = result
+                summary.configure(
+                    text=(
+                        f"Ensemble : {total['count']}/{total['slots']} notes saisies ({_pct(total['missing_rate'])} % manquantes)"
+                        f"  |  moyenne {_num(total['mean'])}, médiane {_num(total['median'])}, écart type {_num(total['stdev'])}"
+                        f"  |  quartiles {_num(total['q1'])} / {_num(total['q3'])}  |  réussite {_pct(total['pass_rate'])} %"
+                    )
+                )
+                # Clé de ligne propre à chaque regroupement (les clés d'années ne sont pas des ids)
+                rows.load([{**st, "key": i} for i, st in enumerate(groups_stats)])
+
+            def _on_error(ex):
+                if generation == state["generation"]:
+                    summary.configure(text=f"Calcul impossible : {ex}")
+
+            run_in_background(tree, _load, group_by, values, on_done=_on_done, on_error=_on_error)
+
+        _compute()
+
+    def _show_bulletins_view(self, parent):
         """Consulter et imprimer les bulletins des étudiants."""
         bg = APP_CONFIG["bg_color"]
         text_primary = APP_CONFIG["text_primary"]
         text_secondary = APP_CONFIG["text_secondary"]
 
-        header = tk.Label(self.content_frame, text="Bulletins des étudiants", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
+        header = tk.Label(parent, text="Bulletins des étudiants", bg=bg, fg=text_primary, font=("Segoe UI", 12, "bold"), anchor="w")
         header.pack(fill="x")
         sub = tk.Label(
-            self.content_frame,
+            parent,
             text="Sélectionnez un étudiant, une année et un semestre pour afficher le bulletin puis l'imprimer.",
             bg=bg,
             fg=text_secondary,
@@ -1613,19 +2610,23 @@ class DashboardFrame(tk.Frame):
         )
         sub.pack(fill="x")
 
-        filter_frame = tk.Frame(self.content_frame, bg=bg)
+        filter_frame = tk.Frame(parent, bg=bg)
         filter_frame.pack(fill="x", pady=(8, 4))
         tk.Label(filter_frame, text="Étudiant", bg=bg, fg=text_primary, font=("Segoe UI", 10)).pack(side="left", padx=(0, 8))
-        students = get_all_students() or []
-        student_choices = [f"{s['matricule']} - {s['last_name']} {s['first_name']}" for s in students]
-        cb_student = ttk.Combobox(filter_frame, values=student_choices, state="readonly", width=35)
-        cb_student.current(0 if students else -1)
-        cb_student.pack(side="left", padx=4)
+        picker_student = SearchPicker(
+            filter_frame,
+            search_students,
+            _student_choice,
+            tables=("students",),
+            on_select=lambda _row: (_refresh_periods(), _refresh_bulletin()),
+            width=35,
+        )
+        picker_student.pack(side="left", padx=4)
         tk.Label(filter_frame, text="Période", bg=bg, fg=text_primary, font=("Segoe UI", 10)).pack(side="left", padx=(12, 4))
         cb_period = ttk.Combobox(filter_frame, values=[], state="readonly", width=18)
         cb_period.pack(side="left", padx=4)
 
-        bulletin_frame = tk.Frame(self.content_frame, bg=APP_CONFIG.get("card_bg", bg))
+        bulletin_frame = tk.Frame(parent, bg=APP_CONFIG.get("card_bg", bg))
         bulletin_frame.pack(fill="both", expand=True, pady=(8, 0))
         self._bulletin_text = tk.Text(bulletin_frame, wrap="word", font=("Consolas", 10), bg="#1a1a2e", fg=text_primary, padx=16, pady=16)
         vsb_b = ttk.Scrollbar(bulletin_frame, orient="vertical", command=self._bulletin_text.yview)
@@ -1634,11 +2635,11 @@ class DashboardFrame(tk.Frame):
         vsb_b.pack(side="right", fill="y")
 
         def _refresh_periods():
-            if not students or cb_student.current() < 0:
+            sid = picker_student.get_id()
+            if sid is None:
                 cb_period["values"] = []
                 cb_period.set("")
                 return
-            sid = students[cb_student.current()]["id"]
             periods = get_student_periods(sid)
             choices = [f"{p['academic_year']} {p['semester']}" for p in periods]
             cb_period["values"] = choices
@@ -1649,10 +2650,11 @@ class DashboardFrame(tk.Frame):
 
         def _refresh_bulletin():
             self._bulletin_text.delete("1.0", "end")
-            if not students:
-                self._bulletin_text.insert("end", "Aucun étudiant.")
+            sid = picker_student.get_id()
+            if sid is None:
+                self._bulletin_text.insert("end", "Recherchez un étudiant (matricule, nom ou prénom).")
+                self._bulletin_data = None
                 return
-            sid = students[cb_student.current()]["id"]
             period = (cb_period.get() or "").strip()
             if not period:
                 self._bulletin_text.insert("end", "Aucune inscription trouvée pour cet étudiant.")
@@ -1696,45 +2698,26 @@ class DashboardFrame(tk.Frame):
             if not getattr(self, "_bulletin_data", None):
                 return
             student, rows, year, sem = self._bulletin_data
-            import tempfile
-            import webbrowser
-            import os
-            html = f"""
-<!DOCTYPE html>
-<html><head><meta charset="utf-8"><title>Bulletin - {student.get('last_name','')}</title>
-<style>body{{ font-family: Segoe UI, sans-serif; margin: 24px; }} table{{ border-collapse: collapse; width:100%; }} th,td{{ border:1px solid #333; padding:8px; text-align:left; }} th{{ background:#2563eb; color:white; }}</style></head>
-<body>
-<h1>Bulletin de notes</h1>
-<p><strong>Matricule:</strong> {student.get('matricule','')} &nbsp; <strong>Nom:</strong> {student.get('last_name','')} {student.get('first_name','')}</p>
-<p><strong>Année:</strong> {year} &nbsp; <strong>Semestre:</strong> {sem}</p>
-<table>
-<tr><th>Classe</th><th>Cours</th><th>Code</th><th>Note</th></tr>
-"""
-            for r in rows:
-                g = r.get("grade")
-                grade_str = str(g) if g is not None else "-"
-                html += f"<tr><td>{r.get('class_name','')}</td><td>{r.get('course_name','')}</td><td>{r.get('course_code','')}</td><td>{grade_str}</td></tr>\n"
-            html += "</table><p><em>Document généré par l'application Gestion université.</em></p></body></html>"
-            path = os.path.join(tempfile.gettempdir(), "bulletin.html")
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(html)
-            webbrowser.open("file://" + path)
+            from reports import open_bulletin_in_browser
+
+            open_bulletin_in_browser(student, rows, year, sem)
             messagebox.showinfo("Impression", "Le bulletin a été ouvert dans le navigateur. Utilisez Ctrl+P pour imprimer.")
 
         ModernButton(filter_frame, text="Actualiser", command=_refresh_bulletin, font=("Segoe UI", 9), padx=10, pady=4).pack(side="left", padx=(16, 0))
         ModernButton(filter_frame, text="Ouvrir pour impression", command=_print_bulletin, font=("Segoe UI", 9), padx=10, pady=4).pack(side="left", padx=4)
-        cb_student.bind("<<ComboboxSelected>>", lambda e: (_refresh_periods(), _refresh_bulletin()))
         cb_period.bind("<<ComboboxSelected>>", lambda e: _refresh_bulletin())
         _refresh_periods()
         _refresh_bulletin()
 
-    def _show_archives_view(self):
+    def _show_archives_view(self, parent):
+        from models_archives import ARCHIVE_DATASETS, get_archive_datasets, get_available_academic_years
+
         bg = APP_CONFIG["bg_color"]
         text_primary = APP_CONFIG["text_primary"]
         text_secondary = APP_CONFIG["text_secondary"]
 
         header = tk.Label(
-            self.content_frame,
+            parent,
             text="Archives - 10 dernières années",
             bg=bg,
             fg=text_primary,
@@ -1743,7 +2726,7 @@ class DashboardFrame(tk.Frame):
         )
         header.pack(fill="x")
         sub = tk.Label(
-            self.content_frame,
+            parent,
             text="Sélectionnez une année académique pour consulter les données (étudiants inscrits, enseignants, cours, inscriptions, notes).",
             bg=bg,
             fg=text_secondary,
@@ -1752,7 +2735,7 @@ class DashboardFrame(tk.Frame):
         )
         sub.pack(fill="x")
 
-        filter_frame = tk.Frame(self.content_frame, bg=bg)
+        filter_frame = tk.Frame(parent, bg=bg)
         filter_frame.pack(fill="x", pady=(8, 4))
         tk.Label(filter_frame, text="Année académique :", bg=bg, fg=text_primary, font=("Segoe UI", 10)).pack(side="left", padx=(0, 8))
         years = ["Toutes les années"] + (get_available_academic_years() or [])
@@ -1760,7 +2743,7 @@ class DashboardFrame(tk.Frame):
         cb_year.current(0)
         cb_year.pack(side="left", padx=2)
 
-        notebook = ttk.Notebook(self.content_frame)
+        notebook = ttk.Notebook(parent)
         notebook.pack(fill="both", expand=True, pady=(8, 0))
 
         def _make_tab_frame():
@@ -1831,43 +2814,109 @@ class DashboardFrame(tk.Frame):
         tree_g.pack(side="left", fill="both", expand=True)
         vsb_g.pack(side="right", fill="y")
 
-        def _load_archives():
+        def _grade_archive_values(g):
+            grade = g.get("grade")
+            return (g["id"], g["academic_year"], g["semester"], g["student_name"], g["course_name"], "-" if grade is None else grade)
+
+        # Un onglet n'est chargé qu'à sa première sélection (puis après un
+        # changement d'année) ; les lignes sont insérées par tranches via after().
+        # Au-delà de archive_rows_budget lignes, les onglets masqués les moins
+        # récemment consultés sont vidés et seront rechargés à la demande.
+        archive_tabs = {
+            "students": TreeRows(tree_s, _student_values),
+            "teachers": TreeRows(tree_t, _teacher_values),
+            "courses": TreeRows(tree_c, _course_values),
+            "enrollments": TreeRows(tree_e, _enrollment_values),
+            "grades": TreeRows(tree_g, _grade_archive_values),
+        }
+        loaded = OrderedDict()  # dataset -> année chargée (ordre LRU)
+        state = {"generation": 0}
+        status = tk.Label(filter_frame, text="", bg=bg, fg=text_secondary, font=("Segoe UI", 9))
+
+        def _selected_year():
             year_sel = cb_year.get()
-            year = None if year_sel == "Toutes les années" else year_sel
+            return None if year_sel == "Toutes les années" else year_sel
 
-            for tr in [tree_s, tree_t, tree_c, tree_e, tree_g]:
-                for i in tr.get_children(""):
-                    tr.delete(i)
+        def _current_dataset():
+            return ARCHIVE_DATASETS[notebook.index(notebook.select())]
 
-            try:
-                if year:
-                    students = get_students_by_year(year) or []
-                    teachers = get_teachers_by_year(year) or []
-                    courses = get_courses_by_year(year) or []
-                    enrollments = get_enrollments_by_year(year) or []
-                    grades = get_grades_by_year(year) or []
+        def _release(dataset):
+            rows = archive_tabs[dataset]
+            rows.cancel_load()
+            rows.load(())
+            loaded.pop(dataset, None)
+
+        def _enforce_budget(keep):
+            budget = APP_CONFIG["archive_rows_budget"]
+            for dataset in list(loaded):
+                if sum(len(archive_tabs[d].rows) for d in loaded) <= budget:
+                    break
+                if dataset != keep:
+                    _release(dataset)
+
+        def _load_tabs(datasets):
+            """Charge les onglets demandés qui ne le sont pas pour l'année choisie, en un seul lot de requêtes parallèles."""
+            year = _selected_year()
+            todo = []
+            for dataset in datasets:
+                if dataset in loaded and loaded[dataset] == year:
+                    loaded.move_to_end(dataset)
                 else:
-                    students = get_all_students() or []
-                    teachers = get_all_teachers() or []
-                    courses = get_all_courses() or []
-                    enrollments = get_all_enrollments() or []
-                    grades = get_all_grades() or []
-
-                for s in students:
-                    tree_s.insert("", "end", values=(s.get("id", ""), s.get("matricule", ""), s.get("last_name", ""), s.get("first_name", ""), s.get("email") or "", s.get("phone") or ""))
-                for te in teachers:
-                    tree_t.insert("", "end", values=(te.get("id", ""), te.get("last_name", ""), te.get("first_name", ""), te.get("email") or "", te.get("department") or "", te.get("phone") or ""))
-                for c in courses:
-                    tree_c.insert("", "end", values=(c.get("id", ""), c.get("code", ""), c.get("name", ""), c.get("credits", ""), c.get("teacher_name") or "Non assigné"))
-                for e in enrollments:
-                    tree_e.insert("", "end", values=(e.get("id", ""), e.get("academic_year", ""), e.get("semester", ""), e.get("matricule", ""), e.get("student_name", ""), e.get("class_name", "")))
-                for g in grades:
-                    tree_g.insert("", "end", values=(g.get("id", ""), g.get("academic_year", ""), g.get("semester", ""), g.get("student_name", ""), g.get("course_name", ""), g.get("grade") if g.get("grade") is not None else "-"))
-            except Exception as ex:
-                messagebox.showerror("Erreur", f"Impossible de charger les archives.\n{ex}")
+                    _release(dataset)
+                    loaded[dataset] = year
+                    todo.append(dataset)
+            if not todo:
+                return
+            generation = state["generation"]
+            status.config(text="Chargement…")
 
-        cb_year.bind("<<ComboboxSelected>>", lambda _: _load_archives())
-        _load_archives()
+            def _on_progress(dataset, n):
+                if _current_dataset() == dataset:
+                    status.config(text=f"{n:,} lignes…".replace(",", " "))
+
+            def _on_done(dataset, n):
+                if _current_dataset() == dataset:
+                    status.config(text=f"{n:,} lignes".replace(",", " "))
+                _enforce_budget(keep=dataset)
+
+            def _on_fetched(results):
+                if generation != state["generation"]:
+                    return
+                for dataset, data in results.items():
+                    if loaded.get(dataset, object()) != year:
+                        continue
+                    archive_tabs[dataset].load_incremental(
+                        data or [],
+                        on_progress=lambda n, d=dataset: _on_progress(d, n),
+                        on_done=lambda n, d=dataset: _on_done(d, n),
+                    )
+
+            def _on_error(error):
+                for dataset in todo:
+                    loaded.pop(dataset, None)
+                status.config(text="")
+                messagebox.showerror("Erreur", f"Impossible de charger les archives.\n{error}")
+
+            run_in_background(notebook, get_archive_datasets, year, todo, on_done=_on_fetched, on_error=_on_error)
+
+        def _load_archives():
+            """
+            Changement d'année ou actualisation : l'onglet affiché et ceux déjà
+            chargés sont relus ensemble (requêtes en parallèle), les autres
+            attendront leur sélection.
+            """
+            state["generation"] += 1
+            current = _current_dataset()
+            others = [d for d in loaded if d != current]
+            for dataset in list(loaded):
+                _release(dataset)
+            _load_tabs([*others, current])
+
+        def _on_tab_changed(_event):
+            dataset = _current_dataset()
+            n = len(archive_tabs[dataset].rows)
+            status.config(text=f"{n:,} lignes".replace(",", " ") if dataset in loaded else "")
+            _load_tabs([dataset])
 
         notebook.add(tab_students, text="Étudiants")
         notebook.add(tab_teachers, text="Enseignants")
@@ -1875,12 +2924,28 @@ class DashboardFrame(tk.Frame):
         notebook.add(tab_enrollments, text="Inscriptions")
         notebook.add(tab_grades, text="Notes")
 
+        cb_year.bind("<<ComboboxSelected>>", lambda _: _load_archives())
+        notebook.bind("<<NotebookTabChanged>>", _on_tab_changed)
+        _load_tabs([_current_dataset()])
+
         ModernButton(filter_frame, text="Actualiser", command=lambda: (_load_archives(), self.refresh_dashboard_stats()), font=("Segoe UI", 9), padx=10, pady=4).pack(side="left", padx=(16, 0))
 
+        def _export_current_tab():
+            from csv_export import export_archive
+
+            dataset = _current_dataset()
+            year = _selected_year()
+            name = f"archives_{dataset}_{year or 'toutes'}.csv"
+            self._run_csv_export(name, export_archive, dataset, year)
+
+        ModernButton(filter_frame, text="Exporter l'onglet (CSV)", command=_export_current_tab, font=("Segoe UI", 9), padx=10, pady=4).pack(side="left", padx=(8, 0))
+        status.pack(side="left", padx=(12, 0))
+
 
 class App(tk.Tk):
-    def __init__(self):
+    def __init__(self, startup_bench=False):
         super().__init__()
+        self.startup_bench = startup_bench
         self.title(APP_CONFIG["title"])
         self.geometry(APP_CONFIG["geometry"])
         self.minsize(APP_CONFIG["min_width"], APP_CONFIG["min_height"])
@@ -1894,7 +2959,23 @@ class App(tk.Tk):
 
         self.current_frame = None
         self.current_user = None
+
+        # Vérifications de schéma et préchauffage de la connexion pendant
+        # que l'écran de connexion est affiché.
+        self._startup_checks = submit(run_startup_checks)
+        submit(warm_up_connection)
+        submit(warm_reference_data)
+
         self._show_login()
+        self.after_idle(self._log_login_ready)
+
+    def _log_login_ready(self):
+        elapsed_ms = (time.perf_counter() - _T0) * 1000
+        log.info("Écran de connexion interactif en %.0f ms", elapsed_ms)
+        if self.startup_bench:
+            # Ligne lue par bench_startup.py
+            print(f"STARTUP_MS {elapsed_ms:.1f}", flush=True)
+            self.destroy()
 
     def _clear_frame(self):
         if self.current_frame is not None:
@@ -1903,11 +2984,19 @@ class App(tk.Tk):
 
     def _show_login(self):
         self._clear_frame()
-        self.current_frame = LoginFrame(self.container, on_login_success=self._on_login)
+        self.current_frame = LoginFrame(self.container, on_login_success=self._on_login, startup_checks=self._startup_checks)
         self.current_frame.grid(row=0, column=0, sticky="nsew")
 
-    def _show_dashboard(self):
-        missing = verify_tables()
+    def _prefetch_dashboard(self):
+        """Exécuté hors du thread Tk : attend les vérifications puis charge le tableau de bord."""
+        missing = self._startup_checks.result()
+        if missing:
+            return {"missing": missing}
+        return {"stats": load_dashboard_stats(), "charts": load_dashboard_charts()}
+
+    def _show_dashboard(self, prefetched=None):
+        prefetched = prefetched or {}
+        missing = prefetched.get("missing")
         if missing:
             messagebox.showerror(
                 "Tables manquantes",
@@ -1917,13 +3006,36 @@ class App(tk.Tk):
             return
         self._clear_frame()
         self.current_frame = DashboardFrame(
-            self.container, on_logout=self._on_logout, current_user=self.current_user
+            self.container, on_logout=self._on_logout, current_user=self.current_user, prefetched=prefetched
         )
         self.current_frame.grid(row=0, column=0, sticky="nsew")
 
     def _on_login(self, user: dict):
         self.current_user = user
-        self._show_dashboard()
+        if APP_CONFIG["replica_enabled"]:
+            submit(start_replica_sync)
+        login_accepted = time.perf_counter()
+
+        def _ready(prefetched):
+            self._show_dashboard(prefetched)
+            self.after_idle(
+                lambda: log.info(
+                    "Tableau de bord interactif en %.0f ms après connexion",
+                    (time.perf_counter() - login_accepted) * 1000,
+                )
+            )
+
+        def _failed(error):
+            log.warning("Préchargement du tableau de bord impossible : %s", error)
+            # Le tableau de bord chargera ses données ; les tables ont été vérifiées au démarrage
+            run_in_background(
+                self,
+                self._startup_checks.result,
+                on_done=lambda missing: self._show_dashboard({"missing": missing}),
+                on_error=lambda _error: self._show_dashboard(),
+            )
+
+        run_in_background(self, self._prefetch_dashboard, on_done=_ready, on_error=_failed)
 
     def _on_logout(self):
         if messagebox.askyesno("Déconnexion", "Voulez-vous vous déconnecter ?"):
@@ -1931,6 +3043,26 @@ class App(tk.Tk):
 
 
 if __name__ == "__main__":
-    app = App()
-    app.mainloop()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--startup-bench",
+        action="store_true",
+        help="Affiche le temps jusqu'à l'écran de connexion puis quitte (utilisé par bench_startup.py).",
+    )
+    args = parser.parse_args()
+    import locale
 
+    try:
+        locale.setlocale(locale.LC_COLLATE, "")  # tri alphabétique selon la langue du poste
+    except locale.Error:
+        pass
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    app = App(startup_bench=args.startup_bench)
+    app.mainloop()
+    if not args.startup_bench:
+        try:
+            reference_data.save_snapshot()
+        except OSError as e:
+            log.warning("Instantané des données de référence non enregistré : %s", e)
@@ -3,34 +3,14 @@ Accès aux archives par année académique (10 dernières années).
 """
 
 from db import execute_query
+from models_courses import courses_query
+from models_enrollments import enrollments_query
+from models_grades import grades_query
+from models_students import students_query
+from models_teachers import teachers_query
 
 
-def get_available_academic_years():
-    """Retourne les années académiques disponibles (10 dernières années)."""
-    from datetime import datetime
-    current_year = datetime.now().year
-    synthetic = [f"{current_year - i}-{current_year - i + 1}" for i in range(10)]
-    result = execute_query(
-        """
-        SELECT DISTINCT academic_year FROM enrollments
-        ORDER BY academic_year DESC
-        """,
-        fetchall=True,
-    )
-    db_years = [r["academic_year"] for r in result] if result else []
-    seen = set()
-    years = []
-    for y in db_years + synthetic:
-        if y not in seen:
-            seen.add(y)
-            years.append(y)
-    return years[:10]
-
-
-def get_enrollments_by_year(academic_year: str):
-    """Inscriptions pour une année académique (étudiant + classe)."""
-    return execute_query(
-        """
+_ENROLLMENTS_BY_YEAR = """
         SELECT e.id, e.academic_year, e.semester, s.matricule,
                CONCAT(s.first_name, ' ', s.last_name) AS student_name,
                cl.name AS class_name
@@ -39,16 +19,9 @@ def get_enrollments_by_year(academic_year: str):
         JOIN classes cl ON e.class_id = cl.id
         WHERE e.academic_year = %s
         ORDER BY e.semester, s.last_name
-        """,
-        params=(academic_year,),
-        fetchall=True,
-    )
-
-
-def get_grades_by_year(academic_year: str):
-    """Notes pour une année académique."""
-    return execute_query(
         """
+
+_GRADES_BY_YEAR = """
         SELECT g.id, g.enrollment_id, g.grade, e.academic_year, e.semester,
                CONCAT(s.first_name, ' ', s.last_name) AS student_name,
                c.code, c.name AS course_name
@@ -58,31 +31,17 @@ def get_grades_by_year(academic_year: str):
         JOIN courses c ON g.course_id = c.id
         WHERE e.academic_year = %s
         ORDER BY e.semester, s.last_name
-        """,
-        params=(academic_year,),
-        fetchall=True,
-    )
-
-
-def get_students_by_year(academic_year: str):
-    """Étudiants inscrits au moins une fois durant l'année académique."""
-    return execute_query(
         """
+
+_STUDENTS_BY_YEAR = """
         SELECT DISTINCT s.id, s.matricule, s.first_name, s.last_name, s.email, s.phone
         FROM students s
         JOIN enrollments e ON s.id = e.student_id
         WHERE e.academic_year = %s
         ORDER BY s.matricule
-        """,
-        params=(academic_year,),
-        fetchall=True,
-    )
-
-
-def get_courses_by_year(academic_year: str):
-    """Cours ayant au moins une inscription durant l'année (via classes)."""
-    return execute_query(
         """
+
+_COURSES_BY_YEAR = """
         SELECT DISTINCT c.id, c.code, c.name, c.credits,
                CONCAT(t.first_name, ' ', t.last_name) AS teacher_name
         FROM courses c
@@ -91,16 +50,9 @@ def get_courses_by_year(academic_year: str):
         JOIN enrollments e ON e.class_id = cc.class_id
         WHERE e.academic_year = %s
         ORDER BY c.code
-        """,
-        params=(academic_year,),
-        fetchall=True,
-    )
-
-
-def get_teachers_by_year(academic_year: str):
-    """Enseignants ayant enseigné au moins un cours (classe avec inscriptions) cette année."""
-    return execute_query(
         """
+
+_TEACHERS_BY_YEAR = """
         SELECT DISTINCT t.id, t.first_name, t.last_name, t.email, t.department, t.phone
         FROM teachers t
         JOIN courses c ON c.teacher_id = t.id
@@ -108,10 +60,96 @@ def get_teachers_by_year(academic_year: str):
         JOIN enrollments e ON e.class_id = cc.class_id
         WHERE e.academic_year = %s
         ORDER BY t.last_name
+        """
+
+
+_BY_YEAR_QUERIES = {
+    "students": _STUDENTS_BY_YEAR,
+    "teachers": _TEACHERS_BY_YEAR,
+    "courses": _COURSES_BY_YEAR,
+    "enrollments": _ENROLLMENTS_BY_YEAR,
+    "grades": _GRADES_BY_YEAR,
+}
+
+_ALL_YEARS_QUERIES = {
+    "students": students_query,
+    "teachers": teachers_query,
+    "courses": courses_query,
+    "enrollments": enrollments_query,
+    "grades": grades_query,
+}
+
+ARCHIVE_DATASETS = tuple(_BY_YEAR_QUERIES)
+
+
+def archive_query(dataset: str, academic_year: str = None):
+    """
+    Requête (sql, params) d'un onglet des archives ("students", "teachers",
+    "courses", "enrollments", "grades") pour une année, ou toutes années si None.
+    """
+    if dataset not in _BY_YEAR_QUERIES:
+        raise ValueError(f"Jeu de données d'archive inconnu : {dataset}")
+    if academic_year is None:
+        return _ALL_YEARS_QUERIES[dataset]()
+    return _BY_YEAR_QUERIES[dataset], (academic_year,)
+
+
+def get_archive_datasets(academic_year: str = None, datasets=ARCHIVE_DATASETS, consistent=False):
+    """
+    Plusieurs onglets des archives en une fois : {dataset: lignes}. Les requêtes
+    tournent en parallèle (fetch.fetch_all), ou dans un même instantané si consistent.
+    """
+    from fetch import fetch_all
+
+    return fetch_all({d: archive_query(d, academic_year) for d in datasets}, consistent=consistent)
+
+
+def get_available_academic_years():
+    """Retourne les années académiques disponibles (10 dernières années)."""
+    from datetime import datetime
+    current_year = datetime.now().year
+    synthetic = [f"{current_year - i}-{current_year - i + 1}" for i in range(10)]
+    result = execute_query(
+        """
+        SELECT DISTINCT academic_year FROM enrollments
+        ORDER BY academic_year DESC
         """,
-        params=(academic_year,),
         fetchall=True,
+        cache=("enrollments",),
     )
+    db_years = [r["academic_year"] for r in result] if result else []
+    seen = set()
+    years = []
+    for y in db_years + synthetic:
+        if y not in seen:
+            seen.add(y)
+            years.append(y)
+    return years[:10]
+
+
+def get_enrollments_by_year(academic_year: str):
+    """Inscriptions pour une année académique (étudiant + classe)."""
+    return execute_query(_ENROLLMENTS_BY_YEAR, params=(academic_year,), fetchall=True)
+
+
+def get_grades_by_year(academic_year: str):
+    """Notes pour une année académique."""
+    return execute_query(_GRADES_BY_YEAR, params=(academic_year,), fetchall=True)
+
+
+def get_students_by_year(academic_year: str):
+    """Étudiants inscrits au moins une fois durant l'année académique."""
+    return execute_query(_STUDENTS_BY_YEAR, params=(academic_year,), fetchall=True)
+
+
+def get_courses_by_year(academic_year: str):
+    """Cours ayant au moins une inscription durant l'année (via classes)."""
+    return execute_query(_COURSES_BY_YEAR, params=(academic_year,), fetchall=True)
+
+
+def get_teachers_by_year(academic_year: str):
+    """Enseignants ayant enseigné au moins un cours (classe avec inscriptions) cette année."""
+    return execute_query(_TEACHERS_BY_YEAR, params=(academic_year,), fetchall=True)
 
 
 def get_archive_count():
@@ -3,21 +3,44 @@ Accès aux données pour les classes (table `classes`).
 Les cours sont attribués aux classes via `class_courses`.
 """
 
-from db import execute_query
+from db import execute_in, execute_query, offline_replica, transaction
+from change_events import publish
+from change_tracking import bump_versions, changes_since, record_deletes
+from grade_aggregates import remove_grades
+
+
+_CLASS_ROW_SELECT = """
+    SELECT cl.id, cl.name, cl.academic_year, cl.semester, cl.created_at,
+           (SELECT COUNT(*) FROM class_courses cc WHERE cc.class_id = cl.id) AS courses_count
+    FROM classes cl
+"""
 
 
 def get_all_classes():
-    """Retourne toutes les classes, triées par année puis nom."""
+    """Retourne toutes les classes (avec le nombre de cours attribués), triées par année puis nom."""
     return execute_query(
-        """
-        SELECT id, name, academic_year, semester, created_at
-        FROM classes
-        ORDER BY academic_year DESC, semester, name
-        """,
+        _CLASS_ROW_SELECT + " ORDER BY cl.academic_year DESC, cl.semester, cl.name",
         fetchall=True,
     )
 
 
+def get_class_row(class_id: int):
+    """Retourne une classe au format de get_all_classes (avec courses_count)."""
+    return execute_query(
+        _CLASS_ROW_SELECT + " WHERE cl.id = %s",
+        params=(class_id,),
+        fetchone=True,
+    )
+
+
+def get_classes_changed_since(token):
+    """
+    Classes créées, modifiées ou supprimées depuis token : {"token", "upserts", "deletes"}.
+    Les attributions de cours touchent updated_at de la classe (courses_count).
+    """
+    return changes_since("classes", _CLASS_ROW_SELECT, token, aliases=("cl",))
+
+
 def get_class_count():
     """Retourne le nombre total de classes."""
     result = execute_query("SELECT COUNT(*) AS cnt FROM classes", fetchone=True)
@@ -47,68 +70,120 @@ def get_courses_for_class(class_id: int):
         """,
         params=(class_id,),
         fetchall=True,
+        cache=("class_courses", "courses", "teachers"),
     )
 
 
 def create_class(name: str, academic_year: str, semester: str):
-    """Crée une nouvelle classe. Retourne l'id de la classe créée."""
-    execute_query(
-        """
-        INSERT INTO classes (name, academic_year, semester)
-        VALUES (%s, %s, %s)
-        """,
-        params=(name.strip(), academic_year.strip(), semester),
-        commit=True,
-    )
-    r = execute_query(
-        "SELECT id FROM classes WHERE name = %s AND academic_year = %s AND semester = %s ORDER BY id DESC LIMIT 1",
-        params=(name.strip(), academic_year.strip(), semester),
-        fetchone=True,
-    )
-    return r["id"] if r else None
+    """Crée une nouvelle classe. Retourne la ligne créée (format get_all_classes)."""
+    with transaction() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO classes (name, academic_year, semester)
+            VALUES (%s, %s, %s)
+            """,
+            (name.strip(), academic_year.strip(), semester),
+        )
+        class_id = cursor.lastrowid
+        bump_versions(cursor, "classes")
+    publish("classes", [class_id])
+    return get_class_row(class_id)
 
 
 def update_class(class_id: int, name: str, academic_year: str, semester: str):
-    """Met à jour une classe."""
-    execute_query(
-        """
-        UPDATE classes SET name = %s, academic_year = %s, semester = %s
-        WHERE id = %s
-        """,
-        params=(name.strip(), academic_year.strip(), semester, class_id),
-        commit=True,
-    )
+    """Met à jour une classe (mise en file hors connexion). Retourne la ligne modifiée (format get_all_classes)."""
+    values = {"name": name.strip(), "academic_year": academic_year.strip(), "semester": semester}
+    replica = offline_replica()
+    if replica is not None:
+        replica.queue_update("classes", class_id, values)
+    else:
+        with transaction() as cursor:
+            cursor.execute(
+                """
+                UPDATE classes SET name = %s, academic_year = %s, semester = %s
+                WHERE id = %s
+                """,
+                (*values.values(), class_id),
+            )
+            bump_versions(cursor, "classes")
+    publish("classes", [class_id])
+    return get_class_row(class_id)
 
 
 def delete_class(class_id: int):
-    """Supprime une classe."""
-    execute_query("DELETE FROM classes WHERE id = %s", params=(class_id,), commit=True)
+    """Supprime une classe. Retourne l'id supprimé."""
+    delete_classes([class_id])
+    return class_id
+
+
+def delete_classes(class_ids):
+    """Supprime plusieurs classes en une transaction (DELETE ... IN par paquets). Retourne les ids."""
+    ids = sorted({int(i) for i in class_ids})
+    if not ids:
+        return []
+    with transaction() as cursor:
+        record_deletes(cursor, "classes", ids)
+        remove_grades(cursor, "classes", ids)
+        execute_in(cursor, "DELETE FROM classes WHERE id IN ({ids})", ids)
+        bump_versions(cursor, "classes")
+    publish("classes", ids)
+    publish("class_courses")
+    publish("enrollments")
+    publish("grades")
+    return ids
+
+
+def _touch_class(cursor, class_id):
+    # courses_count fait partie de la ligne de la classe : le delta doit la renvoyer
+    cursor.execute("UPDATE classes SET updated_at = CURRENT_TIMESTAMP(6) WHERE id = %s", (class_id,))
 
 
 def add_course_to_class(class_id: int, course_id: int):
     """Attribue un cours à une classe."""
-    execute_query(
-        "INSERT IGNORE INTO class_courses (class_id, course_id) VALUES (%s, %s)",
-        params=(class_id, course_id),
-        commit=True,
-    )
+    with transaction() as cursor:
+        cursor.execute(
+            "INSERT IGNORE INTO class_courses (class_id, course_id) VALUES (%s, %s)", (class_id, course_id)
+        )
+        _touch_class(cursor, class_id)
+        bump_versions(cursor, "class_courses", "classes")
+    publish("class_courses")
 
 
 def remove_course_from_class(class_id: int, course_id: int):
     """Retire un cours d'une classe."""
-    execute_query(
-        "DELETE FROM class_courses WHERE class_id = %s AND course_id = %s",
-        params=(class_id, course_id),
-        commit=True,
-    )
-
-
-def set_class_courses(class_id: int, course_ids: list):
-    """Remplace la liste des cours d'une classe par course_ids."""
-    execute_query(
-        "DELETE FROM class_courses WHERE class_id = %s",
-        params=(class_id,),
-        commit=True,
-    )
-    for cid in course_ids:
-        add_course_to_class(class_id, cid)
+    with transaction() as cursor:
+        cursor.execute(
+            "DELETE FROM class_courses WHERE class_id = %s AND course_id = %s", (class_id, course_id)
+        )
+        _touch_class(cursor, class_id)
+        bump_versions(cursor, "class_courses", "classes")
+    publish("class_courses")
+
+
+def set_class_courses(class_id: int, course_ids):
+    """
+    Remplace la liste des cours d'une classe par course_ids (itérable ou set).
+    Seules les différences avec l'existant sont écrites, en une transaction.
+    """
+    wanted = {int(cid) for cid in course_ids}
+    with transaction() as cursor:
+        cursor.execute("SELECT course_id FROM class_courses WHERE class_id = %s FOR UPDATE", (class_id,))
+        current = {r["course_id"] for r in cursor.fetchall()}
+        to_remove = sorted(current - wanted)
+        to_add = sorted(wanted - current)
+        if to_remove:
+            placeholders = ", ".join(["%s"] * len(to_remove))
+            cursor.execute(
+                f"DELETE FROM class_courses WHERE class_id = %s AND course_id IN ({placeholders})",
+                (class_id, *to_remove),
+            )
+        if to_add:
+            cursor.executemany(
+                "INSERT IGNORE INTO class_courses (class_id, course_id) VALUES (%s, %s)",
+                [(class_id, cid) for cid in to_add],
+            )
+        if to_remove or to_add:
+            _touch_class(cursor, class_id)
+            bump_versions(cursor, "class_courses", "classes")
+    if to_remove or to_add:
+        publish("class_courses")
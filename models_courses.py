@@ -2,14 +2,15 @@
 Accès aux données pour les cours (table `courses`).
 """
 
-from db import execute_query
+from db import execute_in, execute_query, offline_replica, transaction
+from change_events import publish
+from change_tracking import bump_versions, changes_since, record_deletes
+from grade_aggregates import remove_grades
 
 
-def get_all_courses():
-    """
-    Retourne la liste de tous les cours avec le nom du professeur associé.
-    """
-    return execute_query(
+def courses_query():
+    """Requête (sql, params) de la liste des cours avec le nom du professeur."""
+    return (
         """
         SELECT 
             c.id, 
@@ -21,10 +22,56 @@ def get_all_courses():
         LEFT JOIN teachers t ON c.teacher_id = t.id
         ORDER BY c.code
         """,
-        fetchall=True,
+        (),
     )
 
 
+def get_all_courses():
+    """
+    Retourne la liste de tous les cours avec le nom du professeur associé.
+    """
+    query, params = courses_query()
+    return execute_query(query, params=params, fetchall=True, cache=("courses", "teachers"))
+
+
+_COURSE_ROW_SELECT = """
+    SELECT c.id, c.code, c.name, c.credits,
+           CONCAT(t.first_name, ' ', t.last_name) AS teacher_name
+    FROM courses c
+    LEFT JOIN teachers t ON c.teacher_id = t.id
+"""
+
+
+def get_course_row(course_id: int):
+    """Retourne un cours au format de get_all_courses (avec teacher_name)."""
+    return execute_query(
+        _COURSE_ROW_SELECT + " WHERE c.id = %s",
+        params=(course_id,),
+        fetchone=True,
+    )
+
+
+def get_course_rows(course_ids):
+    """Retourne les cours d'ids donnés, au format de get_all_courses."""
+    ids = list(course_ids)
+    if not ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(ids))
+    return execute_query(
+        _COURSE_ROW_SELECT + f" WHERE c.id IN ({placeholders})",
+        params=tuple(ids),
+        fetchall=True,
+    ) or []
+
+
+def get_courses_changed_since(token):
+    """
+    Cours créés, modifiés ou supprimés depuis token : {"token", "upserts", "deletes"}.
+    Un enseignant renommé renvoie ses cours (teacher_name).
+    """
+    return changes_since("courses", _COURSE_ROW_SELECT, token, aliases=("c", "t"))
+
+
 def get_course_count():
     """
     Compte le nombre total de cours.
@@ -43,29 +90,77 @@ def get_course_by_id(course_id: int):
 
 
 def create_course(code: str, name: str, credits: int, teacher_id: int = None):
-    """Crée un nouveau cours."""
-    execute_query(
-        """
-        INSERT INTO courses (code, name, credits, teacher_id)
-        VALUES (%s, %s, %s, %s)
-        """,
-        params=(code.strip(), name.strip(), int(credits), teacher_id),
-        commit=True,
-    )
+    """Crée un nouveau cours. Retourne la ligne créée (format get_all_courses)."""
+    with transaction() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO courses (code, name, credits, teacher_id)
+            VALUES (%s, %s, %s, %s)
+            """,
+            (code.strip(), name.strip(), int(credits), teacher_id),
+        )
+        course_id = cursor.lastrowid
+        bump_versions(cursor, "courses")
+    publish("courses", [course_id])
+    return get_course_row(course_id)
 
 
 def update_course(course_id: int, code: str, name: str, credits: int, teacher_id: int = None):
-    """Met à jour un cours existant."""
-    execute_query(
-        """
-        UPDATE courses SET code = %s, name = %s, credits = %s, teacher_id = %s
-        WHERE id = %s
-        """,
-        params=(code.strip(), name.strip(), int(credits), teacher_id, course_id),
-        commit=True,
-    )
+    """Met à jour un cours existant (mis en file hors connexion). Retourne la ligne modifiée (format get_all_courses)."""
+    values = {"code": code.strip(), "name": name.strip(), "credits": int(credits), "teacher_id": teacher_id}
+    replica = offline_replica()
+    if replica is not None:
+        replica.queue_update("courses", course_id, values)
+    else:
+        with transaction() as cursor:
+            cursor.execute(
+                """
+                UPDATE courses SET code = %s, name = %s, credits = %s, teacher_id = %s
+                WHERE id = %s
+                """,
+                (*values.values(), course_id),
+            )
+            bump_versions(cursor, "courses")
+    publish("courses", [course_id])
+    return get_course_row(course_id)
 
 
 def delete_course(course_id: int):
-    """Supprime un cours."""
-    execute_query("DELETE FROM courses WHERE id = %s", params=(course_id,), commit=True)
+    """Supprime un cours. Retourne l'id supprimé."""
+    delete_courses([course_id])
+    return course_id
+
+
+def delete_courses(course_ids):
+    """Supprime plusieurs cours en une transaction (DELETE ... IN par paquets). Retourne les ids."""
+    ids = sorted({int(i) for i in course_ids})
+    if not ids:
+        return []
+    with transaction() as cursor:
+        record_deletes(cursor, "courses", ids)
+        remove_grades(cursor, "courses", ids)
+        # Les attributions supprimées en cascade changent courses_count des classes
+        execute_in(
+            cursor,
+            "UPDATE classes SET updated_at = CURRENT_TIMESTAMP(6)"
+            " WHERE id IN (SELECT class_id FROM class_courses WHERE course_id IN ({ids}))",
+            ids,
+        )
+        execute_in(cursor, "DELETE FROM courses WHERE id IN ({ids})", ids)
+        bump_versions(cursor, "courses", "classes")
+    publish("courses", ids)
+    publish("class_courses")
+    publish("grades")
+    return ids
+
+
+def set_courses_teacher(course_ids, teacher_id: int = None):
+    """Attribue plusieurs cours au même enseignant (None : non assigné). Retourne les lignes modifiées."""
+    ids = sorted({int(i) for i in course_ids})
+    if not ids:
+        return []
+    with transaction() as cursor:
+        execute_in(cursor, "UPDATE courses SET teacher_id = %s WHERE id IN ({ids})", ids, params=(teacher_id,))
+        bump_versions(cursor, "courses")
+    publish("courses", ids)
+    return get_course_rows(ids)
@@ -0,0 +1,29 @@
+"""
+Compteurs du tableau de bord, lus en une fois dans un même instantané de la
+base (fetch.fetch_all avec consistent=True) : les chiffres affichés sont
+cohérents entre eux même pendant une saisie de notes. La moyenne générale est
+lue dans grade_aggregates (une ligne, voir grade_aggregates.average_query).
+"""
+
+from fetch import fetch_all, fetch_scalar
+from grade_aggregates import average_query
+
+
+def get_dashboard_stats(academic_year: str):
+    """Nombre d'étudiants, enseignants, cours, classes, inscriptions de l'année, moyenne générale et années archivées."""
+    rows = fetch_all(
+        {
+            "students": ("SELECT COUNT(*) AS cnt FROM students", (), "one"),
+            "teachers": ("SELECT COUNT(*) AS cnt FROM teachers", (), "one"),
+            "courses": ("SELECT COUNT(*) AS cnt FROM courses", (), "one"),
+            "classes": ("SELECT COUNT(*) AS cnt FROM classes", (), "one"),
+            "enrollments": ("SELECT COUNT(*) AS cnt FROM enrollments WHERE academic_year = %s", (academic_year,), "one"),
+            "avg_grade": (*average_query(), "one"),
+            "archives": ("SELECT COUNT(DISTINCT academic_year) AS cnt FROM enrollments", (), "one"),
+        },
+        consistent=True,
+    )
+    stats = {name: fetch_scalar(row, "cnt") for name, row in rows.items() if name != "avg_grade"}
+    avg = fetch_scalar(rows["avg_grade"], "avg_grade", None)
+    stats["avg_grade"] = round(float(avg), 2) if avg is not None else None
+    return stats
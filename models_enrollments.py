@@ -3,41 +3,186 @@ Accès aux données pour les inscriptions (table `enrollments`).
 Une inscription = étudiant inscrit dans une classe (année + semestre).
 """
 
-from db import execute_query
+from db import execute_in, execute_query, like_prefix, transaction
+from change_events import publish
+from change_tracking import bump_versions, changes_since, record_deletes
+from grade_aggregates import remove_grades
+
+
+_ENROLLMENT_ROW_SELECT = """
+    SELECT e.id, e.student_id, e.class_id, e.academic_year, e.semester,
+           s.matricule,
+           CONCAT(s.first_name, ' ', s.last_name) AS student_name,
+           cl.name AS class_name
+    FROM enrollments e
+    JOIN students s ON e.student_id = s.id
+    JOIN classes cl ON e.class_id = cl.id
+"""
+
+
+def enrollments_query():
+    """Requête (sql, params) de la liste des inscriptions."""
+    return _ENROLLMENT_ROW_SELECT + " ORDER BY e.academic_year DESC, e.semester, s.last_name", ()
 
 
 def get_all_enrollments():
     """Retourne les inscriptions avec nom étudiant et nom de la classe."""
+    query, params = enrollments_query()
+    return execute_query(query, params=params, fetchall=True)
+
+
+def search_enrollments(query: str, limit: int = 20):
+    """
+    Recherche d'inscriptions par préfixe : chaque mot saisi doit être le début
+    du matricule, du nom, du prénom de l'étudiant ou du nom de la classe.
+    """
+    tokens = query.split()[:4]
+    if not tokens:
+        return []
+    clauses, params = [], []
+    for token in tokens:
+        pattern = like_prefix(token)
+        clauses.append("(s.matricule LIKE %s OR s.last_name LIKE %s OR s.first_name LIKE %s OR cl.name LIKE %s)")
+        params += [pattern, pattern, pattern, pattern]
+    params.append(int(limit))
     return execute_query(
-        """
-        SELECT e.id, e.student_id, e.class_id, e.academic_year, e.semester,
-               s.matricule,
-               CONCAT(s.first_name, ' ', s.last_name) AS student_name,
-               cl.name AS class_name
-        FROM enrollments e
-        JOIN students s ON e.student_id = s.id
-        JOIN classes cl ON e.class_id = cl.id
-        ORDER BY e.academic_year DESC, e.semester, s.last_name
-        """,
+        _ENROLLMENT_ROW_SELECT
+        + " WHERE " + " AND ".join(clauses)
+        + " ORDER BY e.academic_year DESC, e.semester, s.last_name, s.first_name LIMIT %s",
+        params=tuple(params),
         fetchall=True,
     )
 
 
+def get_enrollment_rows(enrollment_ids):
+    """Retourne les inscriptions d'ids donnés, au format de get_all_enrollments."""
+    ids = list(enrollment_ids)
+    if not ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(ids))
+    return execute_query(
+        _ENROLLMENT_ROW_SELECT + f" WHERE e.id IN ({placeholders})",
+        params=tuple(ids),
+        fetchall=True,
+    ) or []
+
+
+def get_enrollments_changed_since(token):
+    """Inscriptions créées, modifiées ou supprimées depuis token (ou dont l'étudiant ou la classe a changé)."""
+    return changes_since("enrollments", _ENROLLMENT_ROW_SELECT, token, aliases=("e", "s", "cl"))
+
+
 def create_enrollment(student_id: int, class_id: int, academic_year: str, semester: str):
-    """Crée une inscription (étudiant dans une classe)."""
-    execute_query(
-        """
-        INSERT INTO enrollments (student_id, class_id, academic_year, semester)
-        VALUES (%s, %s, %s, %s)
-        """,
-        params=(student_id, class_id, academic_year.strip(), semester),
-        commit=True,
+    """Crée une inscription (étudiant dans une classe). Retourne la ligne créée (format get_all_enrollments)."""
+    with transaction() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO enrollments (student_id, class_id, academic_year, semester)
+            VALUES (%s, %s, %s, %s)
+            """,
+            (student_id, class_id, academic_year.strip(), semester),
+        )
+        enrollment_id = cursor.lastrowid
+        bump_versions(cursor, "enrollments")
+    publish("enrollments", [enrollment_id])
+    rows = get_enrollment_rows([enrollment_id])
+    return rows[0] if rows else None
+
+
+BULK_CHUNK = 1000
+
+
+def _class_students(cursor, class_id, student_ids, lock=False):
+    """Étudiants de student_ids inscrits dans la classe : [{id, matricule, student_name}]."""
+    placeholders = ", ".join(["%s"] * len(student_ids))
+    cursor.execute(
+        f"""
+        SELECT s.id, s.matricule, CONCAT(s.first_name, ' ', s.last_name) AS student_name
+        FROM enrollments e
+        JOIN students s ON e.student_id = s.id
+        WHERE e.class_id = %s AND e.student_id IN ({placeholders})
+        """ + (" FOR UPDATE" if lock else ""),
+        (class_id, *student_ids),
     )
+    return cursor.fetchall()
+
+
+def bulk_enroll(student_ids, class_id: int):
+    """
+    Inscrit un ensemble d'étudiants dans une classe (année et semestre de la
+    classe), en une transaction : les étudiants déjà inscrits sont repérés par
+    une requête préalable, les autres insérés par paquets (INSERT IGNORE).
+    Retourne {"enrolled": [ids inscrits], "already": [{id, matricule, student_name}],
+    "unknown": [ids sans étudiant]}.
+    """
+    ids = sorted({int(sid) for sid in student_ids})
+    with transaction() as cursor:
+        cursor.execute("SELECT academic_year, semester FROM classes WHERE id = %s", (class_id,))
+        cl = cursor.fetchone()
+        if not cl:
+            raise ValueError("Classe introuvable.")
+        already = []
+        for i in range(0, len(ids), BULK_CHUNK):
+            already.extend(_class_students(cursor, class_id, ids[i:i + BULK_CHUNK]))
+        skip = {r["id"] for r in already}
+        to_insert = [sid for sid in ids if sid not in skip]
+        for i in range(0, len(to_insert), BULK_CHUNK):
+            cursor.executemany(
+                """
+                INSERT IGNORE INTO enrollments (student_id, class_id, academic_year, semester)
+                VALUES (%s, %s, %s, %s)
+                """,
+                [(sid, class_id, cl["academic_year"], cl["semester"]) for sid in to_insert[i:i + BULK_CHUNK]],
+            )
+        # INSERT IGNORE écarte sans erreur une inscription concurrente (doublon) ou un
+        # étudiant inexistant (clé étrangère) : le résultat est relu. La lecture
+        # simple (instantané de la transaction) ne voit que nos inscriptions, la
+        # lecture verrouillante aussi celles validées depuis par un autre poste.
+        inserted, found = set(), {}
+        for i in range(0, len(to_insert), BULK_CHUNK):
+            part = to_insert[i:i + BULK_CHUNK]
+            inserted.update(r["id"] for r in _class_students(cursor, class_id, part))
+            found.update((r["id"], r) for r in _class_students(cursor, class_id, part, lock=True))
+        enrolled = [sid for sid in to_insert if sid in inserted]
+        already.extend(r for sid, r in found.items() if sid not in inserted)
+        unknown = [sid for sid in to_insert if sid not in found]
+        if enrolled:
+            bump_versions(cursor, "enrollments")
+    if enrolled:
+        publish("enrollments")
+    already.sort(key=lambda r: r["matricule"])
+    return {"enrolled": enrolled, "already": already, "unknown": unknown}
+
+
+def get_class_student_ids(class_id: int):
+    """Ids des étudiants inscrits dans une classe (pour réinscrire une promotion)."""
+    rows = execute_query(
+        "SELECT DISTINCT student_id FROM enrollments WHERE class_id = %s",
+        params=(class_id,),
+        fetchall=True,
+    )
+    return [r["student_id"] for r in rows or []]
 
 
 def delete_enrollment(enrollment_id: int):
-    """Supprime une inscription."""
-    execute_query("DELETE FROM enrollments WHERE id = %s", params=(enrollment_id,), commit=True)
+    """Supprime une inscription. Retourne l'id supprimé."""
+    delete_enrollments([enrollment_id])
+    return enrollment_id
+
+
+def delete_enrollments(enrollment_ids):
+    """Supprime plusieurs inscriptions en une transaction (DELETE ... IN par paquets). Retourne les ids."""
+    ids = sorted({int(i) for i in enrollment_ids})
+    if not ids:
+        return []
+    with transaction() as cursor:
+        record_deletes(cursor, "enrollments", ids)
+        remove_grades(cursor, "enrollments", ids)
+        execute_in(cursor, "DELETE FROM enrollments WHERE id IN ({ids})", ids, chunk_size=BULK_CHUNK)
+        bump_versions(cursor, "enrollments")
+    publish("enrollments", ids)
+    publish("grades")
+    return ids
 
 
 def get_enrollment_count_for_year(academic_year: str):
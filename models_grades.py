@@ -3,63 +3,173 @@ Accès aux données pour les notes (table `grades`).
 Une note = inscription (étudiant+classe) + cours (du programme de la classe).
 """
 
-from db import execute_query
+from db import execute_in, execute_query, offline_replica, transaction
+from change_events import publish
+from change_tracking import bump_versions, changes_since, record_deletes
+from grade_aggregates import apply_changes, average_query, current_grades, remove_grades
+
+
+_GRADE_ROW_SELECT = """
+    SELECT g.id, g.enrollment_id, g.course_id, g.grade,
+           e.academic_year, e.semester,
+           s.matricule,
+           CONCAT(s.first_name, ' ', s.last_name) AS student_name,
+           cl.name AS class_name,
+           c.code, c.name AS course_name
+    FROM grades g
+    JOIN enrollments e ON g.enrollment_id = e.id
+    JOIN students s ON e.student_id = s.id
+    JOIN classes cl ON e.class_id = cl.id
+    JOIN courses c ON g.course_id = c.id
+"""
+
+
+def grades_query():
+    """Requête (sql, params) de la liste des notes."""
+    return _GRADE_ROW_SELECT + " ORDER BY e.academic_year DESC, e.semester, s.last_name, c.code", ()
 
 
 def get_all_grades():
     """Retourne les notes avec infos étudiant, classe et cours."""
+    query, params = grades_query()
+    return execute_query(query, params=params, fetchall=True)
+
+
+def get_grade_rows(grade_ids):
+    """Retourne les notes d'ids donnés, au format de get_all_grades (pour mettre à jour plusieurs lignes)."""
+    ids = list(grade_ids)
+    if not ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(ids))
     return execute_query(
-        """
-        SELECT g.id, g.enrollment_id, g.course_id, g.grade,
-               e.academic_year, e.semester,
-               s.matricule,
-               CONCAT(s.first_name, ' ', s.last_name) AS student_name,
-               cl.name AS class_name,
-               c.code, c.name AS course_name
-        FROM grades g
-        JOIN enrollments e ON g.enrollment_id = e.id
-        JOIN students s ON e.student_id = s.id
-        JOIN classes cl ON e.class_id = cl.id
-        JOIN courses c ON g.course_id = c.id
-        ORDER BY e.academic_year DESC, e.semester, s.last_name, c.code
-        """,
+        _GRADE_ROW_SELECT + f" WHERE g.id IN ({placeholders})",
+        params=tuple(ids),
         fetchall=True,
-    )
+    ) or []
+
+
+def get_grades_changed_since(token):
+    """Notes créées, modifiées ou supprimées depuis token (ou dont l'inscription, l'étudiant, la classe ou le cours a changé)."""
+    return changes_since("grades", _GRADE_ROW_SELECT, token, aliases=("g", "e", "s", "cl", "c"))
 
 
 def create_or_update_grade(enrollment_id: int, course_id: int, grade: float):
-    """Crée ou met à jour la note (inscription + cours)."""
-    existing = execute_query(
-        "SELECT id FROM grades WHERE enrollment_id = %s AND course_id = %s",
-        params=(enrollment_id, course_id),
-        fetchone=True,
-    )
+    """
+    Crée ou met à jour la note (inscription + cours), mise en file hors
+    connexion. Retourne la ligne (format get_all_grades).
+    """
     grade_val = float(grade) if grade is not None and str(grade).strip() else None
-    if existing:
-        execute_query(
-            "UPDATE grades SET grade = %s WHERE enrollment_id = %s AND course_id = %s",
-            params=(grade_val, enrollment_id, course_id),
-            commit=True,
-        )
-    else:
-        execute_query(
-            "INSERT INTO grades (enrollment_id, course_id, grade) VALUES (%s, %s, %s)",
-            params=(enrollment_id, course_id, grade_val),
-            commit=True,
-        )
+    replica = offline_replica()
+    if replica is not None:
+        grade_id = replica.queue_grade(enrollment_id, course_id, grade_val)
+        publish("grades", [grade_id])
+        rows = get_grade_rows([grade_id])
+        return rows[0] if rows else None
+    with transaction() as cursor:
+        current = current_grades(cursor, course_id, [enrollment_id])
+        if enrollment_id not in current:
+            raise ValueError(f"Inscription introuvable : {enrollment_id}")
+        class_id, grade_id, old = current[enrollment_id]
+        if grade_id is not None:
+            cursor.execute("UPDATE grades SET grade = %s WHERE id = %s", (grade_val, grade_id))
+        else:
+            cursor.execute(
+                "INSERT INTO grades (enrollment_id, course_id, grade) VALUES (%s, %s, %s)",
+                (enrollment_id, course_id, grade_val),
+            )
+            grade_id = cursor.lastrowid
+        apply_changes(cursor, [(enrollment_id, course_id, class_id, old, grade_val)])
+        bump_versions(cursor, "grades")
+    publish("grades", [grade_id])
+    rows = get_grade_rows([grade_id])
+    return rows[0] if rows else None
 
 
 def delete_grade(grade_id: int):
-    """Supprime une note."""
-    execute_query("DELETE FROM grades WHERE id = %s", params=(grade_id,), commit=True)
+    """Supprime une note. Retourne l'id supprimé."""
+    delete_grades([grade_id])
+    return grade_id
+
+
+def delete_grades(grade_ids):
+    """Supprime plusieurs notes en une transaction (DELETE ... IN par paquets). Retourne les ids."""
+    ids = sorted({int(i) for i in grade_ids})
+    if not ids:
+        return []
+    with transaction() as cursor:
+        record_deletes(cursor, "grades", ids)
+        remove_grades(cursor, "grades", ids)
+        execute_in(cursor, "DELETE FROM grades WHERE id IN ({ids})", ids)
+        bump_versions(cursor, "grades")
+    publish("grades", ids)
+    return ids
+
+
+def get_class_gradebook(class_id: int, course_id: int):
+    """
+    Feuille de notes d'une classe pour un cours : une ligne par inscription
+    (enrollment_id, matricule, student_name, grade ou None), triée par nom.
+    """
+    return execute_query(
+        """
+        SELECT e.id AS enrollment_id, s.matricule,
+               CONCAT(s.last_name, ' ', s.first_name) AS student_name,
+               g.grade
+        FROM enrollments e
+        JOIN students s ON e.student_id = s.id
+        LEFT JOIN grades g ON g.enrollment_id = e.id AND g.course_id = %s
+        WHERE e.class_id = %s
+        ORDER BY s.last_name, s.first_name, s.matricule
+        """,
+        params=(course_id, class_id),
+        fetchall=True,
+    ) or []
+
+
+def save_grades_batch(course_id: int, grades: dict):
+    """
+    Enregistre plusieurs notes d'un même cours en une transaction.
+    grades : {enrollment_id: note (0-20) ou None pour effacer}. Retourne le nombre de notes écrites.
+    Hors connexion, les notes sont mises en file dans la réplique locale.
+    """
+    if not grades:
+        return 0
+    rows = [
+        (enrollment_id, course_id, None if grade is None else float(grade))
+        for enrollment_id, grade in grades.items()
+    ]
+    replica = offline_replica()
+    if replica is not None:
+        for row in rows:
+            replica.queue_grade(*row)
+        publish("grades")
+        return len(rows)
+    with transaction() as cursor:
+        current = current_grades(cursor, course_id, grades)
+        cursor.executemany(
+            """
+            INSERT INTO grades (enrollment_id, course_id, grade) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE grade = VALUES(grade)
+            """,
+            rows,
+        )
+        apply_changes(
+            cursor,
+            [
+                (enrollment_id, course_id, current[enrollment_id][0], current[enrollment_id][2], grade)
+                for enrollment_id, course_id, grade in rows
+                if enrollment_id in current
+            ],
+        )
+        bump_versions(cursor, "grades")
+    publish("grades")
+    return len(rows)
 
 
 def get_average_grade():
-    """Retourne la moyenne générale des notes (hors NULL)."""
-    result = execute_query(
-        "SELECT AVG(grade) AS avg_grade FROM grades WHERE grade IS NOT NULL",
-        fetchone=True,
-    )
+    """Retourne la moyenne générale des notes (hors NULL), lue dans grade_aggregates."""
+    query, params = average_query()
+    result = execute_query(query, params=params, fetchone=True)
     return round(float(result["avg_grade"]), 2) if result and result["avg_grade"] is not None else None
 
 
@@ -0,0 +1,226 @@
+"""
+Statistiques des notes par tranche (année, semestre, classe, cours, enseignant).
+
+Pour chaque groupe : nombre de notes attendues (inscriptions × cours du
+programme de la classe), notes saisies, taux de notes manquantes, moyenne,
+médiane, écart type (échantillon), quartiles, minimum, maximum et taux de
+réussite (note >= seuil).
+
+Le calcul est fait par le serveur en une requête : agrégats (COUNT, AVG,
+STDDEV_SAMP) et quartiles par fonctions de fenêtre (ROW_NUMBER), interpolés
+comme numpy.percentile. Si le serveur ne les accepte pas (MySQL < 8) ou si la
+lecture est servie par la réplique locale, les notes sont lues puis
+décrites en Python, avec NumPy s'il est installé, sinon le module statistics.
+Les résultats sont gardés dans query_cache par tranche et invalidés par les
+écritures sur les tables lues.
+"""
+
+import logging
+import statistics
+
+from config import APP_CONFIG
+from db import execute_query, serves_locally
+from query_cache import cached
+
+
+log = logging.getLogger(__name__)
+
+# Regroupements possibles : (clé, libellé)
+GROUPS = {
+    None: ("0", "'Ensemble'"),
+    "year": ("e.academic_year", "e.academic_year"),
+    "semester": ("CONCAT(e.academic_year, ' ', e.semester)", "CONCAT(e.academic_year, ' ', e.semester)"),
+    "class": ("cl.id", "CONCAT(cl.name, ' (', cl.academic_year, ' ', cl.semester, ')')"),
+    "course": ("c.id", "CONCAT(c.code, ' - ', c.name)"),
+    "teacher": ("COALESCE(c.teacher_id, 0)", "COALESCE(CONCAT(t.first_name, ' ', t.last_name), 'Non assigné')"),
+}
+_QUARTILES = (("q1", 0.25), ("median", 0.5), ("q3", 0.75))
+_TABLES = ("grades", "enrollments", "classes", "class_courses", "courses", "teachers")
+
+# Une ligne par note attendue : inscription × cours du programme de la classe, note éventuelle
+_SLOTS = """
+    SELECT {key} AS group_key, {label} AS label, g.grade
+    FROM enrollments e
+    JOIN classes cl ON cl.id = e.class_id
+    JOIN class_courses cc ON cc.class_id = e.class_id
+    JOIN courses c ON c.id = cc.course_id
+    LEFT JOIN teachers t ON t.id = c.teacher_id
+    LEFT JOIN grades g ON g.enrollment_id = e.id AND g.course_id = cc.course_id
+"""
+
+
+def _slots_query(group_by, academic_year, semester, class_id, course_id, teacher_id):
+    if group_by not in GROUPS:
+        raise ValueError(f"Regroupement inconnu : {group_by!r}")
+    key, label = GROUPS[group_by]
+    clauses, params = [], []
+    for column, value in (
+        ("e.academic_year", academic_year),
+        ("e.semester", semester),
+        ("e.class_id", class_id),
+        ("cc.course_id", course_id),
+        ("c.teacher_id", teacher_id),
+    ):
+        if value not in (None, ""):
+            clauses.append(f"{column} = %s")
+            params.append(value)
+    query = _SLOTS.format(key=key, label=label)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    return query, params
+
+
+def _sql_statistics(slots, params, threshold):
+    """Agrégats et quartiles calculés par le serveur (MySQL 8 : CTE et fonctions de fenêtre)."""
+    picks = ",\n".join(
+        f"MAX(CASE WHEN rn = FLOOR(1 + (n - 1) * {p}) THEN grade END) AS {name}_lo, "
+        f"MAX(CASE WHEN rn = CEIL(1 + (n - 1) * {p}) THEN grade END) AS {name}_hi"
+        for name, p in _QUARTILES
+    )
+    rows = execute_query(
+        f"""
+        WITH slots AS ({slots}),
+        ranked AS (
+            SELECT group_key, grade,
+                   ROW_NUMBER() OVER (PARTITION BY group_key ORDER BY grade) AS rn,
+                   COUNT(*) OVER (PARTITION BY group_key) AS n
+            FROM slots WHERE grade IS NOT NULL
+        ),
+        quartiles AS (
+            SELECT group_key, MAX(n) AS n, {picks}
+            FROM ranked GROUP BY group_key
+        )
+        SELECT a.*, {", ".join(f"q.{name}_lo, q.{name}_hi" for name, _p in _QUARTILES)}
+        FROM (
+            SELECT group_key, MIN(label) AS label, COUNT(*) AS slots, COUNT(grade) AS count,
+                   AVG(grade) AS mean, STDDEV_SAMP(grade) AS stdev, MIN(grade) AS min, MAX(grade) AS max,
+                   SUM(grade >= %s) AS passing
+            FROM slots GROUP BY group_key
+        ) a
+        LEFT JOIN quartiles q ON q.group_key = a.group_key
+        ORDER BY a.label
+        """,
+        params=(*params, threshold),
+        fetchall=True,
+    ) or []
+    result = []
+    for r in rows:
+        stats = {
+            "key": r["group_key"],
+            "label": r["label"],
+            "slots": int(r["slots"]),
+            "count": int(r["count"]),
+            "passing": int(r["passing"] or 0),
+        }
+        for name in ("mean", "stdev", "min", "max"):
+            stats[name] = float(r[name]) if r[name] is not None else None
+        for name, p in _QUARTILES:
+            lo, hi = r[f"{name}_lo"], r[f"{name}_hi"]
+            if lo is None:
+                stats[name] = None
+            else:
+                # Interpolation linéaire entre les rangs encadrant 1 + (n - 1) * p
+                frac = ((stats["count"] - 1) * p) % 1
+                stats[name] = float(lo) + frac * (float(hi) - float(lo))
+        result.append(_rates(stats))
+    return result
+
+
+def _describe(values):
+    """Moyenne, écart type, quartiles, min et max d'une liste de notes (NumPy si disponible)."""
+    if not values:
+        return {name: None for name in ("mean", "stdev", "min", "max", "q1", "median", "q3")}
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        a = np.asarray(values, dtype=float)
+        q1, median, q3 = (float(x) for x in np.percentile(a, [25, 50, 75]))
+        return {
+            "mean": float(a.mean()),
+            "stdev": float(a.std(ddof=1)) if len(a) > 1 else None,
+            "min": float(a.min()),
+            "max": float(a.max()),
+            "q1": q1,
+            "median": median,
+            "q3": q3,
+        }
+    if len(values) > 1:
+        q1, median, q3 = statistics.quantiles(values, n=4, method="inclusive")
+    else:
+        q1 = median = q3 = values[0]
+    return {
+        "mean": statistics.fmean(values),
+        "stdev": statistics.stdev(values) if len(values) > 1 else None,
+        "min": min(values),
+        "max": max(values),
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+    }
+
+
+def _python_statistics(slots, params, threshold):
+    """Même résultat que _sql_statistics, à partir des notes lues une à une."""
+    groups = {}
+    for r in execute_query(slots, params=tuple(params), fetchall=True) or []:
+        group = groups.setdefault(r["group_key"], {"label": r["label"], "slots": 0, "grades": []})
+        group["slots"] += 1
+        if r["grade"] is not None:
+            group["grades"].append(float(r["grade"]))
+    result = []
+    for key, group in groups.items():
+        values = group["grades"]
+        stats = {
+            "key": key,
+            "label": group["label"],
+            "slots": group["slots"],
+            "count": len(values),
+            "passing": sum(1 for v in values if v >= threshold),
+        }
+        stats.update(_describe(values))
+        result.append(_rates(stats))
+    result.sort(key=lambda s: s["label"] or "")
+    return result
+
+
+def _rates(stats):
+    stats["missing"] = stats["slots"] - stats["count"]
+    stats["missing_rate"] = stats["missing"] / stats["slots"] if stats["slots"] else None
+    stats["pass_rate"] = stats["passing"] / stats["count"] if stats["count"] else None
+    return stats
+
+
+def get_grade_statistics(
+    group_by=None, academic_year=None, semester=None, class_id=None, course_id=None, teacher_id=None,
+    threshold=APP_CONFIG["pass_threshold"],
+):
+    """
+    Statistiques des notes de la tranche filtrée, par groupe (group_by : None,
+    "year", "semester", "class", "course" ou "teacher"). Retourne une liste de
+    dicts triée par libellé : key, label, slots, count, missing, missing_rate,
+    mean, median, stdev, q1, q3, min, max, passing, pass_rate (taux entre 0
+    et 1, None si rien à mesurer).
+    """
+    slots, params = _slots_query(group_by, academic_year, semester, class_id, course_id, teacher_id)
+    cache_key = ("grade_statistics", slots, tuple(params), threshold)
+
+    def _load():
+        if serves_locally(slots):
+            return _python_statistics(slots, params, threshold)
+        try:
+            return _sql_statistics(slots, params, threshold)
+        except RuntimeError:
+            raise  # serveur injoignable
+        except Exception as e:
+            log.info("Statistiques calculées en Python (requête SQL refusée : %s)", e)
+            return _python_statistics(slots, params, threshold)
+
+    return cached(cache_key, _TABLES, _load)
+
+
+def get_slice_statistics(**filters):
+    """Statistiques de toute la tranche filtrée (mêmes filtres que get_grade_statistics), un seul dict."""
+    rows = get_grade_statistics(None, **filters)
+    return rows[0] if rows else _rates({"key": 0, "label": "Ensemble", "slots": 0, "count": 0, "passing": 0, **_describe([])})
@@ -2,19 +2,90 @@
 Accès aux données pour les étudiants (table `students`).
 """
 
-from db import execute_query
+from db import execute_in, execute_query, like_prefix, offline_replica, transaction
+from change_events import publish
+from change_tracking import bump_versions, changes_since, record_deletes
+from grade_aggregates import remove_grades
+
+
+def students_query(search: str = ""):
+    """
+    Requête (sql, params) de la liste des étudiants triés par matricule,
+    filtrée comme la recherche de l'écran Étudiants si search est fourni.
+    """
+    query = "SELECT id, matricule, first_name, last_name, email, phone, created_at FROM students"
+    params = ()
+    if search and search.strip():
+        query += " WHERE CONCAT_WS(' ', matricule, last_name, first_name, email, phone) LIKE %s"
+        params = (f"%{search.strip()}%",)
+    return query + " ORDER BY matricule", params
 
 
 def get_all_students():
     """
     Retourne la liste de tous les étudiants, triés par matricule.
     """
+    query, params = students_query()
+    return execute_query(query, params=params, fetchall=True)
+
+
+def get_students_changed_since(token):
+    """
+    Étudiants créés, modifiés ou supprimés depuis token (voir change_tracking).
+    Retourne {"token", "upserts", "deletes"} ; token None : tous les étudiants.
+    """
+    return changes_since(
+        "students", "SELECT id, matricule, first_name, last_name, email, phone, created_at FROM students", token
+    )
+
+
+def get_student_ids_by_matricules(matricules):
+    """
+    Résout une liste de matricules (casse indifférente).
+    Retourne ({matricule saisi: id}, [matricules inconnus]).
+    """
+    wanted = {}
+    for m in matricules:
+        m = m.strip()
+        if m:
+            wanted.setdefault(m.casefold(), m)
+    found = {}
+    keys = list(wanted)
+    for i in range(0, len(keys), 1000):
+        part = [wanted[k] for k in keys[i:i + 1000]]
+        placeholders = ", ".join(["%s"] * len(part))
+        rows = execute_query(
+            f"SELECT id, matricule FROM students WHERE matricule IN ({placeholders})",
+            params=tuple(part),
+            fetchall=True,
+        )
+        for r in rows or []:
+            original = wanted.get(r["matricule"].casefold())
+            if original is not None:
+                found[original] = r["id"]
+    missing = [m for m in wanted.values() if m not in found]
+    return found, missing
+
+
+def search_students(query: str, limit: int = 20):
+    """
+    Recherche par préfixe pour les sélecteurs : chaque mot saisi doit être le
+    début du matricule, du nom ou du prénom (index sur ces colonnes).
+    """
+    tokens = query.split()[:4]
+    if not tokens:
+        return []
+    clauses, params = [], []
+    for token in tokens:
+        pattern = like_prefix(token)
+        clauses.append("(matricule LIKE %s OR last_name LIKE %s OR first_name LIKE %s)")
+        params += [pattern, pattern, pattern]
+    params.append(int(limit))
     return execute_query(
-        """
-        SELECT id, matricule, first_name, last_name, email, phone, created_at
-        FROM students
-        ORDER BY matricule
-        """,
+        "SELECT id, matricule, first_name, last_name FROM students WHERE "
+        + " AND ".join(clauses)
+        + " ORDER BY last_name, first_name, matricule LIMIT %s",
+        params=tuple(params),
         fetchall=True,
     )
 
@@ -40,29 +111,64 @@ def get_student_by_id(student_id: int):
 
 
 def create_student(matricule: str, first_name: str, last_name: str, email: str = "", phone: str = ""):
-    """Crée un nouvel étudiant."""
-    execute_query(
-        """
-        INSERT INTO students (matricule, first_name, last_name, email, phone)
-        VALUES (%s, %s, %s, %s, %s)
-        """,
-        params=(matricule.strip(), first_name.strip(), last_name.strip(), email.strip() or None, phone.strip() or None),
-        commit=True,
-    )
+    """Crée un nouvel étudiant. Retourne la ligne créée."""
+    with transaction() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO students (matricule, first_name, last_name, email, phone)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (matricule.strip(), first_name.strip(), last_name.strip(), email.strip() or None, phone.strip() or None),
+        )
+        student_id = cursor.lastrowid
+        bump_versions(cursor, "students")
+    publish("students", [student_id])
+    return get_student_by_id(student_id)
 
 
 def update_student(student_id: int, matricule: str, first_name: str, last_name: str, email: str = "", phone: str = ""):
-    """Met à jour un étudiant existant."""
-    execute_query(
-        """
-        UPDATE students SET matricule = %s, first_name = %s, last_name = %s, email = %s, phone = %s
-        WHERE id = %s
-        """,
-        params=(matricule.strip(), first_name.strip(), last_name.strip(), email.strip() or None, phone.strip() or None, student_id),
-        commit=True,
-    )
+    """Met à jour un étudiant existant (mis en file hors connexion). Retourne la ligne modifiée."""
+    values = {
+        "matricule": matricule.strip(),
+        "first_name": first_name.strip(),
+        "last_name": last_name.strip(),
+        "email": email.strip() or None,
+        "phone": phone.strip() or None,
+    }
+    replica = offline_replica()
+    if replica is not None:
+        replica.queue_update("students", student_id, values)
+    else:
+        with transaction() as cursor:
+            cursor.execute(
+                """
+                UPDATE students SET matricule = %s, first_name = %s, last_name = %s, email = %s, phone = %s
+                WHERE id = %s
+                """,
+                (*values.values(), student_id),
+            )
+            bump_versions(cursor, "students")
+    publish("students", [student_id])
+    return get_student_by_id(student_id)
 
 
 def delete_student(student_id: int):
-    """Supprime un étudiant."""
-    execute_query("DELETE FROM students WHERE id = %s", params=(student_id,), commit=True)
+    """Supprime un étudiant. Retourne l'id supprimé."""
+    delete_students([student_id])
+    return student_id
+
+
+def delete_students(student_ids):
+    """Supprime plusieurs étudiants en une transaction (DELETE ... IN par paquets). Retourne les ids."""
+    ids = sorted({int(i) for i in student_ids})
+    if not ids:
+        return []
+    with transaction() as cursor:
+        record_deletes(cursor, "students", ids)
+        remove_grades(cursor, "students", ids)
+        execute_in(cursor, "DELETE FROM students WHERE id IN ({ids})", ids)
+        bump_versions(cursor, "students")
+    publish("students", ids)
+    publish("enrollments")
+    publish("grades")
+    return ids
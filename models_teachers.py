@@ -2,20 +2,35 @@
 Accès aux données pour les enseignants (table `teachers`).
 """
 
-from db import execute_query
+from db import execute_in, execute_query, offline_replica, transaction
+from change_events import publish
+from change_tracking import bump_versions, changes_since, record_deletes
 
 
-def get_all_teachers():
-    """
-    Retourne la liste de tous les enseignants, triés par matricule.
-    """
-    return execute_query(
+def teachers_query():
+    """Requête (sql, params) de la liste des enseignants triés par nom."""
+    return (
         """
         SELECT id, last_name, first_name, email, department, phone, created_at
         FROM teachers
         ORDER BY last_name
         """,
-        fetchall=True,
+        (),
+    )
+
+
+def get_all_teachers():
+    """
+    Retourne la liste de tous les enseignants, triés par matricule.
+    """
+    query, params = teachers_query()
+    return execute_query(query, params=params, fetchall=True, cache=("teachers",))
+
+
+def get_teachers_changed_since(token):
+    """Enseignants créés, modifiés ou supprimés depuis token : {"token", "upserts", "deletes"}."""
+    return changes_since(
+        "teachers", "SELECT id, last_name, first_name, email, department, phone, created_at FROM teachers", token
     )
 
 
@@ -40,29 +55,92 @@ def get_teacher_by_id(teacher_id: int):
 
 
 def create_teacher(first_name: str, last_name: str, email: str = "", phone: str = "", department: str = ""):
-    """Crée un nouvel enseignant."""
-    execute_query(
-        """
-        INSERT INTO teachers (first_name, last_name, email, phone, department)
-        VALUES (%s, %s, %s, %s, %s)
-        """,
-        params=(first_name.strip(), last_name.strip(), email.strip() or None, phone.strip() or None, department.strip() or None),
-        commit=True,
-    )
+    """Crée un nouvel enseignant. Retourne la ligne créée."""
+    with transaction() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO teachers (first_name, last_name, email, phone, department)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (first_name.strip(), last_name.strip(), email.strip() or None, phone.strip() or None, department.strip() or None),
+        )
+        teacher_id = cursor.lastrowid
+        bump_versions(cursor, "teachers")
+    publish("teachers", [teacher_id])
+    return get_teacher_by_id(teacher_id)
 
 
 def update_teacher(teacher_id: int, first_name: str, last_name: str, email: str = "", phone: str = "", department: str = ""):
-    """Met à jour un enseignant existant."""
-    execute_query(
-        """
-        UPDATE teachers SET first_name = %s, last_name = %s, email = %s, phone = %s, department = %s
-        WHERE id = %s
-        """,
-        params=(first_name.strip(), last_name.strip(), email.strip() or None, phone.strip() or None, department.strip() or None, teacher_id),
-        commit=True,
-    )
+    """Met à jour un enseignant existant (mis en file hors connexion). Retourne la ligne modifiée."""
+    values = {
+        "first_name": first_name.strip(),
+        "last_name": last_name.strip(),
+        "email": email.strip() or None,
+        "phone": phone.strip() or None,
+        "department": department.strip() or None,
+    }
+    replica = offline_replica()
+    if replica is not None:
+        replica.queue_update("teachers", teacher_id, values)
+    else:
+        with transaction() as cursor:
+            cursor.execute(
+                """
+                UPDATE teachers SET first_name = %s, last_name = %s, email = %s, phone = %s, department = %s
+                WHERE id = %s
+                """,
+                (*values.values(), teacher_id),
+            )
+            bump_versions(cursor, "teachers")
+    publish("teachers", [teacher_id])
+    return get_teacher_by_id(teacher_id)
 
 
 def delete_teacher(teacher_id: int):
-    """Supprime un enseignant."""
-    execute_query("DELETE FROM teachers WHERE id = %s", params=(teacher_id,), commit=True)
+    """Supprime un enseignant. Retourne l'id supprimé."""
+    delete_teachers([teacher_id])
+    return teacher_id
+
+
+def delete_teachers(teacher_ids):
+    """Supprime plusieurs enseignants en une transaction (DELETE ... IN par paquets). Retourne les ids."""
+    ids = sorted({int(i) for i in teacher_ids})
+    if not ids:
+        return []
+    with transaction() as cursor:
+        record_deletes(cursor, "teachers", ids)
+        # ON DELETE SET NULL ne met pas à jour courses.updated_at : détachement explicite
+        execute_in(cursor, "UPDATE courses SET teacher_id = NULL WHERE teacher_id IN ({ids})", ids)
+        execute_in(cursor, "DELETE FROM teachers WHERE id IN ({ids})", ids)
+        bump_versions(cursor, "teachers", "courses")
+    publish("teachers", ids)
+    publish("courses")
+    return ids
+
+
+def get_teacher_rows(teacher_ids):
+    """Retourne les enseignants d'ids donnés, au format de get_all_teachers."""
+    ids = list(teacher_ids)
+    if not ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(ids))
+    return execute_query(
+        f"SELECT id, first_name, last_name, email, phone, department FROM teachers WHERE id IN ({placeholders})",
+        params=tuple(ids),
+        fetchall=True,
+    ) or []
+
+
+def set_teachers_department(teacher_ids, department: str):
+    """Affecte le même département à plusieurs enseignants. Retourne les lignes modifiées."""
+    ids = sorted({int(i) for i in teacher_ids})
+    if not ids:
+        return []
+    with transaction() as cursor:
+        execute_in(
+            cursor, "UPDATE teachers SET department = %s WHERE id IN ({ids})", ids,
+            params=((department or "").strip() or None,),
+        )
+        bump_versions(cursor, "teachers")
+    publish("teachers", ids)
+    return get_teacher_rows(ids)
@@ -5,6 +5,7 @@ Logique d'accès aux données pour les utilisateurs (table `users`).
 import hashlib
 
 from db import execute_query
+from change_events import publish
 from hash_password import hash_password, verify_password
 
 
@@ -25,6 +26,7 @@ def create_default_admin_if_not_exists():
             params=("admin", hash_password("admin123"), "admin"),
             commit=True,
         )
+        publish("users")
 
 
 def authenticate_user(username: str, password: str):
@@ -0,0 +1,119 @@
+"""
+Cache des résultats de lecture, devant db.execute_query.
+
+Une entrée est indexée par (sql, params, mode) et étiquetée par les tables
+lues. Toute écriture publiée sur le bus change_events pour l'une de ces
+tables l'invalide. Le cache est borné (LRU, APP_CONFIG["query_cache_size"]
+entrées, 0 pour le désactiver) et chaque entrée expire après
+APP_CONFIG["query_cache_ttl"] secondes, ce qui couvre les écritures faites
+par un autre poste.
+
+Une lecture commencée avant une écriture et terminée après n'est pas mise en
+cache : chaque table porte un compteur de version, comparé avant l'ajout.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from change_events import subscribe
+from config import APP_CONFIG
+
+
+class QueryCache:
+    def __init__(self, max_entries=256, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clé -> (expiration, tables, résultat)
+        self._versions = {}  # table -> compteur d'écritures
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def versions(self, tables):
+        """Versions courantes des tables (à relever avant la lecture, puis passer à put)."""
+        with self._lock:
+            return tuple(self._versions.get(t, 0) for t in tables)
+
+    def get(self, key):
+        """Retourne (True, résultat) si la clé est en cache et non expirée, sinon (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[2]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, tables, versions, result):
+        """Ajoute un résultat, sauf si l'une des tables a été modifiée depuis versions."""
+        tables = tuple(tables)
+        with self._lock:
+            if tuple(self._versions.get(t, 0) for t in tables) != tuple(versions):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, frozenset(tables), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table):
+        """Retire les entrées qui lisent table."""
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if table in entry[1]]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Compteurs : hits, misses, evictions, invalidations, entries, hit_rate."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+cache = QueryCache(APP_CONFIG["query_cache_size"], APP_CONFIG["query_cache_ttl"])
+subscribe(lambda table, _ids: cache.invalidate(table))
+
+
+def _copy(result):
+    # Les appelants peuvent modifier les lignes reçues : le cache garde les siennes.
+    if isinstance(result, list):
+        return [dict(row) for row in result]
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
+def cached(key, tables, load):
+    """Résultat de load() pour key, lu dans le cache ou chargé puis mis en cache."""
+    if not cache.enabled:
+        return load()
+    found, result = cache.get(key)
+    if found:
+        return _copy(result)
+    versions = cache.versions(tables)
+    result = load()
+    cache.put(key, tables, versions, _copy(result))
+    return result
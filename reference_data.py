@@ -0,0 +1,301 @@
+"""
+Données de référence en mémoire : annuaire des étudiants, enseignants, cours,
+classes et cours de chaque classe, indexés par id (identity map).
+
+Les tables sont lues une fois, au premier accès. Les fonctions d'écriture des
+modèles publient leurs modifications sur change_events : les lignes
+concernées (ou toute la table si les ids sont inconnus) sont marquées
+périmées et relues au prochain accès, par une seule requête. Les écrans
+résolvent ainsi noms et appartenances sans aller-retour vers la base.
+
+Entre deux sessions, les tables sont gardées dans un fichier local
+(save_snapshot à la fermeture, warm_start au lancement). Chaque table y porte
+une empreinte (nombre de lignes et XOR des CRC32 de chaque ligne) que MySQL
+recalcule en une seule requête : une table dont l'empreinte n'a pas changé
+est relue depuis le disque, les autres depuis la base.
+
+Les lignes renvoyées sont partagées : les appelants ne doivent pas les modifier.
+"""
+
+import json
+import logging
+import os
+import threading
+import zlib
+
+from change_events import subscribe
+from config import APP_CONFIG, DB_CONFIG
+from db import execute_query
+
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+_COLUMNS = {
+    "students": ("id", "matricule", "last_name", "first_name"),
+    "teachers": ("id", "last_name", "first_name", "email", "department", "phone"),
+    "courses": ("id", "code", "name", "credits", "teacher_id"),
+    "classes": ("id", "name", "academic_year", "semester"),
+}
+_MEMBERSHIP_COLUMNS = ("class_id", "course_id")
+_QUERIES = {table: f"SELECT {', '.join(cols)} FROM {table}" for table, cols in _COLUMNS.items()}
+
+_lock = threading.RLock()
+_rows = {table: None for table in _QUERIES}  # table -> {id: ligne}, None si non chargée
+_stale_ids = {table: set() for table in _QUERIES}
+_class_courses = None  # class_id -> set(course_id), None si non chargé
+_changes = 0  # écritures reçues : warm_start n'installe rien si une écriture a eu lieu pendant sa lecture
+
+
+def _on_change(table, ids):
+    global _class_courses, _changes
+    with _lock:
+        _changes += 1
+        if table in _QUERIES:
+            if ids is None:
+                _rows[table] = None
+                _stale_ids[table].clear()
+            elif _rows[table] is not None:
+                _stale_ids[table].update(ids)
+        if table in ("class_courses", "classes", "courses"):
+            # Attributions modifiées ou supprimées en cascade
+            _class_courses = None
+
+
+subscribe(_on_change)
+
+
+def _table(table):
+    """{id: ligne} à jour pour table (chargement complet ou relecture des ids périmés)."""
+    with _lock:
+        rows = _rows[table]
+        if rows is None:
+            rows = {r["id"]: r for r in execute_query(_QUERIES[table], fetchall=True) or []}
+            _rows[table] = rows
+            _stale_ids[table].clear()
+        elif _stale_ids[table]:
+            ids = sorted(_stale_ids[table])
+            _stale_ids[table].clear()
+            placeholders = ", ".join(["%s"] * len(ids))
+            fresh = execute_query(
+                _QUERIES[table] + f" WHERE id IN ({placeholders})", params=tuple(ids), fetchall=True
+            ) or []
+            for i in ids:
+                rows.pop(i, None)
+            rows.update((r["id"], r) for r in fresh)
+        return rows
+
+
+def _memberships():
+    global _class_courses
+    with _lock:
+        if _class_courses is None:
+            membership = {}
+            for r in execute_query("SELECT class_id, course_id FROM class_courses", fetchall=True) or []:
+                membership.setdefault(r["class_id"], set()).add(r["course_id"])
+            _class_courses = membership
+        return _class_courses
+
+
+def invalidate():
+    """Oublie tout : la prochaine lecture recharge les tables."""
+    global _class_courses
+    with _lock:
+        for table in _QUERIES:
+            _rows[table] = None
+            _stale_ids[table].clear()
+        _class_courses = None
+
+
+# --- Étudiants (annuaire : matricule et nom)
+
+
+def students():
+    """Annuaire des étudiants trié par matricule (id, matricule, last_name, first_name)."""
+    return sorted(_table("students").values(), key=lambda st: st["matricule"])
+
+
+def get_student(student_id):
+    return _table("students").get(student_id)
+
+
+# --- Enseignants
+
+
+def teachers():
+    """Enseignants triés par nom puis prénom."""
+    return sorted(_table("teachers").values(), key=lambda t: (t["last_name"].casefold(), t["first_name"].casefold()))
+
+
+def get_teacher(teacher_id):
+    return _table("teachers").get(teacher_id)
+
+
+def teacher_name(teacher_id):
+    """« Prénom Nom » de l'enseignant, None s'il n'existe pas (ou teacher_id None)."""
+    t = _table("teachers").get(teacher_id) if teacher_id is not None else None
+    return f"{t['first_name']} {t['last_name']}" if t else None
+
+
+def departments():
+    """Départements distincts des enseignants, triés."""
+    return sorted({t["department"] for t in _table("teachers").values() if t["department"]})
+
+
+# --- Cours
+
+
+def get_course(course_id):
+    return _table("courses").get(course_id)
+
+
+def _course_row(c):
+    row = dict(c)
+    row["teacher_name"] = teacher_name(c["teacher_id"])
+    return row
+
+
+def courses():
+    """Cours triés par code, au format de get_all_courses (teacher_name résolu en mémoire, teacher_id en plus)."""
+    return [_course_row(c) for c in sorted(_table("courses").values(), key=lambda c: c["code"])]
+
+
+# --- Classes
+
+
+def classes():
+    """Classes au format de get_all_classes (courses_count), triées par année décroissante, semestre et nom."""
+    membership = _memberships()
+    rows = []
+    for cl in _table("classes").values():
+        row = dict(cl)
+        row["courses_count"] = len(membership.get(cl["id"], ()))
+        rows.append(row)
+    rows.sort(key=lambda cl: (cl["semester"], cl["name"]))
+    rows.sort(key=lambda cl: cl["academic_year"], reverse=True)
+    return rows
+
+
+def get_class(class_id):
+    return _table("classes").get(class_id)
+
+
+def class_course_ids(class_id):
+    """Ids des cours attribués à une classe."""
+    return set(_memberships().get(class_id, ()))
+
+
+def courses_for_class(class_id):
+    """Cours d'une classe au format de get_courses_for_class, triés par code."""
+    all_courses = _table("courses")
+    found = [all_courses[i] for i in _memberships().get(class_id, ()) if i in all_courses]
+    return [_course_row(c) for c in sorted(found, key=lambda c: c["code"])]
+
+
+# --- Instantané sur disque
+
+
+def _fingerprint(columns, rows):
+    """Empreinte calculée comme en SQL : COUNT(*) et BIT_XOR(CRC32(CONCAT_WS('|', colonnes)))."""
+    count = crc = 0
+    for row in rows:
+        text = "|".join(str(row[c]) for c in columns if row[c] is not None)
+        crc ^= zlib.crc32(text.encode("utf-8"))
+        count += 1
+    return [count, crc]
+
+
+def _db_fingerprints():
+    """Empreintes actuelles de toutes les tables, en une requête."""
+    parts = [
+        f"SELECT '{table}' AS name, COUNT(*) AS n, BIT_XOR(CRC32(CONCAT_WS('|', {', '.join(cols)}))) AS crc FROM {table}"
+        for table, cols in [*_COLUMNS.items(), ("class_courses", _MEMBERSHIP_COLUMNS)]
+    ]
+    rows = execute_query(" UNION ALL ".join(parts), fetchall=True) or []
+    return {r["name"]: [int(r["n"]), int(r["crc"] or 0)] for r in rows}
+
+
+def _membership_rows(membership):
+    return [{"class_id": cid, "course_id": course_id} for cid, ids in membership.items() for course_id in ids]
+
+
+def _snapshot_path(path):
+    return path or APP_CONFIG["reference_cache_path"]
+
+
+def _database_key():
+    return f"{DB_CONFIG['host']}/{DB_CONFIG['database']}"
+
+
+def save_snapshot(path=None):
+    """
+    Écrit les tables chargées (sans ligne en attente de relecture) dans le
+    fichier d'instantané, avec leur empreinte. Retourne les tables écrites.
+    """
+    path = _snapshot_path(path)
+    tables = {}
+    with _lock:
+        for table, columns in _COLUMNS.items():
+            rows = _rows[table]
+            if rows is None or _stale_ids[table]:
+                continue
+            values = list(rows.values())
+            tables[table] = {
+                "fingerprint": _fingerprint(columns, values),
+                "rows": [[r[c] for c in columns] for r in values],
+            }
+        if _class_courses is not None:
+            pairs = _membership_rows(_class_courses)
+            tables["class_courses"] = {
+                "fingerprint": _fingerprint(_MEMBERSHIP_COLUMNS, pairs),
+                "rows": [[p["class_id"], p["course_id"]] for p in pairs],
+            }
+    if not tables:
+        return []
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "database": _database_key(), "tables": tables}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return sorted(tables)
+
+
+def warm_start(path=None):
+    """
+    Recharge depuis le fichier d'instantané les tables dont l'empreinte est
+    identique à celle de la base (une requête), si elles ne sont pas déjà en
+    mémoire. Retourne les tables chargées ; [] si le fichier est absent,
+    d'une autre version ou d'une autre base.
+    """
+    global _class_courses
+    path = _snapshot_path(path)
+    changes = _changes
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("database") != _database_key():
+        return []
+    current = _db_fingerprints()
+    loaded = []
+    with _lock:
+        if _changes != changes:
+            return []
+        for table, entry in snapshot.get("tables", {}).items():
+            if current.get(table) != entry.get("fingerprint"):
+                continue
+            if table == "class_courses":
+                if _class_courses is None:
+                    membership = {}
+                    for class_id, course_id in entry["rows"]:
+                        membership.setdefault(class_id, set()).add(course_id)
+                    _class_courses = membership
+                    loaded.append(table)
+            elif table in _COLUMNS and _rows[table] is None:
+                columns = _COLUMNS[table]
+                _rows[table] = {values[0]: dict(zip(columns, values)) for values in entry["rows"]}
+                _stale_ids[table].clear()
+                loaded.append(table)
+    return loaded
@@ -0,0 +1,585 @@
+"""
+Réplique locale (SQLite) des tables lues par l'application, pour les sites
+dont le lien avec le serveur MySQL central est instable.
+
+- Synchronisation par delta : un tour lit table_versions (une requête) et ne
+  relit que les tables dont le compteur a bougé : lignes dont updated_at est
+  postérieur au jeton précédent et lignes notées dans deleted_rows (voir
+  change_tracking.py). class_courses, sans colonne de suivi, est recopiée
+  entière quand son compteur change. Un thread (start) synchronise toutes les
+  APP_CONFIG["replica_sync_ms"] ms.
+- Lectures : db.execute_query envoie à la réplique les SELECT qui ne lisent
+  que des tables répliquées, hors connexion ou toujours selon
+  APP_CONFIG["replica_reads"] ("offline" ou "always"). En mode "always", une
+  écriture publiée sur change_events marque la table à resynchroniser avant
+  la lecture suivante : on relit toujours ses propres écritures.
+- Écritures hors connexion : les modifications de lignes existantes
+  (étudiants, enseignants, cours, classes) et la saisie des notes sont
+  appliquées à la réplique et mises en file (pending_writes), avec la valeur
+  d'updated_at de la ligne au moment de la modification. Au retour du
+  serveur, la file est rejouée dans l'ordre : une ligne modifiée ou supprimée
+  entre-temps sur le serveur est un conflit, le serveur l'emporte et la
+  modification locale est gardée dans replica_conflicts. Les créations et
+  suppressions (ids attribués par le serveur, cascades) restent indisponibles
+  hors connexion.
+
+Les comptes utilisateurs ne sont pas répliqués : la connexion à
+l'application demande le serveur.
+
+Usage:
+  python replica.py sync          # synchronise (rejoue d'abord la file)
+  python replica.py status        # état, file d'attente, conflits
+  python replica.py conflicts     # détail des conflits
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from change_events import publish, subscribe
+from change_tracking import bump_versions, current_token
+from config import APP_CONFIG, DB_CONFIG
+from db import get_connection
+from grade_aggregates import ABSENT, apply_changes, current_grades
+
+
+log = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+# Colonnes répliquées (id en premier)
+_COLUMNS = {
+    "students": ("id", "matricule", "first_name", "last_name", "email", "phone", "created_at", "updated_at"),
+    "teachers": ("id", "first_name", "last_name", "email", "phone", "department", "created_at", "updated_at"),
+    "courses": ("id", "code", "name", "credits", "teacher_id", "created_at", "updated_at"),
+    "classes": ("id", "name", "academic_year", "semester", "created_at", "updated_at"),
+    "class_courses": ("id", "class_id", "course_id", "created_at"),
+    "enrollments": ("id", "student_id", "class_id", "academic_year", "semester", "created_at", "updated_at"),
+    "grades": ("id", "enrollment_id", "course_id", "grade", "created_at", "updated_at"),
+}
+_LOCAL_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_students_matricule ON students (matricule)",
+    "CREATE INDEX IF NOT EXISTS idx_students_name ON students (last_name, first_name)",
+    "CREATE INDEX IF NOT EXISTS idx_courses_code ON courses (code)",
+    "CREATE INDEX IF NOT EXISTS idx_class_courses_class ON class_courses (class_id)",
+    "CREATE INDEX IF NOT EXISTS idx_enrollments_student ON enrollments (student_id)",
+    "CREATE INDEX IF NOT EXISTS idx_enrollments_class ON enrollments (class_id, academic_year)",
+    "CREATE INDEX IF NOT EXISTS idx_grades_enrollment ON grades (enrollment_id, course_id)",
+    "CREATE INDEX IF NOT EXISTS idx_grades_course ON grades (course_id)",
+)
+# Colonnes modifiables hors connexion, par table
+_OFFLINE_UPDATES = {
+    "students": {"matricule", "first_name", "last_name", "email", "phone"},
+    "teachers": {"first_name", "last_name", "email", "phone", "department"},
+    "courses": {"code", "name", "credits", "teacher_id"},
+    "classes": {"name", "academic_year", "semester"},
+}
+
+_TABLE_RE = re.compile(r"\b(?:FROM|JOIN)\s+`?(\w+)", re.IGNORECASE)
+_PARAM_RE = re.compile(r"%\((\w+)\)s|%s")
+_LIKE_RE = re.compile(r"\bLIKE\s+\?", re.IGNORECASE)
+
+_lock = threading.RLock()  # protège la connexion SQLite et l'état ci-dessous
+_sync_lock = threading.Lock()  # une seule synchronisation (et un seul rejeu de la file) à la fois
+_conn = None
+_ready = False
+_offline = False
+_dirty = set()  # tables écrites depuis la dernière synchronisation
+_stop = threading.Event()
+_thread = None
+
+
+class OfflineError(RuntimeError):
+    """Opération qui demande le serveur, tenté hors connexion."""
+
+
+def _on_change(table, _ids):
+    if table in _COLUMNS:
+        with _lock:
+            _dirty.add(table)
+
+
+subscribe(_on_change)
+
+
+# --- Base locale
+
+
+def _concat(*args):
+    return None if any(a is None for a in args) else "".join(str(a) for a in args)
+
+
+def _concat_ws(sep, *args):
+    return None if sep is None else str(sep).join(str(a) for a in args if a is not None)
+
+
+def _local():
+    """Connexion SQLite (créée au premier appel, schéma compris). À utiliser sous _lock."""
+    global _conn
+    if _conn is None:
+        path = APP_CONFIG["replica_path"]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Fonctions MySQL utilisées par les requêtes des modèles
+        conn.create_function("CONCAT", -1, _concat, deterministic=True)
+        conn.create_function("CONCAT_WS", -1, _concat_ws, deterministic=True)
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS replica_state (key TEXT PRIMARY KEY, value TEXT)")
+            state = _state(conn)
+            if state.get("schema") != SCHEMA_VERSION or state.get("database") != _database_key():
+                # Autre version ou autre serveur : on repart d'une réplique vide
+                for table in (*_COLUMNS, "pending_writes", "replica_conflicts"):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute("DELETE FROM replica_state")
+                _set_state(conn, schema=SCHEMA_VERSION, database=_database_key(), tokens={}, versions={})
+            for table, columns in _COLUMNS.items():
+                cols = ", ".join(f"{c} INTEGER PRIMARY KEY" if c == "id" else c for c in columns)
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({cols})")
+            for statement in _LOCAL_INDEXES:
+                conn.execute(statement)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pending_writes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    base TEXT,
+                    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS replica_conflicts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    reason TEXT NOT NULL,
+                    server_row TEXT,
+                    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+        _conn = conn
+    return _conn
+
+
+def _database_key():
+    return f"{DB_CONFIG['host']}/{DB_CONFIG['database']}"
+
+
+def _state(conn):
+    return {r["key"]: json.loads(r["value"]) for r in conn.execute("SELECT key, value FROM replica_state")}
+
+
+def _set_state(conn, **values):
+    conn.executemany(
+        "INSERT OR REPLACE INTO replica_state (key, value) VALUES (?, ?)",
+        [(k, json.dumps(v)) for k, v in values.items()],
+    )
+
+
+def _to_local(value):
+    """Valeur MySQL -> valeur SQLite (dates en texte ISO, décimaux en float)."""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="microseconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+# --- État de la connexion
+
+
+def is_offline():
+    return _offline
+
+
+def set_offline(error=None):
+    """Passe hors connexion (appelé sur un échec de connexion au serveur)."""
+    global _offline
+    if not _offline:
+        log.warning("Serveur injoignable, passage hors connexion : %s", error)
+    _offline = True
+
+
+def is_ready():
+    """True si chaque table a été copiée au moins une fois."""
+    global _ready
+    if not _ready:
+        with _lock:
+            _ready = _state(_local()).get("tokens", {}).keys() >= _COLUMNS.keys()
+    return _ready
+
+
+def serves(query):
+    """True si la lecture query doit être servie par la réplique."""
+    if APP_CONFIG["replica_reads"] != "always" and not _offline:
+        return False
+    if not query.lstrip().upper().startswith("SELECT"):
+        return False
+    tables = {t.lower() for t in _TABLE_RE.findall(query)}
+    return bool(tables) and tables <= _COLUMNS.keys() and is_ready()
+
+
+# --- Lectures
+
+
+def _translate(query, params):
+    """Requête MySQL (marqueurs %s ou %(nom)s) -> requête SQLite."""
+    sql = _PARAM_RE.sub(lambda m: f":{m.group(1)}" if m.group(1) else "?", query)
+    if params:
+        sql = sql.replace("%%", "%")
+    # MySQL échappe les jokers de LIKE par \ sans clause ESCAPE (db.like_prefix)
+    return _LIKE_RE.sub(r"LIKE ? ESCAPE '\\'", sql)
+
+
+def query(sql, params=None, fetchone=False, fetchall=False):
+    """Exécute une lecture sur la réplique (mêmes arguments et résultats que db.execute_query)."""
+    if _dirty and not _offline:
+        try:
+            sync(tables=set(_dirty))
+        except OfflineError:
+            pass
+    with _lock:
+        cursor = _local().execute(_translate(sql, params), params or ())
+        if fetchone:
+            row = cursor.fetchone()
+            return dict(row) if row is not None else None
+        if fetchall:
+            return [dict(r) for r in cursor.fetchall()]
+        return None
+
+
+# --- Synchronisation
+
+
+def _server():
+    """Connexion au serveur ; passe hors connexion et lève OfflineError en cas d'échec."""
+    global _offline
+    try:
+        conn = get_connection()
+    except RuntimeError as e:
+        set_offline(e)
+        raise OfflineError(str(e)) from e
+    if _offline:
+        log.info("Serveur de nouveau joignable.")
+    _offline = False
+    return conn
+
+
+def _replace_rows(conn, table, rows):
+    columns = _COLUMNS[table]
+    placeholders = ", ".join(["?"] * len(columns))
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+        [tuple(_to_local(r[c]) for c in columns) for r in rows],
+    )
+
+
+def sync(tables=None):
+    """
+    Rejoue la file d'écritures puis ramène la réplique à l'état du serveur
+    pour les tables dont le compteur de version a changé (toutes si tables
+    est None, sinon celles-ci). Retourne {"tables": {table: lignes reçues},
+    "replayed": n, "conflicts": n}. Lève OfflineError si le serveur est injoignable.
+    """
+    with _sync_lock:
+        return _sync(tables)
+
+
+def _sync(tables):
+    server = _server()
+    try:
+        replayed = _replay(server)
+        cursor = server.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT table_name, version FROM table_versions")
+            versions = {r["table_name"]: r["version"] for r in cursor.fetchall()}
+            token = _to_local(current_token(cursor))
+            with _lock:
+                conn = _local()
+                state = _state(conn)
+                known_versions, tokens = state.get("versions", {}), state.get("tokens", {})
+                wanted = set(_COLUMNS) if tables is None else set(tables) & _COLUMNS.keys()
+                # Les tables marquées sont relues même si table_versions n'a pas encore bougé
+                todo = [
+                    t for t in _COLUMNS
+                    if t in wanted and (t not in tokens or t in _dirty or versions.get(t) != known_versions.get(t))
+                ]
+                _dirty.difference_update(wanted)
+            received = {}
+            for table in todo:
+                received[table] = _sync_table(cursor, table, tokens.get(table), token)
+                with _lock:
+                    tokens[table] = token
+                    known_versions[table] = versions.get(table)
+                    with _local() as conn:
+                        _set_state(conn, tokens=tokens, versions=known_versions)
+        finally:
+            cursor.close()
+    finally:
+        server.close()
+    return {"tables": received, "replayed": replayed["applied"], "conflicts": replayed["conflicts"]}
+
+
+def _sync_table(cursor, table, since, token):
+    """Applique à la réplique le delta de table depuis since (tout si since est None)."""
+    columns = ", ".join(_COLUMNS[table])
+    full = since is None or "updated_at" not in _COLUMNS[table]
+    if full:
+        cursor.execute(f"SELECT {columns} FROM {table}")
+        rows, deletes = cursor.fetchall(), []
+    else:
+        cursor.execute(f"SELECT {columns} FROM {table} WHERE updated_at >= %s", (since,))
+        rows = cursor.fetchall()
+        cursor.execute(
+            "SELECT DISTINCT row_id FROM deleted_rows WHERE table_name = %s AND deleted_at >= %s",
+            (table, since),
+        )
+        seen = {r["id"] for r in rows}
+        deletes = [(r["row_id"],) for r in cursor.fetchall() if r["row_id"] not in seen]
+    with _lock:
+        with _local() as conn:
+            if full:
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany(f"DELETE FROM {table} WHERE id = ?", deletes)
+            _replace_rows(conn, table, rows)
+            if table == "grades":
+                # Notes saisies hors connexion (ids provisoires négatifs) : remplacées par celles du serveur
+                conn.execute(
+                    "DELETE FROM grades WHERE id < 0 AND NOT EXISTS (SELECT 1 FROM pending_writes WHERE kind = 'grade')"
+                )
+    return len(rows) + len(deletes)
+
+
+def _sync_loop(interval):
+    while not _stop.wait(interval):
+        was_offline = _offline
+        try:
+            result = sync()
+        except OfflineError:
+            continue
+        except Exception:
+            log.exception("Synchronisation de la réplique impossible")
+            continue
+        if result["conflicts"]:
+            log.warning("%d conflit(s) à la reprise de connexion (python replica.py conflicts)", result["conflicts"])
+        if was_offline:
+            # Reprise : tout ce qui a été lu hors connexion est à relire
+            for table in _COLUMNS:
+                publish(table)
+
+
+def start():
+    """Lance la synchronisation périodique en arrière-plan (sans effet si elle tourne déjà)."""
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(
+        target=_sync_loop, args=(APP_CONFIG["replica_sync_ms"] / 1000,), name="replica-sync", daemon=True
+    )
+    _thread.start()
+
+
+def stop():
+    _stop.set()
+
+
+# --- Écritures hors connexion
+
+
+def _queue(conn, kind, table, row_key, payload, base):
+    """Ajoute une écriture à la file, fusionnée avec celle déjà en attente pour la même ligne."""
+    existing = conn.execute(
+        "SELECT id, payload FROM pending_writes WHERE kind = ? AND table_name = ? AND row_key = ?",
+        (kind, table, row_key),
+    ).fetchone()
+    if existing is None:
+        conn.execute(
+            "INSERT INTO pending_writes (kind, table_name, row_key, payload, base) VALUES (?, ?, ?, ?, ?)",
+            (kind, table, row_key, json.dumps(payload), base),
+        )
+    else:
+        # La ligne de base reste celle vue avant la première modification
+        merged = {**json.loads(existing["payload"]), **payload}
+        conn.execute("UPDATE pending_writes SET payload = ? WHERE id = ?", (json.dumps(merged), existing["id"]))
+
+
+def queue_update(table, row_id, values):
+    """Modifie une ligne existante hors connexion (réplique + file). Lève OfflineError si impossible."""
+    allowed = _OFFLINE_UPDATES.get(table, set())
+    if not values.keys() <= allowed:
+        raise OfflineError(f"Modification de {table} indisponible hors connexion.")
+    with _lock:
+        with _local() as conn:
+            row = conn.execute(f"SELECT updated_at FROM {table} WHERE id = ?", (row_id,)).fetchone()
+            if row is None:
+                raise OfflineError("Ligne absente de la réplique locale : modification impossible hors connexion.")
+            assignments = ", ".join(f"{c} = ?" for c in values)
+            conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", (*values.values(), row_id))
+            _queue(conn, "update", table, str(row_id), values, row["updated_at"])
+
+
+def queue_grade(enrollment_id, course_id, grade):
+    """Saisit une note hors connexion (réplique + file). Retourne l'id local de la note."""
+    with _lock:
+        with _local() as conn:
+            row = conn.execute(
+                "SELECT id, updated_at FROM grades WHERE enrollment_id = ? AND course_id = ?",
+                (enrollment_id, course_id),
+            ).fetchone()
+            if row is None:
+                grade_id = min(conn.execute("SELECT MIN(id) FROM grades").fetchone()[0] or 0, 0) - 1
+                conn.execute(
+                    "INSERT INTO grades (id, enrollment_id, course_id, grade) VALUES (?, ?, ?, ?)",
+                    (grade_id, enrollment_id, course_id, grade),
+                )
+                base = None
+            else:
+                grade_id, base = row["id"], row["updated_at"]
+                conn.execute("UPDATE grades SET grade = ? WHERE id = ?", (grade, grade_id))
+            _queue(conn, "grade", "grades", f"{enrollment_id}:{course_id}", {"grade": grade}, base)
+    return grade_id
+
+
+def pending_count():
+    with _lock:
+        return _local().execute("SELECT COUNT(*) FROM pending_writes").fetchone()[0]
+
+
+def conflicts():
+    """Conflits enregistrés à la reprise de connexion, du plus récent au plus ancien."""
+    with _lock:
+        rows = _local().execute("SELECT * FROM replica_conflicts ORDER BY id DESC").fetchall()
+    return [dict(r) for r in rows]
+
+
+def _replay(server):
+    """Rejoue la file sur le serveur, une transaction par écriture. Retourne {"applied", "conflicts"}."""
+    with _lock:
+        ops = [dict(r) for r in _local().execute("SELECT * FROM pending_writes ORDER BY id")]
+    applied = failed = 0
+    for op in ops:
+        payload = json.loads(op["payload"])
+        cursor = server.cursor(dictionary=True)
+        try:
+            if op["kind"] == "update":
+                reason, server_row = _replay_update(cursor, op["table_name"], int(op["row_key"]), payload, op["base"])
+            else:
+                enrollment_id, course_id = (int(x) for x in op["row_key"].split(":"))
+                reason, server_row = _replay_grade(cursor, enrollment_id, course_id, payload["grade"], op["base"])
+            if reason is None:
+                bump_versions(cursor, op["table_name"])
+                server.commit()
+            else:
+                server.rollback()
+        except Exception as e:
+            # Contrainte violée (matricule en double, inscription supprimée...) : conflit
+            server.rollback()
+            reason, server_row = f"refusée par le serveur : {e}", None
+        finally:
+            cursor.close()
+        with _lock:
+            with _local() as conn:
+                conn.execute("DELETE FROM pending_writes WHERE id = ?", (op["id"],))
+                if reason is not None:
+                    conn.execute(
+                        "INSERT INTO replica_conflicts (kind, table_name, row_key, payload, reason, server_row)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (op["kind"], op["table_name"], op["row_key"], op["payload"], reason,
+                         json.dumps({k: _to_local(v) for k, v in server_row.items()}) if server_row else None),
+                    )
+                _dirty.add(op["table_name"])
+        if reason is None:
+            applied += 1
+        else:
+            failed += 1
+            log.warning("Conflit sur %s %s : %s", op["table_name"], op["row_key"], reason)
+    if ops:
+        with _lock:
+            # Les lignes en conflit reprennent la valeur du serveur à la synchronisation qui suit
+            _dirty.update(op["table_name"] for op in ops)
+    return {"applied": applied, "conflicts": failed}
+
+
+def _replay_update(cursor, table, row_id, values, base):
+    cursor.execute(f"SELECT * FROM {table} WHERE id = %s FOR UPDATE", (row_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return "ligne supprimée sur le serveur", None
+    if _to_local(row["updated_at"]) != base:
+        return "ligne modifiée sur le serveur entre-temps", row
+    assignments = ", ".join(f"{c} = %s" for c in values)
+    cursor.execute(f"UPDATE {table} SET {assignments} WHERE id = %s", (*values.values(), row_id))
+    return None, None
+
+
+def _replay_grade(cursor, enrollment_id, course_id, grade, base):
+    current = current_grades(cursor, course_id, [enrollment_id])
+    cursor.execute(
+        "SELECT * FROM grades WHERE enrollment_id = %s AND course_id = %s FOR UPDATE", (enrollment_id, course_id)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        if base is not None:
+            return "note supprimée sur le serveur", None
+        cursor.execute(
+            "INSERT INTO grades (enrollment_id, course_id, grade) VALUES (%s, %s, %s)", (enrollment_id, course_id, grade)
+        )
+        apply_changes(cursor, [(enrollment_id, course_id, current[enrollment_id][0], ABSENT, grade)])
+        return None, None
+    if base is None or _to_local(row["updated_at"]) != base:
+        if _to_local(row["grade"]) == grade:
+            return None, None  # même note saisie des deux côtés
+        return "note saisie ou modifiée sur le serveur entre-temps", row
+    cursor.execute("UPDATE grades SET grade = %s WHERE id = %s", (grade, row["id"]))
+    apply_changes(cursor, [(enrollment_id, course_id, current[enrollment_id][0], row["grade"], grade)])
+    return None, None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=("sync", "status", "conflicts"))
+    args = parser.parse_args()
+    if args.command == "sync":
+        try:
+            result = sync()
+        except OfflineError as e:
+            print(f"Serveur injoignable : {e}")
+            return 1
+        received = ", ".join(f"{t} {n}" for t, n in result["tables"].items()) or "aucune table modifiée"
+        print(f"Synchronisé ({received}) ; {result['replayed']} écriture(s) rejouée(s), {result['conflicts']} conflit(s).")
+    elif args.command == "status":
+        with _lock:
+            state = _state(_local())
+        print(f"Réplique : {APP_CONFIG['replica_path']} ({state.get('database')})")
+        for table in _COLUMNS:
+            print(f"  {table} : jeton {state.get('tokens', {}).get(table) or '—'}")
+        print(f"Écritures en attente : {pending_count()} ; conflits : {len(conflicts())}")
+    else:
+        for c in conflicts():
+            print(f"[{c['created_at']}] {c['table_name']} {c['row_key']} : {c['reason']}")
+            print(f"    local   : {c['payload']}")
+            print(f"    serveur : {c['server_row'] or '—'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
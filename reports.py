@@ -0,0 +1,38 @@
+"""
+Génération des documents imprimables (bulletins HTML).
+Chargé à la première impression seulement.
+"""
+
+import os
+import tempfile
+import webbrowser
+
+
+def render_bulletin_html(student: dict, rows: list, year: str, sem: str) -> str:
+    """Retourne le bulletin d'un étudiant (année + semestre) au format HTML."""
+    html = f"""
+<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Bulletin - {student.get('last_name','')}</title>
+<style>body{{ font-family: Segoe UI, sans-serif; margin: 24px; }} table{{ border-collapse: collapse; width:100%; }} th,td{{ border:1px solid #333; padding:8px; text-align:left; }} th{{ background:#2563eb; color:white; }}</style></head>
+<body>
+<h1>Bulletin de notes</h1>
+<p><strong>Matricule:</strong> {student.get('matricule','')} &nbsp; <strong>Nom:</strong> {student.get('last_name','')} {student.get('first_name','')}</p>
+<p><strong>Année:</strong> {year} &nbsp; <strong>Semestre:</strong> {sem}</p>
+<table>
+<tr><th>Classe</th><th>Cours</th><th>Code</th><th>Note</th></tr>
+"""
+    for r in rows:
+        g = r.get("grade")
+        grade_str = str(g) if g is not None else "-"
+        html += f"<tr><td>{r.get('class_name','')}</td><td>{r.get('course_name','')}</td><td>{r.get('course_code','')}</td><td>{grade_str}</td></tr>\n"
+    html += "</table><p><em>Document généré par l'application Gestion université.</em></p></body></html>"
+    return html
+
+
+def open_bulletin_in_browser(student: dict, rows: list, year: str, sem: str) -> str:
+    """Écrit le bulletin dans un fichier temporaire et l'ouvre dans le navigateur. Retourne le chemin."""
+    path = os.path.join(tempfile.gettempdir(), "bulletin.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render_bulletin_html(student, rows, year, sem))
+    webbrowser.open("file://" + path)
+    return path
@@ -0,0 +1,278 @@
+"""
+Passage d'année : reconduction des classes et promotion des étudiants.
+
+Pour une année source (ex. 2024-2025) et une année cible (2025-2026 par défaut) :
+  1. chaque classe de l'année source est recréée dans l'année cible (même nom,
+     même semestre) avec ses cours (class_courses) ;
+  2. chaque étudiant dont la moyenne annuelle pondérée par les crédits, dans
+     une classe, atteint le seuil est inscrit dans la classe de niveau
+     supérieur de l'année cible, pour chaque semestre suivi. Le niveau
+     supérieur s'obtient en incrémentant le premier nombre du nom
+     (« IG 1 - G2 » → « IG 2 - G2 ») ou via une table de correspondance.
+     Sans classe de niveau supérieur, l'étudiant est compté comme diplômé.
+
+Tout est fait par quelques INSERT ... SELECT ensemblistes, à partir d'une
+table temporaire de correspondance, dans une seule transaction. En simulation
+(apply=False), la transaction est annulée : les compteurs sont exacts mais
+rien n'est écrit.
+
+Usage:
+  python rollover.py 2024-2025                 # aperçu
+  python rollover.py 2024-2025 --threshold 12 --apply
+  python rollover.py 2024-2025 --map "Master 2=Diplômés" --apply
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+
+from change_events import publish
+from change_tracking import bump_versions
+from config import APP_CONFIG
+from db import transaction
+
+
+PASS_THRESHOLD = APP_CONFIG["pass_threshold"]
+_LEVEL_RE = re.compile(r"\d+")
+
+
+def next_academic_year(academic_year: str) -> str:
+    """« 2024-2025 » → « 2025-2026 ». Lève ValueError si le format n'est pas reconnu."""
+    m = re.fullmatch(r"\s*(\d{4})\s*-\s*(\d{4})\s*", academic_year or "")
+    if not m:
+        raise ValueError(f"Année académique invalide : {academic_year!r} (attendu AAAA-AAAA).")
+    start, end = int(m.group(1)) + 1, int(m.group(2)) + 1
+    return f"{start}-{end}"
+
+
+def next_level_name(name: str) -> str | None:
+    """Nom de la classe de niveau supérieur (premier nombre incrémenté), None si le nom n'en contient pas."""
+    m = _LEVEL_RE.search(name)
+    if not m:
+        return None
+    return f"{name[:m.start()]}{int(m.group()) + 1}{name[m.end():]}"
+
+
+def rollover(source_year, target_year=None, threshold=PASS_THRESHOLD, name_map=None, apply=False):
+    """
+    Reconduit les classes de source_year dans target_year et y inscrit les
+    étudiants admis (moyenne >= threshold). name_map : {nom source: nom du
+    niveau supérieur} prioritaire sur la règle par défaut (valeur vide : pas
+    de promotion). Retourne un dict de compteurs et le détail par classe
+    ("classes"). apply=False : simulation, rien n'est écrit.
+    """
+    source_year = source_year.strip()
+    target_year = (target_year or next_academic_year(source_year)).strip()
+    if target_year == source_year:
+        raise ValueError("L'année cible doit être différente de l'année source.")
+    name_map = dict(name_map or {})
+
+    with transaction(commit=apply) as cursor:
+        cursor.execute(
+            "SELECT id, name, semester FROM classes WHERE academic_year = %s ORDER BY name, semester",
+            (source_year,),
+        )
+        sources = cursor.fetchall()
+        if not sources:
+            raise ValueError(f"Aucune classe pour l'année {source_year}.")
+
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS rollover_map")
+        cursor.execute(
+            """
+            CREATE TEMPORARY TABLE rollover_map (
+                source_id INT PRIMARY KEY,
+                source_name VARCHAR(100) NOT NULL,
+                target_name VARCHAR(100),
+                semester ENUM('S1', 'S2') NOT NULL,
+                clone_id INT,
+                promote_id INT
+            )
+            """
+        )
+        rows = []
+        for cl in sources:
+            target = name_map[cl["name"]] if cl["name"] in name_map else next_level_name(cl["name"])
+            rows.append((cl["id"], cl["name"], (target or "").strip() or None, cl["semester"]))
+        cursor.executemany(
+            "INSERT INTO rollover_map (source_id, source_name, target_name, semester) VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+
+        # 1. Classes et cours de l'année cible
+        cursor.execute(
+            """
+            INSERT IGNORE INTO classes (name, academic_year, semester)
+            SELECT m.source_name, %s, m.semester FROM rollover_map m
+            """,
+            (target_year,),
+        )
+        classes_created = cursor.rowcount
+        cursor.execute(
+            """
+            UPDATE rollover_map m
+            JOIN classes t ON t.name = m.source_name AND t.academic_year = %s AND t.semester = m.semester
+            SET m.clone_id = t.id
+            """,
+            (target_year,),
+        )
+        cursor.execute(
+            """
+            INSERT IGNORE INTO class_courses (class_id, course_id)
+            SELECT m.clone_id, cc.course_id
+            FROM rollover_map m
+            JOIN class_courses cc ON cc.class_id = m.source_id
+            """
+        )
+        courses_copied = cursor.rowcount
+        # Classe de niveau supérieur : reconduite ci-dessus ou déjà créée à la main.
+        cursor.execute(
+            """
+            UPDATE rollover_map m
+            JOIN classes t ON t.name = m.target_name AND t.academic_year = %s AND t.semester = m.semester
+            SET m.promote_id = t.id
+            """,
+            (target_year,),
+        )
+
+        # 2. Moyennes annuelles par étudiant et par classe (tous semestres confondus)
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS rollover_avg")
+        cursor.execute(
+            """
+            CREATE TEMPORARY TABLE rollover_avg (
+                student_id INT NOT NULL,
+                class_name VARCHAR(100) NOT NULL,
+                average DECIMAL(6,3),
+                PRIMARY KEY (student_id, class_name)
+            )
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO rollover_avg (student_id, class_name, average)
+            SELECT e.student_id, c.name, SUM(g.grade * co.credits) / NULLIF(SUM(co.credits), 0)
+            FROM enrollments e
+            JOIN classes c ON c.id = e.class_id
+            JOIN grades g ON g.enrollment_id = e.id AND g.grade IS NOT NULL
+            JOIN courses co ON co.id = g.course_id
+            WHERE c.academic_year = %s
+            GROUP BY e.student_id, c.name
+            """,
+            (source_year,),
+        )
+
+        cursor.execute(
+            """
+            INSERT IGNORE INTO enrollments (student_id, class_id, academic_year, semester)
+            SELECT DISTINCT e.student_id, m.promote_id, %s, m.semester
+            FROM enrollments e
+            JOIN rollover_map m ON m.source_id = e.class_id
+            JOIN rollover_avg a ON a.student_id = e.student_id AND a.class_name = m.source_name
+            WHERE m.promote_id IS NOT NULL AND a.average >= %s
+            """,
+            (target_year, threshold),
+        )
+        enrollments_created = cursor.rowcount
+
+        # Détail par classe source (une ligne par classe et semestre)
+        cursor.execute(
+            """
+            SELECT m.source_name, m.semester, m.target_name, m.promote_id IS NOT NULL AS has_target,
+                   COUNT(DISTINCT e.student_id) AS students,
+                   COUNT(DISTINCT CASE WHEN a.average >= %s THEN e.student_id END) AS passing,
+                   COUNT(DISTINCT CASE WHEN a.average < %s THEN e.student_id END) AS failing,
+                   COUNT(DISTINCT CASE WHEN e.student_id IS NOT NULL AND a.average IS NULL
+                                       THEN e.student_id END) AS no_grade
+            FROM rollover_map m
+            LEFT JOIN enrollments e ON e.class_id = m.source_id
+            LEFT JOIN rollover_avg a ON a.student_id = e.student_id AND a.class_name = m.source_name
+            GROUP BY m.source_id, m.source_name, m.semester, m.target_name, m.promote_id
+            ORDER BY m.source_name, m.semester
+            """,
+            (threshold, threshold),
+        )
+        detail = cursor.fetchall()
+
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS rollover_avg")
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS rollover_map")
+        if apply:
+            bump_versions(cursor, "classes", "class_courses", "enrollments")
+
+    promotions = sum(int(r["passing"]) for r in detail if r["has_target"])
+    result = {
+        "source_year": source_year,
+        "target_year": target_year,
+        "threshold": threshold,
+        "applied": apply,
+        "classes_source": len(sources),
+        "classes_created": classes_created,
+        "courses_copied": courses_copied,
+        "students": sum(int(r["students"]) for r in detail),
+        "passing": sum(int(r["passing"]) for r in detail),
+        "failing": sum(int(r["failing"]) for r in detail),
+        "no_grade": sum(int(r["no_grade"]) for r in detail),
+        "graduating": sum(int(r["passing"]) for r in detail if not r["has_target"]),
+        "enrollments_created": enrollments_created,
+        "enrollments_already": max(promotions - enrollments_created, 0),
+        "classes": detail,
+    }
+    if apply:
+        publish("classes")
+        publish("class_courses")
+        publish("enrollments")
+    return result
+
+
+def summary(result) -> str:
+    """Résumé lisible d'un passage d'année (aperçu ou appliqué). Les effectifs sont comptés par classe et semestre."""
+    verb = "Passage d'année effectué" if result["applied"] else "Aperçu du passage d'année"
+    lines = [
+        f"{verb} : {result['source_year']} → {result['target_year']} (seuil {result['threshold']:g}/20)",
+        f"Classes : {result['classes_source']} reconduite(s), dont {result['classes_created']} à créer"
+        f" ; {result['courses_copied']} attribution(s) de cours à copier.",
+        f"Étudiants (par classe et semestre) : {result['students']} ; admis {result['passing']},"
+        f" ajournés {result['failing']}, sans note {result['no_grade']}, diplômés {result['graduating']}.",
+        f"Inscriptions dans l'année cible : {result['enrollments_created']} nouvelle(s),"
+        f" {result['enrollments_already']} déjà existante(s).",
+    ]
+    for r in result["classes"]:
+        target = r["target_name"] if r["has_target"] else f"{r['target_name'] or '—'} (absente : diplômés)"
+        lines.append(
+            f"  {r['source_name']} {r['semester']} → {target} : "
+            f"{r['passing']}/{r['students']} admis"
+        )
+    return "\n".join(lines)
+
+
+def _parse_map(values):
+    mapping = {}
+    for value in values or []:
+        if "=" not in value:
+            raise argparse.ArgumentTypeError(f"Correspondance invalide : {value!r} (attendu « source=cible »).")
+        source, target = value.split("=", 1)
+        mapping[source.strip()] = target.strip()
+    return mapping
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source_year", help="Année académique source (ex. 2024-2025).")
+    parser.add_argument("--target-year", help="Année cible (par défaut l'année suivante).")
+    parser.add_argument("--threshold", type=float, default=PASS_THRESHOLD, help="Moyenne minimale d'admission.")
+    parser.add_argument(
+        "--map", action="append", metavar="SOURCE=CIBLE",
+        help="Classe de niveau supérieur pour une classe source (répétable ; cible vide : pas de promotion).",
+    )
+    parser.add_argument("--apply", action="store_true", help="Écrit les changements (sinon simple aperçu).")
+    args = parser.parse_args()
+    try:
+        name_map = _parse_map(args.map)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    result = rollover(args.source_year, args.target_year, args.threshold, name_map, apply=args.apply)
+    print(summary(result))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -14,7 +14,9 @@ import random
 import string
 from datetime import datetime
 
+from change_tracking import VERSIONED_TABLES, bump_versions
 from db import get_connection
+from grade_aggregates import rebuild as rebuild_grade_aggregates
 from init_db import verify_tables
 
 
@@ -323,7 +325,9 @@ def main() -> int:
             """,
             grades,
         )
+        bump_versions(cur, *VERSIONED_TABLES)
         conn.commit()
+        rebuild_grade_aggregates()
 
         # Summary
         def count(table: str) -> int:
@@ -0,0 +1,218 @@
+"""
+Lignes d'un ttk.Treeview indexées par id.
+Chaque ligne est insérée avec iid = str(id) (premier élément des valeurs), ce
+qui permet de créer, modifier ou supprimer une ligne en O(1) après une écriture
+au lieu de recharger toute la table. Les valeurs affichées sont conservées côté
+Python (rows) pour éviter de les relire depuis Tk. load_incremental() remplit
+un grand tableau par tranches de temps (after) sans figer l'interface.
+
+make_sortable() trie sur ces valeurs Python avec des clés typées et
+précalculées (collation locale pour le texte), tri multi-colonnes avec
+Maj+clic, et un seul réordonnancement Tk par tri.
+"""
+
+import locale
+import time
+import weakref
+
+
+_by_tree = weakref.WeakKeyDictionary()
+
+
+class TreeRows:
+    def __init__(self, tree, to_values):
+        """to_values(row: dict) -> tuple des valeurs des colonnes, l'id en premier."""
+        self.tree = tree
+        self.to_values = to_values
+        self.rows = {}
+        self.version = 0  # incrémenté à chaque modification (invalide les clés de tri)
+        self._job = None  # tranche de load_incremental en attente (after)
+        _by_tree[tree] = self
+
+    @classmethod
+    def of(cls, tree):
+        """Retourne le TreeRows associé à un Treeview."""
+        return _by_tree[tree]
+
+    @classmethod
+    def adopt(cls, tree):
+        """TreeRows d'un Treeview rempli directement (lit les valeurs une seule fois)."""
+        if tree in _by_tree:
+            return _by_tree[tree]
+        rows = cls(tree, tuple)
+        for iid in tree.get_children(""):
+            rows.rows[iid] = tuple(tree.item(iid, "values"))
+        return rows
+
+    def load(self, rows):
+        """Remplace toutes les lignes."""
+        children = self.tree.get_children("")
+        if children:
+            self.tree.delete(*children)
+        self.rows.clear()
+        self.version += 1
+        for row in rows:
+            self._insert(self.to_values(row), "end")
+
+    def load_incremental(self, rows, slice_ms=15, on_progress=None, on_done=None):
+        """
+        Remplace toutes les lignes en les insérant par tranches de temps via
+        after() : chaque tranche dure au plus slice_ms, puis rend la main à Tk.
+        on_progress(n) est appelé après chaque tranche, on_done(n) à la fin.
+        Un nouvel appel (ou cancel_load) interrompt le chargement en cours.
+        """
+        self.cancel_load()
+        self.load(())
+        rows = iter(rows)
+        count = [0]
+
+        def _step():
+            self._job = None
+            deadline = time.perf_counter() + slice_ms / 1000
+            for row in rows:
+                self._insert(self.to_values(row), "end")
+                count[0] += 1
+                if count[0] % 100 == 0 and time.perf_counter() >= deadline:
+                    if on_progress is not None:
+                        on_progress(count[0])
+                    self._job = self.tree.after(1, _step)
+                    return
+            if on_progress is not None:
+                on_progress(count[0])
+            if on_done is not None:
+                on_done(count[0])
+
+        _step()
+
+    def cancel_load(self):
+        """Interrompt un load_incremental en cours (les lignes déjà insérées restent)."""
+        if self._job is not None:
+            self.tree.after_cancel(self._job)
+            self._job = None
+
+    def upsert(self, row, index="end"):
+        """Met à jour la ligne de même id si elle est affichée, sinon l'insère à `index`."""
+        values = self.to_values(row)
+        iid = str(values[0])
+        if iid in self.rows:
+            self.tree.item(iid, values=values)
+            self.rows[iid] = values
+            self.version += 1
+        else:
+            self._insert(values, index)
+        return iid
+
+    def delete(self, ids):
+        """Supprime les lignes dont l'id est dans ids (ignore celles qui ne sont pas affichées)."""
+        iids = [str(i) for i in ids if str(i) in self.rows]
+        if iids:
+            self.tree.delete(*iids)
+            for iid in iids:
+                del self.rows[iid]
+            self.version += 1
+
+    def patch(self, upserts=(), deletes=()):
+        """Applique un lot de modifications (plusieurs lignes) ; les nouvelles lignes sont ajoutées en tête."""
+        self.delete(deletes)
+        for row in upserts:
+            if row:
+                self.upsert(row, index=0)
+
+    def selected_ids(self):
+        """Ids (int) des lignes sélectionnées."""
+        return [int(iid) for iid in self.tree.selection() if iid in self.rows]
+
+    def reorder(self, iids):
+        """Réordonne toutes les lignes en un seul appel Tk."""
+        self.tree.set_children("", *iids)
+
+    def _insert(self, values, index):
+        iid = str(values[0])
+        self.tree.insert("", index, iid=iid, values=values)
+        self.rows[iid] = values
+        self.version += 1
+
+
+def sort_key(value, kind="str"):
+    """
+    Clé de tri typée d'une valeur affichée. kind : 'str' (collation locale),
+    'int' ou 'float'. Les valeurs vides ou non numériques passent en premier.
+    """
+    if kind in ("int", "float"):
+        try:
+            return (1, float(value))
+        except (TypeError, ValueError):
+            return (0, 0.0)
+    return (1, locale.strxfrm(str(value).casefold()))
+
+
+def make_sortable(tree, columns_with_types=None):
+    """
+    Rend un Treeview triable au clic sur les en-têtes.
+    - columns_with_types : {col_id: 'str'|'int'|'float'} (défaut 'str')
+    - Maj+clic ajoute une colonne au tri (tri multi-colonnes)
+    """
+    columns_with_types = columns_with_types or {}
+    columns = list(tree["columns"])
+    sortable = [c for c in columns if tree.column(c, "width") > 0]
+    titles = {c: tree.heading(c, "text") for c in sortable}
+    state = {"spec": [], "keys": {}}
+
+    def _keys(rows, col):
+        kind = columns_with_types.get(col, "str")
+        cached = state["keys"].get(col)
+        if cached is None or cached[0] != rows.version:
+            idx = columns.index(col)
+            cached = (rows.version, {iid: sort_key(vals[idx], kind) for iid, vals in rows.rows.items()})
+            state["keys"][col] = cached
+        return cached[1]
+
+    def _update_headings():
+        spec = state["spec"]
+        for c in sortable:
+            text = titles[c]
+            for n, (col, desc) in enumerate(spec, start=1):
+                if col == c:
+                    text += " ▼" if desc else " ▲"
+                    if len(spec) > 1:
+                        text += str(n)
+            tree.heading(c, text=text)
+
+    def _sort(col, add):
+        spec = state["spec"]
+        current = dict(spec)
+        if add:
+            if col in current:
+                spec = [(c, not d) if c == col else (c, d) for c, d in spec]
+            else:
+                spec = spec + [(col, False)]
+        elif spec and spec[0][0] == col and len(spec) == 1:
+            spec = [(col, not spec[0][1])]
+        else:
+            spec = [(col, False)]
+        state["spec"] = spec
+        _update_headings()
+        rows = TreeRows.adopt(tree)
+        order = list(rows.rows)
+        # Tris stables successifs, de la clé secondaire à la clé principale
+        for c, desc in reversed(spec):
+            keys = _keys(rows, c)
+            order.sort(key=keys.__getitem__, reverse=desc)
+        rows.reorder(order)
+
+    def _on_click(event):
+        if tree.identify_region(event.x, event.y) != "heading":
+            return None
+        col_ref = tree.identify_column(event.x)
+        try:
+            display = tree["displaycolumns"]
+            display = columns if display in ("#all", ("#all",)) else list(display)
+            col = display[int(col_ref.lstrip("#")) - 1]
+        except (ValueError, IndexError):
+            return None
+        if col in sortable:
+            _sort(col, add=bool(event.state & 0x0001))
+            return "break"
+        return None
+
+    tree.bind("<Button-1>", _on_click, add="+")
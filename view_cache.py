@@ -0,0 +1,69 @@
+"""
+Cache des écrans construits du tableau de bord.
+Les vues sont masquées plutôt que détruites lors d'un changement de menu, dans
+la limite d'un budget LRU (nombre de vues et nombre total de lignes de Treeview).
+Une vue marquée périmée est reconstruite à sa prochaine ouverture.
+"""
+
+from collections import OrderedDict
+from tkinter import ttk
+
+
+class ViewCache:
+    def __init__(self, max_views=6, max_rows=50000):
+        self.max_views = max_views
+        self.max_rows = max_rows
+        self._frames = OrderedDict()
+        self._stale = set()
+
+    def get(self, key):
+        """Retourne la vue en cache (et la marque récemment utilisée), ou None."""
+        frame = self._frames.get(key)
+        if frame is None:
+            return None
+        self._frames.move_to_end(key)
+        return frame
+
+    def put(self, key, frame):
+        """Ajoute une vue puis libère les plus anciennes au-delà du budget (la vue ajoutée est conservée)."""
+        self.discard(key)
+        self._frames[key] = frame
+        self._stale.discard(key)
+        self._enforce_budget(keep=key)
+
+    def is_stale(self, key):
+        return key in self._stale
+
+    def mark_stale(self, keys):
+        """Marque des vues comme périmées : elles seront reconstruites à la prochaine ouverture."""
+        self._stale.update(k for k in keys if k in self._frames)
+
+    def mark_fresh(self, keys):
+        """Retire le marquage périmé (vue déjà mise à jour sur place)."""
+        self._stale.difference_update(keys)
+
+    def discard(self, key):
+        """Détruit une vue en cache."""
+        frame = self._frames.pop(key, None)
+        self._stale.discard(key)
+        if frame is not None:
+            frame.destroy()
+
+    def clear(self):
+        for key in list(self._frames):
+            self.discard(key)
+
+    def _enforce_budget(self, keep):
+        while len(self._frames) > self.max_views or (
+            len(self._frames) > 1 and sum(_row_count(f) for f in self._frames.values()) > self.max_rows
+        ):
+            oldest = next(k for k in self._frames if k != keep)
+            self.discard(oldest)
+
+
+def _row_count(widget):
+    """Nombre de lignes de premier niveau dans les Treeview contenus dans widget (estimation mémoire)."""
+    total = len(widget.get_children("")) if isinstance(widget, ttk.Treeview) else 0
+    for child in widget.winfo_children():
+        total += _row_count(child)
+    return total
@@ -0,0 +1,543 @@
+"""
+Widgets réutilisables pour les grandes listes (milliers d'étudiants, d'inscriptions…).
+
+SearchPicker : champ de saisie avec suggestions. Chaque frappe relance, après
+un court délai, une fonction de recherche du modèle limitée à quelques
+dizaines de lignes ; rien n'est préchargé.
+
+VirtualChecklist : liste à cocher filtrable dessinée sur un Canvas ; seules les
+lignes visibles sont dessinées, la sélection est un set d'ids indépendant.
+
+GradeEntryGrid : saisie des notes d'une classe façon tableur (Treeview + champ
+d'édition superposé), avec suivi local des cellules modifiées.
+"""
+
+from collections import OrderedDict
+import tkinter as tk
+from tkinter import ttk
+
+from background import run_in_background
+from change_events import subscribe, unsubscribe
+from config import APP_CONFIG
+
+
+class SearchPicker(tk.Frame):
+    """
+    Sélecteur à saisie semi-automatique.
+
+    search_func(texte, limit) -> liste de lignes (dict avec "id"), exécutée hors
+    du thread Tk ; format_func(ligne) -> texte affiché. Les derniers résultats
+    sont gardés en cache (vidé si l'une des tables indiquées est modifiée).
+    on_select(ligne) est appelé à chaque choix.
+    """
+
+    def __init__(
+        self,
+        master,
+        search_func,
+        format_func,
+        limit=20,
+        delay_ms=250,
+        min_chars=1,
+        cache_size=32,
+        tables=(),
+        on_select=None,
+        width=40,
+        **kwargs,
+    ):
+        super().__init__(master, bg=kwargs.pop("bg", master.cget("bg")), **kwargs)
+        self.search_func = search_func
+        self.format_func = format_func
+        self.limit = limit
+        self.delay_ms = delay_ms
+        self.min_chars = min_chars
+        self.on_select = on_select
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_stale = False
+        self._tables = set(tables)
+        self._results = []
+        self._selected = None
+        self._after_id = None
+        self._seq = 0
+        self._popup = None
+        self._listbox = None
+
+        fg = APP_CONFIG["text_primary"]
+        self.var = tk.StringVar()
+        self.entry = tk.Entry(self, textvariable=self.var, width=width, bg="#020617", fg=fg, insertbackground=fg)
+        self.entry.pack(fill="x")
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Down>", lambda _e: self._move(1))
+        self.entry.bind("<Up>", lambda _e: self._move(-1))
+        self.entry.bind("<Return>", lambda _e: self._choose_active())
+        self.entry.bind("<Escape>", lambda _e: self._hide())
+        self.entry.bind("<FocusOut>", lambda _e: self.after(150, self._hide_unless_focused))
+        if self._tables:
+            subscribe(self._on_data_changed)
+
+    # --- API
+
+    def get_id(self):
+        """Id de la ligne choisie, ou None."""
+        return self._selected["id"] if self._selected else None
+
+    def get_row(self):
+        """Ligne choisie (dict), ou None."""
+        return self._selected
+
+    def set_row(self, row):
+        """Présélectionne une ligne (ex. édition) sans déclencher de recherche."""
+        self._selected = row
+        self.var.set(self.format_func(row) if row else "")
+        self._hide()
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def destroy(self):
+        if self._tables:
+            unsubscribe(self._on_data_changed)
+        self._cancel_pending()
+        super().destroy()
+
+    # --- Recherche
+
+    def _on_data_changed(self, table, _ids):
+        # Peut être appelé hors du thread Tk : on se contente d'un drapeau.
+        if table in self._tables:
+            self._cache_stale = True
+
+    def _on_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if self._selected and self.var.get() != self.format_func(self._selected):
+            self._selected = None
+        self._cancel_pending()
+        self._after_id = self.after(self.delay_ms, self._search)
+
+    def _cancel_pending(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _search(self):
+        self._after_id = None
+        text = " ".join(self.var.get().split())
+        if len(text) < self.min_chars:
+            self._hide()
+            return
+        if self._cache_stale:
+            self._cache.clear()
+            self._cache_stale = False
+        key = text.casefold()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self._show(self._cache[key])
+            return
+        self._seq += 1
+        seq = self._seq
+
+        def _on_done(rows):
+            rows = rows or []
+            self._cache[key] = rows
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            if seq == self._seq:  # ignore les réponses d'une frappe dépassée
+                self._show(rows)
+
+        run_in_background(self, self.search_func, text, self.limit, on_done=_on_done, on_error=lambda _e: self._hide())
+
+    # --- Liste de suggestions
+
+    def _show(self, rows):
+        self._results = rows
+        if not rows:
+            self._hide()
+            return
+        if self._popup is None:
+            self._popup = tk.Toplevel(self)
+            self._popup.overrideredirect(True)
+            self._listbox = tk.Listbox(
+                self._popup,
+                height=8,
+                bg=APP_CONFIG["card_bg"],
+                fg=APP_CONFIG["text_primary"],
+                selectbackground=APP_CONFIG["accent_color"],
+                activestyle="none",
+                exportselection=False,
+            )
+            self._listbox.pack(fill="both", expand=True)
+            self._listbox.bind("<ButtonPress-1>", self._on_click)
+        self._listbox.delete(0, "end")
+        for row in rows:
+            self._listbox.insert("end", self.format_func(row))
+        self._listbox.configure(height=min(8, len(rows)))
+        self._listbox.selection_clear(0, "end")
+        self._listbox.selection_set(0)
+        self._listbox.activate(0)
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        self._popup.geometry(f"{max(self.entry.winfo_width(), 200)}x{self._listbox.winfo_reqheight()}+{x}+{y}")
+        self._popup.deiconify()
+        self._popup.lift()
+
+    def _hide(self):
+        if self._popup is not None:
+            self._popup.withdraw()
+
+    def _hide_unless_focused(self):
+        try:
+            if not self.winfo_exists():
+                return
+            focus = self.focus_get()
+        except KeyError:
+            focus = None
+        except tk.TclError:
+            return
+        if focus is not self._listbox:
+            self._hide()
+
+    def _move(self, step):
+        if self._popup is None or not self._results or self._popup.state() == "withdrawn":
+            return
+        current = self._listbox.curselection()
+        i = (current[0] if current else -1) + step
+        i = max(0, min(len(self._results) - 1, i))
+        self._listbox.selection_clear(0, "end")
+        self._listbox.selection_set(i)
+        self._listbox.activate(i)
+        self._listbox.see(i)
+        return "break"
+
+    def _on_click(self, event):
+        i = self._listbox.nearest(event.y)
+        self._listbox.selection_clear(0, "end")
+        self._listbox.selection_set(i)
+        return self._choose_active()
+
+    def _choose_active(self):
+        if self._popup is None or not self._results or self._popup.state() == "withdrawn":
+            return
+        current = self._listbox.curselection()
+        row = self._results[current[0] if current else 0]
+        self.set_row(row)
+        self.entry.icursor("end")
+        if self.on_select is not None:
+            self.on_select(row)
+        return "break"
+
+
+class VirtualChecklist(tk.Frame):
+    """
+    Liste à cocher pour des centaines/milliers d'éléments (id, libellé).
+
+    Aucun widget par ligne : le Canvas ne dessine que les lignes visibles à
+    chaque défilement. La saisie dans le champ de filtre restreint la liste
+    (sous-chaîne, sans casse) ; les cases cochées restent dans `selected`
+    même si elles sont masquées par le filtre.
+    """
+
+    ROW_HEIGHT = 22
+
+    def __init__(self, master, items=(), selected=(), height=220, width=320, **kwargs):
+        bg = kwargs.pop("bg", master.cget("bg"))
+        super().__init__(master, bg=bg, **kwargs)
+        self.selected = set(selected)
+        self._items = []
+        self._visible = []
+        fg = APP_CONFIG["text_primary"]
+        secondary = APP_CONFIG["text_secondary"]
+
+        top = tk.Frame(self, bg=bg)
+        top.pack(fill="x", pady=(0, 4))
+        tk.Label(top, text="Filtrer", bg=bg, fg=secondary, font=("Segoe UI", 9)).pack(side="left", padx=(0, 6))
+        self.filter_var = tk.StringVar()
+        tk.Entry(top, textvariable=self.filter_var, width=20, bg="#020617", fg=fg, insertbackground=fg).pack(side="left")
+        self.count_label = tk.Label(top, bg=bg, fg=secondary, font=("Segoe UI", 9))
+        self.count_label.pack(side="right")
+        self.filter_var.trace_add("write", lambda *_: self._apply_filter())
+
+        body = tk.Frame(self, bg=bg)
+        body.pack(fill="both", expand=True)
+        self.canvas = tk.Canvas(
+            body,
+            width=width,
+            height=height,
+            bg="#020617",
+            highlightthickness=0,
+            yscrollincrement=self.ROW_HEIGHT,
+        )
+        vsb = tk.Scrollbar(body, orient="vertical", command=self.canvas.yview)
+        self._vsb = vsb
+        self.canvas.configure(yscrollcommand=self._on_yview)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+        self.canvas.bind("<Configure>", lambda _e: self._update_scrollregion())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda _e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda _e: self.canvas.yview_scroll(1, "units"))
+
+        self.set_items(items)
+
+    def set_items(self, items, selected=None):
+        """Remplace les éléments : itérable de (id, libellé)."""
+        self._items = [(item_id, str(label), str(label).casefold()) for item_id, label in items]
+        if selected is not None:
+            self.selected = set(selected)
+        self._apply_filter()
+
+    def get_selected(self):
+        """Ids cochés (copie)."""
+        return set(self.selected)
+
+    def _apply_filter(self):
+        query = self.filter_var.get().strip().casefold()
+        self._visible = [i for i, (_id, _label, key) in enumerate(self._items) if query in key]
+        self.canvas.yview_moveto(0)
+        self._update_scrollregion()
+
+    def _update_scrollregion(self):
+        height = max(len(self._visible) * self.ROW_HEIGHT, 1)
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), height))
+        self._redraw()
+
+    def _on_yview(self, first, last):
+        self._vsb.set(first, last)
+        self._redraw()
+
+    def _redraw(self):
+        c = self.canvas
+        c.delete("row")
+        self.count_label.config(text=f"{len(self.selected)} sélectionné(s)")
+        if not self._visible:
+            text = "Aucun élément." if not self._items else "Aucun résultat."
+            c.create_text(10, 12, text=text, anchor="w", fill=APP_CONFIG["text_secondary"], font=("Segoe UI", 9), tags="row")
+            return
+        rh = self.ROW_HEIGHT
+        top = c.canvasy(0)
+        first = max(0, int(top // rh))
+        last = min(len(self._visible), int((top + c.winfo_height()) // rh) + 1)
+        fg = APP_CONFIG["text_primary"]
+        accent = APP_CONFIG["accent_color"]
+        for pos in range(first, last):
+            item_id, label, _key = self._items[self._visible[pos]]
+            y = pos * rh
+            checked = item_id in self.selected
+            c.create_rectangle(8, y + 5, 20, y + 17, outline=fg, fill=accent if checked else "", tags="row")
+            if checked:
+                c.create_text(14, y + 11, text="✓", fill="white", font=("Segoe UI", 8, "bold"), tags="row")
+            c.create_text(28, y + 11, text=label, anchor="w", fill=fg, font=("Segoe UI", 9), tags="row")
+
+    def _on_click(self, event):
+        pos = int(self.canvas.canvasy(event.y) // self.ROW_HEIGHT)
+        if not 0 <= pos < len(self._visible):
+            return
+        item_id = self._items[self._visible[pos]][0]
+        if item_id in self.selected:
+            self.selected.discard(item_id)
+        else:
+            self.selected.add(item_id)
+        self._redraw()
+
+
+def parse_grade(text):
+    """Note saisie -> float arrondi (virgule acceptée) ou None si vide. ValueError si invalide."""
+    text = text.strip().replace(",", ".")
+    if not text:
+        return None
+    try:
+        grade = round(float(text), 2)
+    except ValueError:
+        raise ValueError("La note doit être un nombre.") from None
+    if not 0 <= grade <= 20:
+        raise ValueError("La note doit être entre 0 et 20.")
+    return grade
+
+
+class GradeEntryGrid(tk.Frame):
+    """
+    Grille de saisie : une ligne par étudiant (matricule, nom, note).
+
+    Le champ d'édition suit la ligne courante : Entrée / Tab / flèche bas
+    valident et passent à la ligne suivante, Maj+Tab / flèche haut à la
+    précédente, Échap annule la saisie de la cellule. Une note invalide reste
+    en rouge et bloque le déplacement. Les valeurs modifiées sont conservées
+    localement (dirty()) jusqu'à mark_saved().
+    on_change() est appelé quand l'ensemble des cellules modifiées change ;
+    on_message(texte) reçoit les erreurs de validation.
+    """
+
+    def __init__(self, master, on_change=None, on_message=None, height=18, **kwargs):
+        bg = kwargs.pop("bg", master.cget("bg"))
+        super().__init__(master, bg=bg, **kwargs)
+        self.on_change = on_change
+        self.on_message = on_message
+        self._order = []  # iids dans l'ordre d'affichage
+        self._original = {}  # enrollment_id -> note en base
+        self._values = {}  # enrollment_id -> note saisie
+        self._current = None
+
+        columns = ("matricule", "student_name", "grade")
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height, selectmode="browse")
+        self.tree.heading("matricule", text="Matricule")
+        self.tree.heading("student_name", text="Étudiant")
+        self.tree.heading("grade", text="Note")
+        self.tree.column("matricule", width=110, anchor="w")
+        self.tree.column("student_name", width=240, anchor="w")
+        self.tree.column("grade", width=80, anchor="center")
+        self.tree.tag_configure("dirty", background="#1e3a8a")
+        vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self._vsb = vsb
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+        self.tree.bind("<<TreeviewSelect>>", lambda _e: self._edit_selected())
+        self.tree.bind("<Configure>", lambda _e: self.after_idle(self._place_editor))
+
+        fg = APP_CONFIG["text_primary"]
+        self._editor_bg = "#020617"
+        self.editor = tk.Entry(self.tree, justify="center", bg=self._editor_bg, fg=fg, insertbackground=fg, relief="flat")
+        self.editor.bind("<Return>", lambda _e: self._commit_and_move(1))
+        self.editor.bind("<KP_Enter>", lambda _e: self._commit_and_move(1))
+        self.editor.bind("<Tab>", lambda _e: self._commit_and_move(1))
+        self.editor.bind("<Shift-Tab>", lambda _e: self._commit_and_move(-1))
+        self.editor.bind("<ISO_Left_Tab>", lambda _e: self._commit_and_move(-1))
+        self.editor.bind("<Down>", lambda _e: self._commit_and_move(1))
+        self.editor.bind("<Up>", lambda _e: self._commit_and_move(-1))
+        self.editor.bind("<Escape>", lambda _e: self._revert_cell())
+        self.editor.bind("<KeyRelease>", lambda _e: self._validate_live())
+
+    # --- Données
+
+    def load(self, rows):
+        """rows : lignes de get_class_gradebook (enrollment_id, matricule, student_name, grade)."""
+        self.tree.delete(*self.tree.get_children(""))
+        self._order = []
+        self._original = {}
+        self._values = {}
+        self._current = None
+        for r in rows:
+            eid = r["enrollment_id"]
+            grade = None if r["grade"] is None else float(r["grade"])
+            self._original[eid] = grade
+            self._values[eid] = grade
+            iid = str(eid)
+            self._order.append(iid)
+            self.tree.insert("", "end", iid=iid, values=(r["matricule"], r["student_name"], _grade_text(grade)))
+        if self._order:
+            self.tree.selection_set(self._order[0])
+            self.tree.focus(self._order[0])
+        else:
+            self.editor.place_forget()
+        self._notify()
+
+    def dirty(self):
+        """Cellules modifiées : {enrollment_id: note ou None}."""
+        return {eid: v for eid, v in self._values.items() if v != self._original.get(eid)}
+
+    def commit_current(self):
+        """Valide la cellule en cours d'édition. Retourne False si la saisie est invalide."""
+        if self._current is None:
+            return True
+        try:
+            grade = parse_grade(self.editor.get())
+        except ValueError as e:
+            self._flag_invalid(str(e))
+            return False
+        eid = int(self._current)
+        if grade != self._values.get(eid):
+            self._values[eid] = grade
+            self.tree.set(self._current, "grade", _grade_text(grade))
+            self._refresh_tag(self._current)
+            self._notify()
+        return True
+
+    def mark_saved(self, saved):
+        """saved : {enrollment_id: note} effectivement enregistrées (les cellules modifiées depuis restent « sales »)."""
+        for eid, grade in saved.items():
+            self._original[eid] = grade
+            self._refresh_tag(str(eid))
+        self._notify()
+
+    # --- Édition
+
+    def _edit_selected(self):
+        sel = self.tree.selection()
+        if not sel or sel[0] == self._current:
+            return
+        if self._current is not None and not self.commit_current():
+            self.tree.selection_set(self._current)
+            return
+        self._current = sel[0]
+        self.editor.delete(0, "end")
+        self.editor.insert(0, _grade_text(self._values[int(self._current)]))
+        self._place_editor()
+        self.editor.focus_set()
+        self.editor.select_range(0, "end")
+
+    def _place_editor(self):
+        if self._current is None:
+            return
+        bbox = self.tree.bbox(self._current, "grade")
+        if not bbox:
+            self.editor.place_forget()  # ligne hors de la zone visible
+            return
+        x, y, w, h = bbox
+        self.editor.place(x=x, y=y, width=w, height=h)
+
+    def _commit_and_move(self, step):
+        if not self.commit_current():
+            return "break"
+        if self._current is not None:
+            i = self._order.index(self._current) + step
+            if 0 <= i < len(self._order):
+                iid = self._order[i]
+                self.tree.selection_set(iid)
+                self.tree.focus(iid)
+                self.tree.see(iid)
+        return "break"
+
+    def _revert_cell(self):
+        if self._current is None:
+            return "break"
+        self.editor.delete(0, "end")
+        self.editor.insert(0, _grade_text(self._values[int(self._current)]))
+        self.editor.configure(bg=self._editor_bg)
+        return "break"
+
+    def _validate_live(self):
+        try:
+            parse_grade(self.editor.get())
+        except ValueError:
+            self.editor.configure(bg="#7f1d1d")
+            return
+        self.editor.configure(bg=self._editor_bg)
+
+    def _flag_invalid(self, message):
+        self.editor.configure(bg="#7f1d1d")
+        self.editor.focus_set()
+        if self.on_message is not None:
+            self.on_message(message)
+
+    def _refresh_tag(self, iid):
+        if not self.tree.exists(iid):
+            return
+        eid = int(iid)
+        dirty = self._values.get(eid) != self._original.get(eid)
+        self.tree.item(iid, tags=("dirty",) if dirty else ())
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    # --- Défilement : le champ d'édition suit sa ligne
+
+    def _on_scroll(self, first, last):
+        self._vsb.set(first, last)
+        self.after_idle(self._place_editor)
+
+
+def _grade_text(grade):
+    return "" if grade is None else f"{grade:g}"